@@ -1,21 +1,94 @@
+import threading
 
-from componentes.vistas_web import *
-from componentes.vistas_api import *
+from flask import Flask, jsonify, request
+from flask_cors import CORS
+from base_db.conexion_db import pool
+from base_db.migrador import ErrorMigracion, Migrador
+from base_db.tabla_db import metricas
 from componentes.vistas_web import registrar_rutas_web
 from componentes.vistas_api import registrar_rutas
-from flask import Flask
-from flask_cors import CORS
+from componentes.serializacion import ProveedorJSON
+
+
+def crear_app(verificar_esquema=True):
+    """
+    Arma la aplicación con todas sus rutas sin consultar la base ni cargar
+    openpyxl (se importa con la primera planilla). Con 'verificar_esquema',
+    el primer request verifica que no haya migraciones pendientes: los
+    modelos leen columnas que agregan las migraciones, así que con el
+    esquema atrasado cada request responde 503 hasta que se apliquen.
+    Las estructuras en memoria, la cola de importaciones y los observadores
+    de escrituras son de cada aplicación (en app.extensions) y se descartan
+    con ella.
+    """
+    app = Flask(__name__)
+    app.secret_key = 'supersecretkey'
+    app.json = ProveedorJSON(app)
+
+    registrar_rutas_web(app)
+    registrar_rutas(app)
+
+    # Cada request retiene la conexión que tome del pool y la devuelve al terminar
+    app.before_request(pool.retener)
+    app.teardown_request(pool.liberar)
+
+    if verificar_esquema:
+        # Se verifica una sola vez por aplicación, con la conexión del request;
+        # mientras falte alguna migración se vuelve a intentar en el próximo
+        esquema = {'verificado': False}
+        candado_esquema = threading.Lock()
+
+        @app.before_request
+        def verificar_migraciones():
+            if esquema['verificado']:
+                return None
+            with candado_esquema:
+                if not esquema['verificado']:
+                    try:
+                        Migrador().verificar()
+                    except ErrorMigracion as e:
+                        app.logger.error(e)
+                        return jsonify({"error": str(e)}), 503
+                    esquema['verificado'] = True
+            return None
+
+    # Cada request suma sus consultas y las informa en el encabezado Server-Timing
+    app.before_request(metricas.iniciar_request)
+
+    @app.after_request
+    def informar_consultas(respuesta):
+        ruta = request.url_rule.rule if request.url_rule else 'sin_ruta'
+        medido = metricas.terminar_request(request.method, ruta)
+        if medido:
+            consultas, segundos_db, total = medido
+            respuesta.headers.add(
+                'Server-Timing',
+                f'db;dur={segundos_db * 1000:.2f};desc="{consultas} consultas", '
+                f'total;dur={total * 1000:.2f}')
+        return respuesta
+
+    CORS(app, resources={r"/api/*": {"origins": "*"}},
+         expose_headers=["X-Siguiente-Id", "Link", "ETag", "Server-Timing"])
+
+    return app
 
-app = Flask(__name__)
-app.secret_key = 'supersecretkey'
 
-registrar_rutas_web(app)
-registrar_rutas(app)
+_app = None
 
-app.json.ensure_ascii = False
 
-cors = CORS(app, resources={r"/api/*": {"origins": "*"}})
+def __getattr__(nombre):
+    """
+    'app' del módulo ('app:app' en el servidor WSGI) se arma recién cuando
+    se pide: importar el módulo para usar crear_app() no arma otra aplicación
+    """
+    global _app
+    if nombre == 'app':
+        if _app is None:
+            _app = crear_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
 
 
 if __name__ == "__main__":
-    app.run()
+    Migrador().verificar()
+    crear_app().run()
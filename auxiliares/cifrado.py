@@ -1,6 +1,24 @@
 import hashlib
 
+# Bytes leídos por vez al calcular la huella de un archivo
+TAMANIO_BLOQUE = 1024 * 1024
+
 def encriptar(dato):
     dato = dato.encode(encoding='utf-8')
     h = hashlib.shake_256(dato)
-    return h.hexdigest(20)
\ No newline at end of file
+    return h.hexdigest(20)
+
+def huella_archivo(flujo):
+    """
+    Huella SHAKE-256 del contenido de un archivo abierto en modo binario,
+    leído por bloques. Deja el archivo otra vez al principio.
+    """
+    h = hashlib.shake_256()
+    for bloque in iter(lambda: flujo.read(TAMANIO_BLOQUE), b''):
+        h.update(bloque)
+    flujo.seek(0)
+    return h.hexdigest(20)
+
+def huella_fila(valores):
+    """Huella de los valores de una fila (None y texto vacío cuentan igual)"""
+    return encriptar('\x1f'.join('' if valor is None else str(valor) for valor in valores))
@@ -0,0 +1,21 @@
+import re
+import unicodedata
+
+# Palabras de un texto ya normalizado con clave()
+PALABRA = re.compile(r"\w+")
+
+
+def clave(valor):
+    """
+    Normaliza un valor para compararlo como lo hace MySQL con la collation
+    utf8mb4_general_ci: sin distinguir mayúsculas, acentos ni espacios finales.
+    """
+    texto = unicodedata.normalize('NFKD', str(valor).rstrip())
+    return ''.join(c for c in texto if not unicodedata.combining(c)).casefold()
+
+
+def palabras(valor):
+    """Lista de palabras normalizadas con clave() de un texto (vacía si es None)"""
+    if valor is None:
+        return []
+    return PALABRA.findall(clave(valor))
@@ -1,4 +1,16 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
 import mysql.connector
+from mysql.connector import errors
+from mysql.connector.constants import ClientFlag
+
+logger = logging.getLogger(__name__)
 
 config_dev = {
     'user': 'root',
@@ -14,4 +26,333 @@ config_prod = {
     'database': 'luciano$puntoferretero',
 }
 
-conexion = mysql.connector.connect(**config_dev)
+config_pool = {
+    'tamanio': 5,             # Conexiones abiertas como máximo por proceso
+    'timeout': 10,            # Segundos de espera por una conexión libre
+    'max_inactividad': 60,    # Segundos sin uso antes de verificar la conexión
+    # Sentencias preparadas por conexión (0 para no preparar). Apagado hasta
+    # medirlo contra MySQL: cada ejecución de un cursor preparado le suma un
+    # COM_STMT_RESET, una ida y vuelta más al servidor
+    'sentencias': 0,
+}
+
+
+# Errores tras los que MySQL ya deshizo la transacción entera (no solo la sentencia)
+ERRORES_DESHACEN_TRANSACCION = {1213}    # ER_LOCK_DEADLOCK
+
+
+class PoolAgotado(Exception):
+    """No se liberó ninguna conexión dentro del tiempo de espera"""
+
+
+class TransaccionPerdida(Exception):
+    """La base deshizo la transacción en curso (deadlock o conexión perdida)"""
+
+
+class Transaccion:
+    """
+    Unidad de trabajo abierta con PoolConexiones.transaccion(). Todas las
+    consultas del hilo usan 'conexion' y las escrituras se confirman juntas
+    con un solo commit al terminar el bloque.
+    """
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self.pendientes = {}      # Escrituras por avisar después del commit (las anota Tabla)
+        self.perdida = None       # Error con el que la base deshizo la transacción
+        self._al_confirmar = []
+        self._puntos = 0
+
+    def al_confirmar(self, funcion):
+        """Llama a 'funcion' después del commit; si la transacción se deshace, nunca"""
+        self._al_confirmar.append(funcion)
+
+    def anotar_error(self, error):
+        """
+        Anota un error de una consulta de la transacción. MySQL deshace solo
+        la sentencia que falló, salvo un deadlock o una conexión perdida: ahí
+        se perdió todo lo anterior y la transacción ya no se puede confirmar.
+        """
+        if (isinstance(error, (errors.OperationalError, errors.InterfaceError))
+                or getattr(error, 'errno', None) in ERRORES_DESHACEN_TRANSACCION):
+            self.perdida = self.perdida or error
+
+    @contextmanager
+    def punto(self):
+        """
+        Savepoint: si el bloque lanza una excepción se deshace solo lo que se
+        escribió dentro de él y la excepción sigue; la transacción continúa.
+        """
+        self._puntos += 1
+        nombre = f"punto_{self._puntos}"
+        self.__sentencia(f"SAVEPOINT {nombre}")
+        try:
+            yield self
+        except BaseException:
+            if self.perdida is None:
+                self.__sentencia(f"ROLLBACK TO SAVEPOINT {nombre}")
+            raise
+        self.__sentencia(f"RELEASE SAVEPOINT {nombre}")
+
+    def confirmar(self):
+        if self.perdida is not None:
+            raise TransaccionPerdida(f"La transacción se deshizo: {self.perdida}")
+        self.conexion.commit()
+
+    def avisar(self):
+        """Corre lo anotado con al_confirmar(), una vez hecho el commit"""
+        for funcion in self._al_confirmar:
+            try:
+                funcion()
+            except Exception:
+                logger.exception("Error después de confirmar una transacción")
+
+    def __sentencia(self, consulta):
+        cursor = self.conexion.cursor()
+        try:
+            cursor.execute(consulta)
+        finally:
+            cursor.close()
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones MySQL seguro para hilos.
+    Las conexiones se abren a demanda hasta 'tamanio'. Cada hilo toma una con
+    prestar() y la devuelve al pool al salir del bloque. Las conexiones que
+    estuvieron inactivas más de 'max_inactividad' se verifican con ping y se
+    reconectan antes de prestarse.
+    Fuera de transaccion() cada escritura de Tabla se confirma por separado.
+    Con 'sentencias' mayor que 0, cada conexión guarda además hasta esa
+    cantidad de cursores con una sentencia ya preparada en el servidor (ver
+    cursor_preparado()); por defecto no se prepara ninguna.
+    Crear el pool no abre ninguna conexión, y un proceso hijo (los workers de
+    un servidor que hace fork) arranca con el pool vacío: nunca usa los
+    sockets que abrió el proceso padre.
+    """
+
+    def __init__(self, config, tamanio=5, timeout=10, max_inactividad=60, sentencias=0):
+        self.config = config
+        self.tamanio = tamanio
+        self.timeout = timeout
+        self.max_inactividad = max_inactividad
+        self.sentencias = sentencias
+        self._heredadas = []
+        self.__reiniciar()
+        os.register_at_fork(after_in_child=self.__reiniciar)
+
+    def __reiniciar(self):
+        """Estado inicial; en un proceso hijo, olvida las conexiones del padre"""
+        # No se cierran: cerrarlas (o dejar que las cierre el recolector de
+        # basura) cortaría también las del padre, que comparte los sockets
+        self._heredadas.extend(getattr(self, '_conexiones', ()))
+        self._conexiones = set()
+        self._preparados = {}     # conexión -> OrderedDict {consulta: cursor preparado}
+        self._libres = queue.LifoQueue()
+        self._abiertas = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    # Préstamo de conexiones
+    @contextmanager
+    def prestar(self):
+        """
+        Presta una conexión al hilo actual. Si el hilo ya tiene una (bloques
+        anidados o conexión retenida para el request) se reutiliza la misma.
+        """
+        actual = getattr(self._local, 'conexion', None)
+        if actual is not None:
+            yield actual
+            return
+
+        conexion = self.__tomar()
+        self._local.conexion = conexion
+        valida = True
+        try:
+            yield conexion
+        except (errors.OperationalError, errors.InterfaceError, GeneratorExit):
+            # GeneratorExit: un generador que leía con un cursor sin buffer
+            # se abandonó y dejó filas sin leer en la conexión
+            valida = False
+            raise
+        finally:
+            if not valida or not getattr(self._local, 'retener', False):
+                self._local.conexion = None
+                self.__devolver(conexion, valida)
+
+    @contextmanager
+    def transaccion(self):
+        """
+        Unidad de trabajo: durante el bloque el hilo usa una sola conexión y
+        las escrituras no se confirman una por una sino con un único commit
+        al salir; si el bloque lanza una excepción se deshacen todas.
+        Un bloque anidado es un savepoint de la transacción de afuera.
+        Devuelve la Transaccion.
+        """
+        actual = self.transaccion_actual()
+        if actual is not None:
+            with actual.punto():
+                yield actual
+            return
+
+        with self.prestar() as conexion:
+            if conexion.in_transaction:
+                # La abrieron lecturas anteriores del request: empezar con una vista nueva
+                conexion.rollback()
+            transaccion = Transaccion(conexion)
+            self._local.transaccion = transaccion
+            try:
+                yield transaccion
+                transaccion.confirmar()
+            except BaseException:
+                try:
+                    conexion.rollback()
+                except Exception:
+                    logger.exception("Error deshaciendo la transacción")
+                raise
+            finally:
+                self._local.transaccion = None
+        transaccion.avisar()
+
+    def transaccion_actual(self):
+        """Transaccion en curso del hilo, o None"""
+        return getattr(self._local, 'transaccion', None)
+
+    def retener(self):
+        """
+        Marca el hilo para conservar la conexión que tome hasta liberar().
+        Pensado para un request: la primera consulta toma la conexión y las
+        siguientes la reutilizan. No abre ninguna conexión por sí mismo.
+        """
+        self._local.retener = True
+
+    def liberar(self, error=None):
+        """Devuelve al pool la conexión retenida por el hilo (si la hay)"""
+        self._local.retener = False
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is not None:
+            self._local.conexion = None
+            self.__devolver(conexion, error is None or self.__conectada(conexion))
+
+    # Sentencias preparadas
+    def cursor_preparado(self, conexion, consulta):
+        """
+        Cursor de 'conexion' con 'consulta' preparada en el servidor, o None
+        si el driver no admite sentencias preparadas. El cursor se conserva
+        y se vuelve a usar mientras la conexión viva: el driver solo reutiliza
+        la sentencia si recibe el mismo objeto str, así que 'consulta' tiene
+        que salir siempre del mismo lugar (ver base_db.sentencias).
+        No se cierra después de usarlo; si falla, descartar_preparado().
+        """
+        if not self.sentencias:
+            return None
+        cursores = self._preparados.setdefault(conexion, OrderedDict())
+        cursor = cursores.get(consulta)
+        if cursor is not None:
+            cursores.move_to_end(consulta)
+            return cursor
+        try:
+            cursor = conexion.cursor(prepared=True)
+        except (TypeError, errors.NotSupportedError):
+            logger.warning("El driver no admite sentencias preparadas, se usan consultas de texto")
+            self.sentencias = 0
+            return None
+        cursores[consulta] = cursor
+        while len(cursores) > self.sentencias:
+            self.__cerrar_cursor(cursores.popitem(last=False)[1])
+        return cursor
+
+    def descartar_preparado(self, conexion, consulta):
+        """Cierra el cursor preparado de 'consulta' (tras un error al usarlo)"""
+        cursor = self._preparados.get(conexion, {}).pop(consulta, None)
+        if cursor is not None:
+            self.__cerrar_cursor(cursor)
+
+    def __olvidar_preparados(self, conexion):
+        for cursor in self._preparados.pop(conexion, {}).values():
+            self.__cerrar_cursor(cursor)
+
+    @staticmethod
+    def __cerrar_cursor(cursor):
+        try:
+            cursor.close()
+        except Exception:
+            pass
+
+    # Manejo interno
+    def __tomar(self):
+        try:
+            conexion, ultimo_uso = self._libres.get_nowait()
+        except queue.Empty:
+            nueva = self.__abrir()
+            if nueva is not None:
+                return nueva
+            try:
+                conexion, ultimo_uso = self._libres.get(timeout=self.timeout)
+            except queue.Empty:
+                raise PoolAgotado(
+                    f"No hay conexiones libres tras {self.timeout} s "
+                    f"(tamaño del pool: {self.tamanio})")
+
+        if time.monotonic() - ultimo_uso > self.max_inactividad:
+            # Si el ping reconecta, las sentencias del servidor se pierden
+            self.__olvidar_preparados(conexion)
+            try:
+                conexion.ping(reconnect=True, attempts=2, delay=0)
+            except Exception:
+                logger.warning("Conexión inactiva caída, se abre una nueva")
+                self.__descartar(conexion)
+                return self.__tomar()
+        return conexion
+
+    def __abrir(self):
+        """Abre una conexión nueva si no se alcanzó el tamaño del pool"""
+        with self._lock:
+            if self._abiertas >= self.tamanio:
+                return None
+            self._abiertas += 1
+        try:
+            # FOUND_ROWS: un UPDATE informa las filas encontradas aunque no
+            # cambie ningún valor, así 0 significa que el registro no existe
+            conexion = mysql.connector.connect(client_flags=[ClientFlag.FOUND_ROWS], **self.config)
+        except Exception:
+            with self._lock:
+                self._abiertas -= 1
+            raise
+        with self._lock:
+            self._conexiones.add(conexion)
+        return conexion
+
+    def __devolver(self, conexion, valida=True):
+        if valida:
+            try:
+                # Cerrar la transacción abierta por los SELECT para no
+                # prestar una conexión con una vista vieja de los datos
+                if conexion.in_transaction:
+                    conexion.rollback()
+            except Exception:
+                valida = False
+        if valida:
+            self._libres.put((conexion, time.monotonic()))
+        else:
+            self.__descartar(conexion)
+
+    def __descartar(self, conexion):
+        self._preparados.pop(conexion, None)
+        try:
+            conexion.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._abiertas -= 1
+            self._conexiones.discard(conexion)
+
+    @staticmethod
+    def __conectada(conexion):
+        try:
+            return conexion.is_connected()
+        except Exception:
+            return False
+
+
+pool = PoolConexiones(config_dev, **config_pool)
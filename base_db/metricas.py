@@ -0,0 +1,199 @@
+import functools
+import logging
+import re
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Consultas que tardan más que esto (segundos) van al log de consultas lentas
+UMBRAL_LENTA = 0.2
+
+# Límites (segundos) de los buckets de los histogramas
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Consultas lentas recientes que se conservan en memoria
+LENTAS_RECIENTES = 50
+
+PREFIJO = 'puntoferretero'
+
+# Huellas recordadas: casi todas las consultas son textos fijos que se repiten
+HUELLAS_RECORDADAS = 1024
+
+
+@functools.lru_cache(maxsize=HUELLAS_RECORDADAS)
+def huella(consulta):
+    """
+    Forma normalizada de una consulta para agruparla con las iguales: sin
+    valores literales, con las listas IN colapsadas y espacios simples.
+    """
+    texto = re.sub(r"'(?:[^'\\]|\\.)*'", '?', consulta)
+    texto = re.sub(r"\b\d+(?:\.\d+)?\b", '?', texto)
+    texto = texto.replace('%s', '?')
+    texto = re.sub(r"\(\s*\?(?:\s*,\s*\?)*\s*\)", '(?)', texto)
+    return re.sub(r"\s+", ' ', texto).strip().rstrip(';').strip()
+
+
+class Histograma:
+    """Histograma acumulado al estilo Prometheus (buckets, suma y cantidad)"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.conteos = [0] * len(buckets)
+        self.suma = 0.0
+        self.cantidad = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.conteos[i] += 1
+                break
+        self.suma += valor
+        self.cantidad += 1
+
+    def lineas(self, nombre, etiquetas):
+        acumulado = 0
+        for limite, conteo in zip(self.buckets, self.conteos):
+            acumulado += conteo
+            yield f'{nombre}_bucket{{{etiquetas},le="{limite}"}} {acumulado}'
+        yield f'{nombre}_bucket{{{etiquetas},le="+Inf"}} {self.cantidad}'
+        yield f'{nombre}_sum{{{etiquetas}}} {self.suma:.6f}'
+        yield f'{nombre}_count{{{etiquetas}}} {self.cantidad}'
+
+
+class MetricasConsultas:
+    """
+    Mide las consultas que ejecuta Tabla y los requests del servidor.
+    Por consulta guarda latencia y filas por tabla y por huella, y avisa en
+    el log las que superan 'umbral_lenta'. Dentro de un request además suma
+    cantidad de consultas y tiempo de base, que se informan al terminar.
+    Los datos son del proceso: cada worker expone los suyos.
+    """
+
+    def __init__(self, umbral_lenta=UMBRAL_LENTA):
+        self.umbral_lenta = umbral_lenta
+        self.lentas = deque(maxlen=LENTAS_RECIENTES)
+        self._por_tabla = {}      # tabla -> Histograma de latencia
+        self._filas = {}          # tabla -> filas devueltas o afectadas
+        self._errores = {}        # tabla -> consultas con error
+        self._por_huella = {}     # huella -> [cantidad, segundos]
+        self._por_ruta = {}       # (método, ruta) -> [Histograma request, Histograma base, consultas]
+        self._cantidad_lentas = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    # Consultas
+    def registrar_consulta(self, tabla, consulta, segundos, filas=0, error=False):
+        forma = huella(consulta)
+        with self._lock:
+            self._por_tabla.setdefault(tabla, Histograma()).observar(segundos)
+            self._filas[tabla] = self._filas.get(tabla, 0) + (filas or 0)
+            if error:
+                self._errores[tabla] = self._errores.get(tabla, 0) + 1
+            acumulado = self._por_huella.setdefault(forma, [0, 0.0])
+            acumulado[0] += 1
+            acumulado[1] += segundos
+            if segundos >= self.umbral_lenta:
+                self._cantidad_lentas += 1
+                self.lentas.append({'consulta': forma, 'tabla': tabla,
+                                    'segundos': round(segundos, 6), 'filas': filas,
+                                    'momento': time.time()})
+
+        if segundos >= self.umbral_lenta:
+            logger.warning(f"Consulta lenta ({segundos * 1000:.1f} ms, {filas} filas): {forma}")
+
+        actual = getattr(self._local, 'request', None)
+        if actual is not None:
+            actual[0] += 1
+            actual[1] += segundos
+
+    # Requests
+    def iniciar_request(self):
+        """Empieza a sumar las consultas del request del hilo actual"""
+        self._local.request = [0, 0.0, time.perf_counter()]
+
+    def terminar_request(self, metodo, ruta):
+        """
+        Cierra el request del hilo y lo suma a las métricas de la ruta.
+        Devuelve (consultas, segundos de base, segundos totales) o None.
+        """
+        actual = getattr(self._local, 'request', None)
+        if actual is None:
+            return None
+        self._local.request = None
+        consultas, segundos_db, inicio = actual
+        total = time.perf_counter() - inicio
+
+        with self._lock:
+            por_ruta = self._por_ruta.get((metodo, ruta))
+            if por_ruta is None:
+                por_ruta = self._por_ruta[(metodo, ruta)] = [Histograma(), Histograma(), 0]
+            por_ruta[0].observar(total)
+            por_ruta[1].observar(segundos_db)
+            por_ruta[2] += consultas
+        return consultas, segundos_db, total
+
+    # Exportación
+    def prometheus(self):
+        """Métricas en formato de texto de Prometheus"""
+        with self._lock:
+            lineas = []
+
+            nombre = f'{PREFIJO}_consulta_segundos'
+            lineas += [f'# HELP {nombre} Latencia de las consultas SQL por tabla',
+                       f'# TYPE {nombre} histogram']
+            for tabla, histograma in sorted(self._por_tabla.items()):
+                lineas += histograma.lineas(nombre, f'tabla="{etiqueta(tabla)}"')
+
+            nombre = f'{PREFIJO}_consulta_filas_total'
+            lineas += [f'# HELP {nombre} Filas devueltas o afectadas por tabla',
+                       f'# TYPE {nombre} counter']
+            lineas += [f'{nombre}{{tabla="{etiqueta(t)}"}} {n}' for t, n in sorted(self._filas.items())]
+
+            nombre = f'{PREFIJO}_consulta_errores_total'
+            lineas += [f'# HELP {nombre} Consultas que terminaron en error por tabla',
+                       f'# TYPE {nombre} counter']
+            lineas += [f'{nombre}{{tabla="{etiqueta(t)}"}} {n}' for t, n in sorted(self._errores.items())]
+
+            nombre = f'{PREFIJO}_consultas_lentas_total'
+            lineas += [f'# HELP {nombre} Consultas que superaron {self.umbral_lenta} s',
+                       f'# TYPE {nombre} counter',
+                       f'{nombre} {self._cantidad_lentas}']
+
+            cantidad = f'{PREFIJO}_huella_consultas_total'
+            segundos = f'{PREFIJO}_huella_segundos_total'
+            lineas += [f'# HELP {cantidad} Ejecuciones por forma de consulta',
+                       f'# TYPE {cantidad} counter']
+            lineas += [f'{cantidad}{{huella="{etiqueta(h)}"}} {n}'
+                       for h, (n, _) in sorted(self._por_huella.items())]
+            lineas += [f'# HELP {segundos} Tiempo total por forma de consulta',
+                       f'# TYPE {segundos} counter']
+            lineas += [f'{segundos}{{huella="{etiqueta(h)}"}} {s:.6f}'
+                       for h, (_, s) in sorted(self._por_huella.items())]
+
+            rutas = sorted(self._por_ruta.items())
+            nombre = f'{PREFIJO}_request_segundos'
+            lineas += [f'# HELP {nombre} Duración de los requests por ruta',
+                       f'# TYPE {nombre} histogram']
+            for (metodo, ruta), (histograma, _, _) in rutas:
+                lineas += histograma.lineas(nombre, f'metodo="{metodo}",ruta="{etiqueta(ruta)}"')
+
+            nombre = f'{PREFIJO}_request_db_segundos'
+            lineas += [f'# HELP {nombre} Tiempo de base de datos por request y ruta',
+                       f'# TYPE {nombre} histogram']
+            for (metodo, ruta), (_, histograma, _) in rutas:
+                lineas += histograma.lineas(nombre, f'metodo="{metodo}",ruta="{etiqueta(ruta)}"')
+
+            nombre = f'{PREFIJO}_request_consultas_total'
+            lineas += [f'# HELP {nombre} Consultas SQL hechas por los requests de cada ruta',
+                       f'# TYPE {nombre} counter']
+            lineas += [f'{nombre}{{metodo="{metodo}",ruta="{etiqueta(ruta)}"}} {consultas}'
+                       for (metodo, ruta), (_, _, consultas) in rutas]
+
+        return '\n'.join(lineas) + '\n'
+
+
+def etiqueta(valor):
+    """Escapa un valor de etiqueta de Prometheus"""
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,5 @@
+-- Índices para buscar productos por artículo y por código (importación,
+-- control de duplicados y mostrador). No son únicos: la API y el sitio
+-- permiten cargar productos con el mismo artículo o código.
+ALTER TABLE product ADD INDEX `idx_product_art` (`art`);
+ALTER TABLE product ADD INDEX `idx_product_cod` (`cod`);
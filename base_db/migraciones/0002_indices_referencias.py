@@ -0,0 +1,34 @@
+"""
+Índices de las columnas por las que se resuelven proveedores, categorías e
+imágenes al importar. Se crean únicos si los datos actuales lo permiten;
+si hay valores repetidos se crea un índice común y se avisa en el log.
+"""
+import logging
+
+from base_db.migrador import ejecutar
+
+logger = logging.getLogger(__name__)
+
+# (tabla, columna, nombre del índice)
+INDICES = (
+    ('prov', 'cod', 'prov_cod'),
+    ('category', 'name', 'category_name'),
+    ('image', 'url_img', 'image_url_img'),
+)
+
+
+def aplicar(cursor):
+    for tabla, columna, nombre in INDICES:
+        cursor.execute(
+            f"SELECT `{columna}`, COUNT(*) FROM {tabla} WHERE `{columna}` IS NOT NULL "
+            f"GROUP BY `{columna}` HAVING COUNT(*) > 1 LIMIT 5;")
+        repetidos = cursor.fetchall()
+
+        if repetidos:
+            logger.warning(
+                f"{tabla}.{columna} tiene valores repetidos "
+                f"({', '.join(str(valor) for valor, _ in repetidos)}), "
+                f"se crea un índice no único")
+            ejecutar(cursor, f"ALTER TABLE {tabla} ADD INDEX `idx_{nombre}` (`{columna}`);")
+        else:
+            ejecutar(cursor, f"ALTER TABLE {tabla} ADD UNIQUE INDEX `uq_{nombre}` (`{columna}`);")
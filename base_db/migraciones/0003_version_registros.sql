@@ -0,0 +1,8 @@
+-- Versión de cada registro para el control de concurrencia optimista
+-- (If-Match en la API, formulario de detalle en el sitio). Va a continuación
+-- de los campos del modelo para que el orden de las columnas siga al de
+-- 'campos' (las consultas nombran las columnas, no dependen de la posición).
+ALTER TABLE category ADD COLUMN `version` INT UNSIGNED NOT NULL DEFAULT 1 AFTER `unit`;
+ALTER TABLE image ADD COLUMN `version` INT UNSIGNED NOT NULL DEFAULT 1 AFTER `txt_alt`;
+ALTER TABLE prov ADD COLUMN `version` INT UNSIGNED NOT NULL DEFAULT 1 AFTER `obs`;
+ALTER TABLE product ADD COLUMN `version` INT UNSIGNED NOT NULL DEFAULT 1 AFTER `rating`;
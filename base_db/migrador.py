@@ -0,0 +1,192 @@
+import importlib.util
+import logging
+import os
+import re
+import sys
+from collections import namedtuple
+
+from mysql.connector import errorcode, errors
+
+from base_db.conexion_db import pool
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_MIGRACIONES = os.path.join(os.path.dirname(__file__), 'migraciones')
+
+# Tabla donde se anotan las migraciones aplicadas
+TABLA_MIGRACIONES = 'schema_migraciones'
+
+# Candado de MySQL para que dos procesos no migren a la vez
+CANDADO = 'puntoferretero_migraciones'
+CANDADO_TIMEOUT = 60
+
+# Archivos de migración: 0001_descripcion.sql o 0001_descripcion.py
+ARCHIVO_MIGRACION = re.compile(r'^(\d+)_(\w+)\.(sql|py)$')
+
+# Errores de DDL que indican que el cambio ya estaba hecho (por ejemplo, una
+# migración que se cortó a la mitad y se vuelve a correr)
+ERRORES_YA_APLICADO = (errorcode.ER_DUP_KEYNAME, errorcode.ER_DUP_FIELDNAME)
+
+Migracion = namedtuple('Migracion', ['version', 'nombre', 'ruta'])
+
+
+class ErrorMigracion(Exception):
+    """Una migración no se pudo aplicar"""
+
+
+def ejecutar(cursor, sentencia):
+    """Ejecuta una sentencia de migración salteando los cambios ya aplicados"""
+    try:
+        cursor.execute(sentencia)
+        if cursor.with_rows:
+            cursor.fetchall()
+    except errors.DatabaseError as e:
+        if e.errno not in ERRORES_YA_APLICADO:
+            raise
+        logger.warning(f"Ya aplicado, se saltea: {e.msg}")
+
+
+class Migrador:
+    """
+    Aplica en orden los cambios de esquema de 'directorio' que todavía no
+    figuran en la tabla schema_migraciones.
+    Cada migración es un .sql (sentencias separadas por ';' al final de la
+    línea) o un .py con una función aplicar(cursor) que ejecuta sus
+    sentencias con ejecutar(). Como en MySQL el DDL no es transaccional, la
+    migración se anota recién cuando terminó entera y las sentencias que
+    fallan por estar ya aplicadas se saltean.
+    """
+
+    def __init__(self, conexion=pool, directorio=DIRECTORIO_MIGRACIONES):
+        self.conexion = conexion
+        self.directorio = directorio
+
+    def migraciones(self):
+        """Migraciones del directorio, ordenadas por versión"""
+        encontradas = []
+        for archivo in os.listdir(self.directorio):
+            coincidencia = ARCHIVO_MIGRACION.match(archivo)
+            if coincidencia:
+                encontradas.append(Migracion(
+                    int(coincidencia.group(1)), coincidencia.group(2),
+                    os.path.join(self.directorio, archivo)))
+        encontradas.sort()
+
+        versiones = [m.version for m in encontradas]
+        if len(versiones) != len(set(versiones)):
+            raise ErrorMigracion(f"Hay versiones de migración repetidas en {self.directorio}")
+        return encontradas
+
+    def pendientes(self):
+        """Migraciones que todavía no se aplicaron"""
+        with self.conexion.prestar() as conexion:
+            cursor = conexion.cursor()
+            try:
+                aplicadas = self.__aplicadas(cursor)
+            finally:
+                cursor.close()
+        return [m for m in self.migraciones() if m.version not in aplicadas]
+
+    def verificar(self):
+        """Lanza ErrorMigracion si hay migraciones sin aplicar"""
+        pendientes = self.pendientes()
+        if pendientes:
+            nombres = ", ".join(f"{m.version:04d}_{m.nombre}" for m in pendientes)
+            raise ErrorMigracion(f"Hay migraciones sin aplicar ({nombres}); "
+                                 "aplíquelas con 'python -m base_db.migrador'")
+
+    def migrar(self):
+        """Aplica las migraciones pendientes y devuelve las que aplicó"""
+        aplicadas_ahora = []
+        with self.conexion.prestar() as conexion:
+            cursor = conexion.cursor()
+            try:
+                cursor.execute("SELECT GET_LOCK(%s, %s);", (CANDADO, CANDADO_TIMEOUT))
+                if cursor.fetchone()[0] != 1:
+                    raise ErrorMigracion("Otro proceso está aplicando migraciones")
+                try:
+                    aplicadas = self.__aplicadas(cursor)
+                    for migracion in self.migraciones():
+                        if migracion.version in aplicadas:
+                            continue
+                        self.__aplicar(conexion, cursor, migracion)
+                        aplicadas_ahora.append(migracion)
+                finally:
+                    cursor.execute("SELECT RELEASE_LOCK(%s);", (CANDADO,))
+                    cursor.fetchall()
+            finally:
+                cursor.close()
+        return aplicadas_ahora
+
+    def __aplicadas(self, cursor):
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {TABLA_MIGRACIONES} ("
+            "`version` INT(11) NOT NULL, "
+            "`nombre` VARCHAR(100) NOT NULL, "
+            "`aplicada_en` TIMESTAMP DEFAULT CURRENT_TIMESTAMP, "
+            "PRIMARY KEY (`version`)"
+            ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;")
+        cursor.execute(f"SELECT `version` FROM {TABLA_MIGRACIONES};")
+        return {version for (version,) in cursor.fetchall()}
+
+    def __aplicar(self, conexion, cursor, migracion):
+        logger.info(f"Aplicando migración {migracion.version:04d}_{migracion.nombre}")
+        try:
+            if migracion.ruta.endswith('.py'):
+                self.__cargar(migracion).aplicar(cursor)
+            else:
+                for sentencia in self.sentencias(migracion.ruta):
+                    ejecutar(cursor, sentencia)
+            cursor.execute(
+                f"INSERT INTO {TABLA_MIGRACIONES} (`version`, `nombre`) VALUES (%s, %s);",
+                (migracion.version, migracion.nombre))
+            conexion.commit()
+        except Exception as e:
+            try:
+                conexion.rollback()
+            except Exception:
+                pass
+            raise ErrorMigracion(
+                f"Falló la migración {migracion.version:04d}_{migracion.nombre}: {e}") from e
+
+    @staticmethod
+    def sentencias(ruta):
+        """Sentencias de un archivo .sql, sin comentarios de línea"""
+        with open(ruta, encoding='utf-8') as archivo:
+            lineas = [linea for linea in archivo if not linea.lstrip().startswith('--')]
+        return [s.strip() for s in re.split(r';\s*$', ''.join(lineas), flags=re.MULTILINE)
+                if s.strip()]
+
+    @staticmethod
+    def __cargar(migracion):
+        especificacion = importlib.util.spec_from_file_location(
+            f"migracion_{migracion.version:04d}", migracion.ruta)
+        modulo = importlib.util.module_from_spec(especificacion)
+        especificacion.loader.exec_module(modulo)
+        return modulo
+
+
+def main(argumentos=None):
+    """python -m base_db.migrador [--pendientes]"""
+    argumentos = sys.argv[1:] if argumentos is None else argumentos
+    migrador = Migrador()
+
+    if '--pendientes' in argumentos:
+        for migracion in migrador.pendientes():
+            print(f"{migracion.version:04d}_{migracion.nombre}")
+        return 0
+
+    try:
+        aplicadas = migrador.migrar()
+    except ErrorMigracion as e:
+        print(e, file=sys.stderr)
+        return 1
+    for migracion in aplicadas:
+        print(f"Aplicada {migracion.version:04d}_{migracion.nombre}")
+    if not aplicadas:
+        print("El esquema está al día")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
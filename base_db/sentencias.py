@@ -0,0 +1,69 @@
+class SentenciasSQL:
+    """
+    Texto SQL de las consultas de forma fija que arma Tabla (leer por un
+    campo, insertar, modificar y eliminar un registro), por tabla, operación
+    y columnas. Cada texto se arma una sola vez y después se devuelve siempre
+    el mismo objeto str: además de ahorrar armarlo en cada llamada, es lo que
+    el cursor preparado de cada conexión compara para reutilizar la sentencia
+    ya preparada en el servidor.
+    """
+
+    def __init__(self):
+        self._textos = {}
+
+    def obtener(self, tabla, columnas, campo=None):
+        """SELECT de 'columnas' de los registros con 'campo' = %s (toda la tabla sin campo)"""
+        clave = ('obtener', tabla, columnas, campo)
+        texto = self._textos.get(clave)
+        if texto is None:
+            cols_sql = ", ".join(f"`{c}`" for c in columnas)
+            where_q = f" WHERE {campo} = %s" if campo is not None else ""
+            texto = self.__guardar(clave, f"SELECT {cols_sql} FROM {tabla}{where_q};")
+        return texto
+
+    def insertar(self, tabla, columnas):
+        """INSERT de un registro con 'columnas'"""
+        clave = ('insertar', tabla, columnas)
+        texto = self._textos.get(clave)
+        if texto is None:
+            cols_sql = ", ".join(f"`{c}`" for c in columnas)
+            placeholders = ", ".join(["%s"] * len(columnas))
+            texto = self.__guardar(
+                clave, f"INSERT INTO {tabla} ({cols_sql}) VALUES ({placeholders});")
+        return texto
+
+    def modificar(self, tabla, columnas, campo_version=None, con_version=False):
+        """
+        UPDATE de 'columnas' de un registro por id. Con 'campo_version' la
+        versión sube en cada cambio y, con 'con_version', el registro tiene
+        que estar en la versión indicada (último parámetro).
+        """
+        clave = ('modificar', tabla, columnas, campo_version, con_version)
+        texto = self._textos.get(clave)
+        if texto is None:
+            set_q = ", ".join(f"`{c}` = %s" for c in columnas)
+            if campo_version:
+                set_q += f", `{campo_version}` = `{campo_version}` + 1"
+            texto = self.__guardar(clave, f"UPDATE {tabla} SET {set_q} WHERE id = %s"
+                                          f"{self.__condicion_version(campo_version, con_version)};")
+        return texto
+
+    def eliminar(self, tabla, campo_version=None, con_version=False):
+        """DELETE de un registro por id (y versión, como en modificar())"""
+        clave = ('eliminar', tabla, campo_version, con_version)
+        texto = self._textos.get(clave)
+        if texto is None:
+            texto = self.__guardar(clave, f"DELETE FROM {tabla} WHERE id = %s"
+                                          f"{self.__condicion_version(campo_version, con_version)};")
+        return texto
+
+    def cantidad(self):
+        return len(self._textos)
+
+    def __guardar(self, clave, texto):
+        # Si dos hilos la arman a la vez, los dos se quedan con el mismo objeto
+        return self._textos.setdefault(clave, texto)
+
+    @staticmethod
+    def __condicion_version(campo_version, con_version):
+        return f" AND `{campo_version}` = %s" if campo_version and con_version else ""
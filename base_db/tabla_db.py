@@ -1,47 +1,230 @@
 import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict, namedtuple
+from operator import attrgetter
+
+from base_db.metricas import MetricasConsultas
+from base_db.sentencias import SentenciasSQL
+from base_db.versiones import VersionesTablas
 
 # Configurar logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Cantidad máxima de ids por consulta 'WHERE id IN (...)'
+TAMANIO_LOTE_IN = 1000
+
+# Tamaño de página por defecto de listar()
+LIMITE_PAGINA = 100
+
+# Filas leídas por vez (fetchmany) en recorrer_columnas()
+TAMANIO_LECTURA = 1000
+
+# Registros por transacción de crear_lote(), modificar_lote() y eliminar_lote()
+TAMANIO_LOTE_ESCRITURA = 500
+
+# Caché de lecturas de las tablas de referencia
+CACHE_CAPACIDAD = 4096    # Entradas como máximo (se descartan las menos usadas)
+CACHE_TTL = 300           # Segundos de validez de cada entrada
+
+
+class CacheConsultas:
+    """
+    Caché LRU con vencimiento (TTL) para lecturas de una fila por campo.
+    Las claves son (tabla, campo, valor) y se guarda la tupla leída de la base
+    (o None si no existía), así cada acierto arma un objeto nuevo.
+    Cada entrada recuerda la versión de la tabla con la que se leyó y solo
+    sirve mientras esa siga siendo la versión actual: una escritura desde
+    cualquier proceso la invalida, y una lectura que se cruzó con una
+    escritura queda guardada con una versión vieja.
+    """
+
+    def __init__(self, capacidad=CACHE_CAPACIDAD, ttl=CACHE_TTL):
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self.aciertos = 0
+        self.fallos = 0
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave, version):
+        """Devuelve (encontrado, registro)"""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None and entrada[1] == version and entrada[2] > time.monotonic():
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                return True, entrada[0]
+            if entrada is not None:
+                del self._datos[clave]
+            self.fallos += 1
+            return False, None
+
+    def guardar(self, clave, registro, version):
+        """Guarda el registro leído con la versión 'version' de la tabla"""
+        with self._lock:
+            self._datos[clave] = (registro, version, time.monotonic() + self.ttl)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+
+    def invalidar(self, tabla):
+        """Descarta todas las entradas de la tabla"""
+        with self._lock:
+            for clave in [c for c in self._datos if c[0] == tabla]:
+                del self._datos[clave]
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else None,
+                'entradas': len(self._datos),
+                'capacidad': self.capacidad,
+                'ttl': self.ttl,
+            }
+
+
+versiones = VersionesTablas()
+cache = CacheConsultas()
+metricas = MetricasConsultas()
+sentencias = SentenciasSQL()
+
+# Escritura en una tabla: registros afectados (None si no se conocen) y
+# versión de la tabla antes y después de escribir
+Cambio = namedtuple('Cambio', ['modelo', 'ids', 'version_anterior', 'version'])
+
+# Resultado de cada registro de una escritura en lote: id y mensaje de
+# error (None si se escribió)
+ResultadoLote = namedtuple('ResultadoLote', ['id', 'error'])
+
+NO_EXISTE = 'No existe el registro.'
+
+
+class TandaFallida(Exception):
+    """Una escritura en lote falló; deshace el savepoint de la tanda"""
+
+
+class LecturaFallida(Exception):
+    """No se pudo leer de la base (para no responder como si no hubiera registros)"""
+
 
-class Tabla:
+class ModeloTabla(type):
+    """
+    Metaclase de Tabla: cada modelo que declara 'campos' guarda sus columnas
+    (y la de versión, si tiene) en __slots__ en lugar de un __dict__ por
+    instancia, lo que achica cada registro leído de la base y abarata armar
+    muchos por consulta.
+    """
 
-    # Creación de la tabla
-    def __init__(self, nombre, conexion, campos):
-        self.tabla = nombre
-        self.conexion = conexion
-        self.campos = campos
+    def __new__(mcls, nombre, bases, espacio):
+        if 'campos' in espacio:
+            version = espacio.get('campo_version')
+            espacio['_campos_dict'] = tuple(espacio['campos']) + ((version,) if version else ())
+            if '__slots__' not in espacio:
+                espacio['__slots__'] = espacio['_campos_dict']
+        clase = super().__new__(mcls, nombre, bases, espacio)
+        if 'campos' in espacio:
+            clase._leer_campos = staticmethod(attrgetter(*clase._campos_dict))
+        return clase
+
+
+class Tabla(metaclass=ModeloTabla):
+
+    __slots__ = ()
+
+    # Relaciones de la tabla: {nombre: (campo_fk, clase_relacionada)}
+    relaciones = {}
+
+    # Campos guardados como texto que se comparan como números en los rangos
+    campos_numericos = ()
+
+    # Campos con índice único en la base: un alta repetida falla por ellos
+    campos_unicos = ()
+
+    # Columna entera (después de 'campos') que sube en cada modificación, para
+    # el control de concurrencia optimista; None si la tabla no la tiene
+    campo_version = None
+
+    # Las tablas de referencia (pocas escrituras) guardan sus lecturas en caché
+    usar_cache = False
+    cache = cache
+    versiones = versiones
+    metricas = metricas
+    sentencias = sentencias
+
+    # Referencias débiles a los métodos que se llaman con un Cambio después
+    # de cada escritura (ver observar())
+    observadores = []
+
+    @staticmethod
+    def observar(metodo):
+        """
+        Registra un método como observador de las escrituras de todos los
+        modelos. Se guarda una referencia débil: deja de recibir avisos
+        cuando se descarta su objeto (p. ej. las vistas de una aplicación
+        que ya no se usa), sin tener que darlo de baja.
+        """
+        Tabla.observadores.append(weakref.WeakMethod(metodo))
 
     # CRUD
     def crear(self, valores, de_bbdd=False):
         """
-        Si de_bbdd=True, 'valores' viene como (registro_tuple,)
+        Si de_bbdd=True, 'valores' viene como (registro_tuple,), con las
+        columnas de _campos_dict en ese orden (las consultas las nombran)
         Si de_bbdd=False, 'valores' viene como tuple de valores (sin id)
         """
         if de_bbdd:
             registros = valores[0]
             for campo, valor in zip(self.campos, registros):
                 setattr(self, campo, valor)
+            if self.campo_version and len(registros) > len(self.campos):
+                setattr(self, self.campo_version, registros[len(self.campos)])
         else:
             for campo, valor in zip(self.campos[1:], valores):
                 setattr(self, campo, valor)
 
+    def a_dict(self):
+        """
+        Diccionario {campo: valor} con los campos asignados del registro
+        (y la versión, si se leyó de la base)
+        """
+        try:
+            return dict(zip(self._campos_dict, self._leer_campos(self)))
+        except AttributeError:
+            # Registro armado a mano con menos valores que campos
+            return {campo: getattr(self, campo)
+                    for campo in self._campos_dict if hasattr(self, campo)}
+
+    @classmethod
+    def transaccion(cls):
+        """
+        Bloque 'with' en el que las escrituras de todos los modelos usan una
+        sola conexión y se confirman con un único commit al salir (o se
+        deshacen todas si el bloque lanza una excepción). Anidado es un
+        savepoint; la Transaccion devuelta también los da con punto().
+        """
+        return cls.conexion.transaccion()
+
     def guardar_db(self):
         """
         Inserta el registro y devuelve el id (int) si fue posible,
         o False en caso de error.
         """
-        cols = list(self.campos[1:])
-        cols_sql = ", ".join(f"`{c}`" for c in cols)
-        placeholders = ", ".join(["%s"] * len(cols))
-        consulta = f"INSERT INTO {self.tabla} ({cols_sql}) VALUES ({placeholders});"
+        cols = self.campos[1:]
+        consulta = self.sentencias.insertar(self.tabla, cols)
         datos = tuple(getattr(self, c) for c in cols)
 
         logger.debug(f"guardar_db() - Consulta: {consulta}")
         logger.debug(f"guardar_db() - Datos: {datos}")
 
-        rta_db = self.__conectar(consulta, datos)
+        rta_db = self.__conectar(consulta, datos, preparada=True)
+        self.__registrar_escritura(
+            [rta_db] if isinstance(rta_db, int) and not isinstance(rta_db, bool) else None)
 
         # __conectar devuelve el last_id (int) o False
         if rta_db is False or isinstance(rta_db, bool):
@@ -56,40 +239,468 @@ class Tabla:
             logger.error(f"Error convirtiendo resultado a int: {e}")
             return False
 
+    @classmethod
+    def guardar_lote(cls, registros):
+        """
+        Inserta varios registros con un solo executemany y un único commit.
+        Devuelve la cantidad de filas insertadas o False en caso de error.
+        """
+        if not registros:
+            return 0
+
+        cols = cls.campos[1:]
+        consulta = cls.sentencias.insertar(cls.tabla, cols)
+        datos = [tuple(getattr(r, c) for c in cols) for r in registros]
+
+        logger.debug(f"guardar_lote() - Consulta: {consulta}")
+        logger.debug(f"guardar_lote() - Registros: {len(datos)}")
+
+        rta_db = cls.__conectar(consulta, datos, lote=True)
+        cls.__registrar_escritura()
+
+        if rta_db is False:
+            logger.error(f"guardar_lote() falló para tabla {cls.tabla}")
+        return rta_db
+
+    @classmethod
+    def crear_lote(cls, registros):
+        """
+        Inserta los registros en tandas de TAMANIO_LOTE_ESCRITURA, cada una
+        con un INSERT de varias filas y su propio commit. Devuelve una lista
+        paralela de ResultadoLote con el id asignado a cada registro.
+        Los ids salen del primero que devuelve MySQL: a un INSERT de varias
+        filas sin id explícito InnoDB le reserva ids consecutivos, separados
+        por @@auto_increment_increment. Si ese paso no es 1 (p. ej. en una
+        réplica multi-origen) los registros se insertan de a uno.
+        Si una tanda falla (no se escribe nada de ella) se reintenta registro
+        por registro, en una transacción, para informar cuáles fallan.
+        """
+        cols = list(cls.campos[1:])
+        cols_sql = ", ".join(f"`{c}`" for c in cols)
+        fila_q = "(" + ", ".join(["%s"] * len(cols)) + ")"
+        resultados = []
+        consecutivos = cls.__ids_consecutivos()
+
+        for inicio in range(0, len(registros), TAMANIO_LOTE_ESCRITURA):
+            tanda = registros[inicio:inicio + TAMANIO_LOTE_ESCRITURA]
+            if not consecutivos:
+                resultados += cls.__crear_de_a_uno(tanda)
+                continue
+
+            consulta = (f"INSERT INTO {cls.tabla} ({cols_sql}) VALUES "
+                        + ", ".join([fila_q] * len(tanda)) + ";")
+            datos = tuple(getattr(r, c) for r in tanda for c in cols)
+
+            primer_id = cls.__conectar(consulta, datos)
+            if primer_id is True:
+                # Insertada, pero el driver no informó el id
+                cls.__registrar_escritura()
+                resultados += [ResultadoLote(None, None)] * len(tanda)
+                continue
+            if primer_id is not False:
+                ids = list(range(primer_id, primer_id + len(tanda)))
+                cls.__registrar_escritura(ids)
+                resultados += [ResultadoLote(id, None) for id in ids]
+                continue
+
+            logger.error(f"crear_lote() - Falló una tanda de {len(tanda)} en {cls.tabla}, "
+                         "se reintenta de a uno")
+            resultados += cls.__crear_de_a_uno(tanda)
+
+        return resultados
+
+    @classmethod
+    def modificar_lote(cls, registros):
+        """
+        Modifica varios registros: 'registros' es una lista de diccionarios
+        con 'id' y los campos a cambiar. Los que cambian los mismos campos se
+        escriben con un executemany por tanda de TAMANIO_LOTE_ESCRITURA, en
+        una transacción cada una. Devuelve una lista paralela de ResultadoLote.
+        """
+        existentes = cls.ids_existentes(r['id'] for r in registros)
+        resultados = [ResultadoLote(r['id'], None if r['id'] in existentes else NO_EXISTE)
+                      for r in registros]
+
+        grupos = {}
+        for indice, registro in enumerate(registros):
+            if registro['id'] in existentes:
+                campos = tuple(c for c in registro if c in cls.campos and c != 'id')
+                grupos.setdefault(campos, []).append(indice)
+
+        for campos, indices in grupos.items():
+            if not campos:
+                continue
+            consulta = cls.sentencias.modificar(cls.tabla, campos, cls.campo_version)
+            for inicio in range(0, len(indices), TAMANIO_LOTE_ESCRITURA):
+                tanda = indices[inicio:inicio + TAMANIO_LOTE_ESCRITURA]
+                datos = [tuple(registros[i][c] for c in campos) + (registros[i]['id'],)
+                         for i in tanda]
+                ids = [registros[i]['id'] for i in tanda]
+
+                if cls.__escribir_tanda(consulta, datos) is False:
+                    logger.error(f"modificar_lote() - Falló una tanda de {len(tanda)} en "
+                                 f"{cls.tabla}, se reintenta de a uno")
+                    with cls.transaccion():
+                        for i, fila in zip(tanda, datos):
+                            if cls.__conectar(consulta, fila) is False:
+                                resultados[i] = ResultadoLote(
+                                    registros[i]['id'], 'No se pudo modificar el registro. '
+                                    'Verifique que las relaciones (IDs) existan.')
+                cls.__registrar_escritura(ids)
+
+        return resultados
+
+    @classmethod
+    def __columnas_sql(cls):
+        """Columnas de _campos_dict para un SELECT que arma registros"""
+        return ", ".join(f"`{c}`" for c in cls._campos_dict)
+
+    @classmethod
+    def __crear_de_a_uno(cls, tanda):
+        """Inserta los registros de a uno, en una transacción; devuelve sus ResultadoLote"""
+        resultados = []
+        with cls.transaccion():
+            for registro in tanda:
+                id = registro.guardar_db()
+                resultados.append(ResultadoLote(id, None) if id is not False else
+                                  ResultadoLote(None, 'No se pudo crear el registro.'))
+        return resultados
+
+    @classmethod
+    def __ids_consecutivos(cls):
+        """
+        Si un INSERT de varias filas recibe ids consecutivos: lee una vez
+        @@auto_increment_increment. Si no se puede leer se asume que no.
+        """
+        consecutivos = cls.__dict__.get('_ids_consecutivos')
+        if consecutivos is None:
+            rta_db = cls.__conectar("SELECT @@auto_increment_increment;")
+            if not rta_db:
+                return False
+            consecutivos = cls._ids_consecutivos = int(rta_db[0][0]) == 1
+            if not consecutivos:
+                logger.warning(f"auto_increment_increment = {rta_db[0][0]}: "
+                               f"crear_lote() inserta de a un registro en {cls.tabla}")
+        return consecutivos
+
+    @classmethod
+    def __escribir_tanda(cls, consulta, datos):
+        """
+        executemany de una tanda de UPDATE, que el driver corre fila por fila.
+        Fuera de una transacción, si falla una fila se deshacen las demás con
+        el rollback; dentro, las anteriores quedarían aplicadas (y el reintento
+        de a uno subiría dos veces su versión), así que la tanda va en un
+        savepoint que se deshace si falla. Devuelve False si falló.
+        """
+        transaccion = cls.conexion.transaccion_actual()
+        if transaccion is None:
+            return cls.__conectar(consulta, datos, lote=True)
+        try:
+            with transaccion.punto():
+                rta_db = cls.__conectar(consulta, datos, lote=True)
+                if rta_db is False:
+                    raise TandaFallida()
+        except TandaFallida:
+            return False
+        return rta_db
+
+    @classmethod
+    def eliminar_lote(cls, ids):
+        """
+        Elimina los registros con un 'DELETE ... WHERE id IN (...)' por tanda
+        de TAMANIO_LOTE_ESCRITURA. Devuelve una lista paralela de ResultadoLote.
+        Si una tanda falla (p. ej. un registro todavía referenciado) se
+        reintenta de a uno, en una transacción, para informar cuáles no se
+        pudieron eliminar.
+        """
+        existentes = cls.ids_existentes(ids)
+        resultados = [ResultadoLote(id, None if id in existentes else NO_EXISTE) for id in ids]
+        a_eliminar = list(dict.fromkeys(id for id in ids if id in existentes))
+        errores = set()
+
+        for inicio in range(0, len(a_eliminar), TAMANIO_LOTE_ESCRITURA):
+            tanda = a_eliminar[inicio:inicio + TAMANIO_LOTE_ESCRITURA]
+            placeholders = ", ".join(["%s"] * len(tanda))
+            consulta = f"DELETE FROM {cls.tabla} WHERE id IN ({placeholders});"
+            if cls.__conectar(consulta, tuple(tanda)) is False:
+                logger.error(f"eliminar_lote() - Falló una tanda de {len(tanda)} en "
+                             f"{cls.tabla}, se reintenta de a uno")
+                consulta = cls.sentencias.eliminar(cls.tabla)
+                with cls.transaccion():
+                    errores.update(id for id in tanda if cls.__conectar(consulta, (id,)) is False)
+            cls.__registrar_escritura(tanda)
+
+        return [ResultadoLote(r.id, 'No se pudo eliminar el registro.') if r.id in errores else r
+                for r in resultados]
+
+    @classmethod
+    def ids_existentes(cls, ids):
+        """Conjunto de los 'ids' que existen en la tabla"""
+        ids = list({id for id in ids if id is not None})
+        existentes = set()
+        for inicio in range(0, len(ids), TAMANIO_LOTE_IN):
+            lote = ids[inicio:inicio + TAMANIO_LOTE_IN]
+            placeholders = ", ".join(["%s"] * len(lote))
+            consulta = f"SELECT id FROM {cls.tabla} WHERE id IN ({placeholders});"
+            rta_db = cls.__conectar(consulta, tuple(lote))
+            if rta_db:
+                existentes.update(fila[0] for fila in rta_db)
+        return existentes
+
     @classmethod
     def obtener(cls, campo=None, valor=None):
 
         if campo is None or valor is None:
-            consulta = f"SELECT * FROM {cls.tabla};"
+            consulta = cls.sentencias.obtener(cls.tabla, cls._campos_dict)
             rta_db = cls.__conectar(consulta)
             if rta_db is not False and rta_db:
                 return [cls(registro, de_bbdd=True) for registro in rta_db]
             else:
                 return []
         else:
-            consulta = f"SELECT * FROM {cls.tabla} WHERE {campo} = %s;"
-            rta_db = cls.__conectar(consulta, (valor,))
+            usar_cache = cls.__usar_cache()
+            if usar_cache:
+                version = cls.versiones.version(cls.tabla)
+                encontrado, registro = cls.cache.obtener((cls.tabla, campo, valor), version)
+                if encontrado:
+                    return cls(registro, de_bbdd=True) if registro else None
+
+            consulta = cls.sentencias.obtener(cls.tabla, cls._campos_dict, campo)
+            rta_db = cls.__conectar(consulta, (valor,), preparada=True)
+            if usar_cache and rta_db is not False:
+                cls.cache.guardar((cls.tabla, campo, valor),
+                                  rta_db[0] if rta_db else None, version)
             if rta_db is not False and rta_db:
                 return cls(rta_db[0], de_bbdd=True)
             else:
                 return None
 
     @classmethod
-    def eliminar(cls, id):
-        consulta = f"DELETE FROM {cls.tabla} WHERE id = %s ;"
-        logger.debug(f"eliminar() - Consulta: {consulta}, ID: {id}")
-        rta_db = cls.__conectar(consulta, (id,))
+    def listar(cls, filtros=None, after_id=None, limit=LIMITE_PAGINA,
+               orden='id', descendente=False, columnas=None, estricto=False):
+        """
+        Devuelve una página de registros con paginación por cursor (keyset):
+        hasta 'limit' registros posteriores al registro 'after_id' según 'orden'.
+        'filtros' es un diccionario {campo: valor} para igualdad, o con claves
+        'campo_min' / 'campo_max' para rangos. Los nombres se validan contra
+        'campos' (ValueError si no existen) y todo se resuelve en el SQL.
+        Con 'columnas' se leen solo esas y se devuelven tuplas, como en
+        obtener_columnas(), en lugar de registros.
+        Si se ordena por otro campo que id, 'after_id' tiene que existir
+        (ValueError si no): de él sale el valor de 'orden' donde sigue la página.
+        Si la consulta falla devuelve una lista vacía, o None con estricto=True.
+        """
+        if orden not in cls.campos:
+            raise ValueError(f"No se puede ordenar por '{orden}'")
+
+        condiciones = []
+        datos = []
+        for clave, valor in (filtros or {}).items():
+            campo, operador = clave, '='
+            if clave not in cls.campos:
+                campo, _, sufijo = clave.rpartition('_')
+                operador = {'min': '>=', 'max': '<='}.get(sufijo)
+                if campo not in cls.campos or operador is None:
+                    raise ValueError(f"No se puede filtrar por '{clave}'")
+
+            columna = f"`{campo}`"
+            if operador != '=' and campo in cls.campos_numericos:
+                columna = f"CAST({columna} AS DECIMAL(10, 2))"
+            condiciones.append(f"{columna} {operador} %s")
+            datos.append(valor)
+
+        sentido = 'DESC' if descendente else 'ASC'
+        comparador = '<' if descendente else '>'
+        if orden == 'id':
+            orden_q = f"id {sentido}"
+            if after_id is not None:
+                condiciones.append(f"id {comparador} %s")
+                datos.append(after_id)
+        else:
+            # Se ordena por (orden, id) y el cursor se ubica con el valor
+            # de 'orden' del registro after_id. MySQL pone los NULL primero
+            # en orden ascendente y últimos en descendente, y una comparación
+            # con NULL no es verdadera: esas filas se comparan aparte
+            orden_q = f"`{orden}` {sentido}, id {sentido}"
+            if after_id is not None:
+                rta_db = cls.__conectar(
+                    f"SELECT `{orden}` FROM {cls.tabla} WHERE id = %s;", (after_id,))
+                if rta_db is False:
+                    return None if estricto else []
+                if not rta_db:
+                    raise ValueError(f"No existe el registro 'after_id' {after_id}")
+                valor = rta_db[0][0]
+                if valor is None:
+                    siguientes = f"`{orden}` IS NULL AND id {comparador} %s"
+                    datos.append(after_id)
+                    if not descendente:
+                        siguientes += f" OR `{orden}` IS NOT NULL"
+                else:
+                    siguientes = f"(`{orden}`, id) {comparador} (%s, %s)"
+                    datos += [valor, after_id]
+                    if descendente:
+                        siguientes += f" OR `{orden}` IS NULL"
+                condiciones.append(f"({siguientes})")
+
+        where_q = " WHERE " + " AND ".join(condiciones) if condiciones else ""
+        cols_q = ", ".join(f"`{c}`" for c in columnas) if columnas else cls.__columnas_sql()
+        consulta = f"SELECT {cols_q} FROM {cls.tabla}{where_q} ORDER BY {orden_q} LIMIT %s;"
+        datos.append(limit)
+
+        logger.debug(f"listar() - Consulta: {consulta}")
+        logger.debug(f"listar() - Datos: {datos}")
+
+        rta_db = cls.__conectar(consulta, tuple(datos))
+        if rta_db is False and estricto:
+            return None
+        if columnas:
+            return rta_db if rta_db is not False and rta_db else []
+        if rta_db is not False and rta_db:
+            return [cls(registro, de_bbdd=True) for registro in rta_db]
+        return []
+
+    @classmethod
+    def obtener_en(cls, campo, valores):
+        """
+        Devuelve los registros cuyo 'campo' está entre 'valores', resolviendo
+        todos con consultas 'WHERE campo IN (...)' por lotes en lugar de una
+        consulta por valor.
+        """
+        valores = list({v for v in valores if v is not None})
+        encontrados = []
 
-        if rta_db:
-            return 'Eliminación exitosa.'
+        # Por id cada valor es una sola fila: se consultan solo los que no están en caché
+        por_cache = campo == 'id' and cls.__usar_cache()
+        if por_cache:
+            version = cls.versiones.version(cls.tabla)
+            faltantes = []
+            for valor in valores:
+                encontrado, registro = cls.cache.obtener((cls.tabla, campo, valor), version)
+                if not encontrado:
+                    faltantes.append(valor)
+                elif registro:
+                    encontrados.append(cls(registro, de_bbdd=True))
+            valores = faltantes
+
+        for inicio in range(0, len(valores), TAMANIO_LOTE_IN):
+            lote = valores[inicio:inicio + TAMANIO_LOTE_IN]
+            placeholders = ", ".join(["%s"] * len(lote))
+            consulta = (f"SELECT {cls.__columnas_sql()} FROM {cls.tabla} "
+                        f"WHERE `{campo}` IN ({placeholders});")
+            rta_db = cls.__conectar(consulta, tuple(lote))
+            if rta_db is not False and rta_db:
+                encontrados += [cls(registro, de_bbdd=True) for registro in rta_db]
+            if por_cache and rta_db is not False:
+                leidos = {registro[0]: registro for registro in rta_db}
+                for valor in lote:
+                    cls.cache.guardar((cls.tabla, campo, valor), leidos.get(valor), version)
 
-        return 'No se pudo eliminar el registro.'
+        return encontrados
+
+    @classmethod
+    def obtener_por_ids(cls, ids):
+        """Devuelve un diccionario {id: registro} para los ids pedidos"""
+        return {registro.id: registro for registro in cls.obtener_en('id', ids)}
+
+    @classmethod
+    def obtener_columnas(cls, *campos, estricto=False):
+        """
+        Devuelve solo las columnas pedidas de todos los registros, como lista
+        de tuplas, sin construir un objeto por fila.
+        Si la consulta falla devuelve una lista vacía, o None con
+        estricto=True (para distinguir el error de una tabla vacía).
+        """
+        cols_sql = ", ".join(f"`{c}`" for c in campos)
+        consulta = f"SELECT {cols_sql} FROM {cls.tabla};"
+        rta_db = cls.__conectar(consulta)
+        if rta_db is False:
+            return None if estricto else []
+        return rta_db or []
+
+    @classmethod
+    def recorrer_columnas(cls, *campos, tamanio=TAMANIO_LECTURA):
+        """
+        Igual que obtener_columnas() pero sin cargar la tabla en memoria:
+        genera listas de hasta 'tamanio' tuplas, en orden de id, leídas de un
+        cursor sin buffer. La conexión queda ocupada hasta terminar de
+        recorrer; si se abandona antes, el pool la descarta.
+        """
+        cols_sql = ", ".join(f"`{c}`" for c in campos)
+        consulta = f"SELECT {cols_sql} FROM {cls.tabla} ORDER BY id;"
+        inicio = time.perf_counter()
+        filas = 0
+        try:
+            with cls.conexion.prestar() as conexion:
+                cursor = conexion.cursor(buffered=False)
+                cursor.execute(consulta)
+                while True:
+                    lote = cursor.fetchmany(tamanio)
+                    if not lote:
+                        break
+                    filas += len(lote)
+                    yield lote
+                cursor.close()
+        except Exception:
+            cls.metricas.registrar_consulta(
+                cls.tabla, consulta, time.perf_counter() - inicio, error=True)
+            raise
+        cls.metricas.registrar_consulta(cls.tabla, consulta, time.perf_counter() - inicio, filas)
+
+    @classmethod
+    def cargar_relaciones(cls, registros):
+        """
+        Resuelve las relaciones declaradas en 'relaciones' para una lista de registros.
+        Hace una consulta por tabla relacionada (no una por registro) y devuelve
+        una lista paralela de diccionarios {nombre_relacion: registro o None}.
+        """
+        cargados = {
+            nombre: clase.obtener_por_ids(getattr(r, campo) for r in registros)
+            for nombre, (campo, clase) in cls.relaciones.items()
+        }
+
+        return [
+            {nombre: cargados[nombre].get(getattr(registro, campo))
+             for nombre, (campo, _) in cls.relaciones.items()}
+            for registro in registros
+        ]
+
+    @classmethod
+    def obtener_con_relaciones(cls, **listado):
+        """
+        Devuelve los registros junto con sus relaciones como lista de tuplas
+        (registro, {nombre_relacion: registro o None}). Sin argumentos trae
+        todos los registros; con argumentos de listar() trae esa página.
+        """
+        registros = cls.listar(**listado) if listado else cls.obtener()
+        return list(zip(registros, cls.cargar_relaciones(registros)))
 
     @classmethod
-    def modificar(cls, registro):
-        update_q = f"UPDATE {cls.tabla} "
-        set_q = 'SET '
+    def eliminar(cls, id, version=None):
+        """
+        Elimina el registro en una sola consulta y devuelve las filas
+        eliminadas (0 si no existe o, con 'version', si ya no tiene esa
+        versión) o False en caso de error.
+        """
+        id = int(id) if type(id) != int else id
+        con_version = version is not None and cls.campo_version is not None
+        consulta = cls.sentencias.eliminar(cls.tabla, cls.campo_version, con_version)
+        datos = (id, version) if con_version else (id,)
+        logger.debug(f"eliminar() - Consulta: {consulta}, Datos: {datos}")
 
+        filas = cls.__conectar(consulta, datos, preparada=True)
+        if filas:
+            cls.__registrar_escritura([id])
+        return filas
+
+    @classmethod
+    def modificar(cls, registro, version=None):
+        """
+        Modifica los campos de 'registro' (diccionario con 'id') en una sola
+        consulta. Con 'version' solo modifica si el registro sigue en esa
+        versión (concurrencia optimista); la versión sube en cada cambio.
+        Devuelve las filas modificadas (0 si no existe o cambió de versión)
+        o False en caso de error.
+        """
         id_val = registro.pop('id')
         id_val = int(id_val) if type(id_val) != int else id_val
 
@@ -100,59 +711,157 @@ class Tabla:
             logger.error(f"modificar() - No hay campos válidos para actualizar en {cls.tabla}")
             logger.error(f"Campos recibidos: {list(registro.keys())}")
             logger.error(f"Campos de la tabla: {cls.campos}")
-            return 'No se pudo modificar el registro.'
+            return False
 
-        set_q += ", ".join(f"`{c}` = %s" for c in campos_validos)
-        where_q = f" WHERE id = %s;"
-        consulta = update_q + set_q + where_q
+        con_version = version is not None and cls.campo_version is not None
+        consulta = cls.sentencias.modificar(
+            cls.tabla, tuple(campos_validos), cls.campo_version, con_version)
         nvos_datos = tuple([registro[c] for c in campos_validos] + [id_val])
+        if con_version:
+            nvos_datos += (version,)
         
         logger.debug(f"modificar() - Consulta: {consulta}")
         logger.debug(f"modificar() - Datos: {nvos_datos}")
         logger.debug(f"modificar() - Campos actualizados: {campos_validos}")
         
-        rta_db = cls.__conectar(consulta, nvos_datos)
+        filas = cls.__conectar(consulta, nvos_datos, preparada=True)
+        if filas:
+            cls.__registrar_escritura([id_val])
+        return filas
+
+    @classmethod
+    def __usar_cache(cls):
+        """
+        Dentro de una transacción no se usa la caché: tendría lo anterior a
+        las escrituras de la transacción, y lo leído puede no confirmarse.
+        """
+        return cls.usar_cache and cls.conexion.transaccion_actual() is None
+
+    @classmethod
+    def __registrar_escritura(cls, ids=None):
+        """
+        Sube la versión de la tabla tras una escritura (lo que invalida las
+        ETags de la API y las lecturas en caché) y avisa a los observadores.
+        'ids' son los registros afectados, o None si no se conocen.
+        Dentro de una transacción se avisa una vez por tabla después del
+        commit: antes, otro proceso podría guardar en caché con la versión
+        nueva lo que todavía no cambió.
+        """
+        transaccion = cls.conexion.transaccion_actual()
+        if transaccion is None:
+            cls.__avisar_escritura(ids)
+            return
 
-        if rta_db:
-            return 'Modificación exitosa.'
+        pendientes = transaccion.pendientes
+        if not pendientes:
+            transaccion.al_confirmar(lambda: Tabla.__avisar_pendientes(pendientes))
+        if cls in pendientes:
+            anteriores = pendientes[cls]
+            pendientes[cls] = None if anteriores is None or ids is None else anteriores + list(ids)
         else:
-            return 'No se pudo modificar el registro. Verifique que las relaciones (IDs) existan.'
+            pendientes[cls] = None if ids is None else list(ids)
+
+    @staticmethod
+    def __avisar_pendientes(pendientes):
+        for modelo, ids in pendientes.items():
+            modelo.__avisar_escritura(ids)
 
     @classmethod
-    def __conectar(cls, consulta, datos=None):
+    def __avisar_escritura(cls, ids):
+        anterior, version = cls.versiones.incrementar(cls.tabla)
+        if cls.usar_cache:
+            cls.cache.invalidar(cls.tabla)
+
+        cambio = Cambio(cls, ids, anterior, version)
+        for referencia in list(Tabla.observadores):
+            observador = referencia()
+            if observador is None:
+                try:
+                    Tabla.observadores.remove(referencia)
+                except ValueError:
+                    pass   # Lo quitó otro hilo
+                continue
+            try:
+                observador(cambio)
+            except Exception:
+                logger.exception(f"Error notificando la escritura en {cls.tabla}")
+
+    @classmethod
+    def __conectar(cls, consulta, datos=None, lote=False, preparada=False):
         """
-        Ejecuta la consulta y devuelve:
-         - Para SELECT: lista de tuplas o False si no hay resultado
+        Ejecuta la consulta con una conexión prestada por el pool y devuelve:
+         - Para SELECT: lista de tuplas (vacía si no hay resultado) o False en error
          - Para INSERT: last_insert_id (int) o False en error
-         - Para UPDATE/DELETE: True si ejecutó correctamente o False en error
-        No cierra la conexión global; solo cierra cursores.
+         - Para UPDATE/DELETE: filas encontradas (int) o False en error
+         - Con lote=True ('datos' es una lista de tuplas): filas afectadas
+           por el executemany o False en error
+        Con preparada=True la consulta (que tiene que venir de 'sentencias')
+        se ejecuta como sentencia preparada en el servidor, si el driver lo
+        admite; el cursor queda guardado en el pool para la próxima vez.
+        La conexión vuelve al pool al terminar; solo se cierran cursores.
+        Dentro de Tabla.transaccion() no se hace commit: lo hace el bloque.
+        Cada consulta se registra en las métricas (latencia, filas y huella).
         """
+        inicio = time.perf_counter()
+        transaccion = cls.conexion.transaccion_actual()
         try:
-            cursor = cls.conexion.cursor()
-        except Exception:
-            # intentar reconectar si el objeto ofrece connect()
-            try:
-                cls.conexion.connect()
-                cursor = cls.conexion.cursor()
-            except Exception as e:
-                logger.exception("No se pudo obtener cursor")
-                return False
+            with cls.conexion.prestar() as conexion:
+                cursor = cls.conexion.cursor_preparado(conexion, consulta) if preparada else None
+                try:
+                    resultado, filas = cls.__ejecutar(
+                        conexion, consulta, datos, lote, cursor, confirmar=transaccion is None)
+                except Exception:
+                    if cursor is not None:
+                        cls.conexion.descartar_preparado(conexion, consulta)
+                    raise
+        except Exception as e:
+            if transaccion is not None:
+                transaccion.anotar_error(e)
+            cls.metricas.registrar_consulta(
+                cls.tabla, consulta, time.perf_counter() - inicio, error=True)
+            logger.exception("Error ejecutando consulta SQL")
+            return False
+        cls.metricas.registrar_consulta(cls.tabla, consulta, time.perf_counter() - inicio, filas)
+        return resultado
+
+    @staticmethod
+    def __ejecutar(conexion, consulta, datos=None, lote=False, cursor=None, confirmar=True):
+        """
+        Devuelve (resultado según __conectar, filas devueltas o afectadas).
+        Un 'cursor' recibido (preparado) no se cierra: lo conserva el pool.
+        Con confirmar=False (dentro de una transacción) no hace commit y, si
+        falla, no hace rollback: MySQL ya deshizo la sentencia y lo anterior
+        de la transacción se conserva.
+        """
+        propio = cursor is None
+        if propio:
+            cursor = conexion.cursor()
 
         try:
             sql_upper = consulta.strip().upper()
-            if sql_upper.startswith('SELECT'):
+            if lote:
+                cursor.executemany(consulta, datos)
+                filas = cursor.rowcount
+                if confirmar:
+                    conexion.commit()
+                if propio:
+                    cursor.close()
+                return filas, filas
+            elif sql_upper.startswith('SELECT'):
                 if datos is not None:
                     cursor.execute(consulta, datos)
                 else:
                     cursor.execute(consulta)
                 rows = cursor.fetchall()
-                cursor.close()
-                return rows if rows else False
+                if propio:
+                    cursor.close()
+                return rows, len(rows)
             else:
                 if datos is not None:
                     cursor.execute(consulta, datos)
                 else:
                     cursor.execute(consulta)
+                filas = cursor.rowcount
 
                 # INSERT -> intentar obtener lastrowid
                 if sql_upper.startswith('INSERT'):
@@ -160,39 +869,47 @@ class Tabla:
                     try:
                         last_id = getattr(cursor, 'lastrowid', None)
                         if not last_id:
-                            cursor.execute("SELECT LAST_INSERT_ID();")
-                            res = cursor.fetchone()
+                            # En otro cursor: el preparado queda con su sentencia
+                            auxiliar = conexion.cursor()
+                            auxiliar.execute("SELECT LAST_INSERT_ID();")
+                            res = auxiliar.fetchone()
+                            auxiliar.close()
                             if res:
                                 last_id = res[0]
                     except Exception:
                         last_id = None
 
                     try:
-                        cls.conexion.commit()
+                        if confirmar:
+                            conexion.commit()
                     except Exception:
                         logger.exception("Error en commit después de INSERT")
 
-                    cursor.close()
-                    return last_id if last_id is not None else True
+                    if propio:
+                        cursor.close()
+                    return (last_id if last_id is not None else True), filas
 
-                # UPDATE/DELETE -> commit y devolver True si no hubo error
+                # UPDATE/DELETE -> commit y devolver las filas encontradas
                 else:
                     try:
-                        cls.conexion.commit()
+                        if confirmar:
+                            conexion.commit()
                     except Exception:
                         logger.exception(
                             "Error en commit después de UPDATE/DELETE")
-                    cursor.close()
-                    return True
+                    if propio:
+                        cursor.close()
+                    return filas, filas
 
         except Exception:
-            logger.exception("Error ejecutando consulta SQL")
             try:
-                cls.conexion.rollback()
+                if confirmar:
+                    conexion.rollback()
             except Exception:
                 pass
-            try:
-                cursor.close()
-            except Exception:
-                pass
-            return False
\ No newline at end of file
+            if propio:
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+            raise
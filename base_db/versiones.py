@@ -0,0 +1,86 @@
+import fcntl
+import hashlib
+import os
+import tempfile
+
+DIRECTORIO_VERSIONES = os.path.join(tempfile.gettempdir(), 'puntoferretero_versiones')
+
+
+class VersionesTablas:
+    """
+    Versión de cada tabla, que cambia con cada escritura hecha por Tabla.
+    La versión es un token aleatorio guardado en un archivo por tabla: leerlo
+    no toca la base y todos los procesos del servidor ven el mismo valor, así
+    una escritura en un worker invalida las respuestas de todos los demás.
+    El último token leído de cada tabla queda en memoria junto con el inodo
+    y la fecha de modificación del archivo: mientras un stat() dé lo mismo,
+    no se vuelve a abrir. Cada escritura reemplaza el archivo por otro
+    (inodo nuevo), así que el cambio se ve enseguida desde cualquier proceso.
+    """
+
+    def __init__(self, directorio=DIRECTORIO_VERSIONES):
+        self.directorio = directorio
+        self._leidas = {}     # tabla -> ((inodo, mtime en ns), token)
+        os.makedirs(directorio, exist_ok=True)
+
+    def version(self, tabla):
+        """Token de la versión actual de la tabla"""
+        ruta = self.__ruta(tabla)
+        try:
+            estado = os.stat(ruta)
+            firma = (estado.st_ino, estado.st_mtime_ns)
+            leida = self._leidas.get(tabla)
+            if leida is not None and leida[0] == firma:
+                return leida[1]
+            with open(ruta, encoding='ascii') as archivo:
+                # La firma sale del archivo abierto: si se reemplazó entre
+                # el stat() y el open(), se guarda con la del que se leyó
+                estado = os.fstat(archivo.fileno())
+                token = archivo.read()
+            if token:
+                self._leidas[tabla] = ((estado.st_ino, estado.st_mtime_ns), token)
+                return token
+        except FileNotFoundError:
+            pass
+        # Sin archivo (primer uso o se limpió el directorio): se arranca con
+        # un token nuevo, nunca con uno que un cliente ya pueda tener
+        return self.incrementar(tabla)[1]
+
+    def incrementar(self, tabla):
+        """
+        Registra una escritura en la tabla.
+        Devuelve (token anterior o None, token nuevo).
+        La lectura y el reemplazo van bajo un lock de archivo por tabla: sin
+        él dos workers leían el mismo anterior y cada uno tomaba su cambio
+        como el siguiente del otro.
+        """
+        ruta = self.__ruta(tabla)
+        with open(f"{ruta}.lock", 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                with open(ruta, encoding='ascii') as archivo:
+                    anterior = archivo.read() or None
+            except FileNotFoundError:
+                anterior = None
+
+            token = os.urandom(8).hex()
+            # Un temporal único por escritura: los lectores no toman el lock
+            # y tienen que ver siempre el archivo viejo o el nuevo completo
+            descriptor, temporal = tempfile.mkstemp(prefix=f"{tabla}.", suffix='.tmp', dir=self.directorio)
+            with os.fdopen(descriptor, 'w', encoding='ascii') as archivo:
+                archivo.write(token)
+            os.replace(temporal, ruta)
+        return anterior, token
+
+    def etag(self, recurso, actuales):
+        """
+        Valor de ETag para un recurso armado con las versiones 'actuales'
+        ({tabla: token}, leídas con version()) de las tablas de que depende
+        """
+        huella = hashlib.sha1(recurso.encode('utf-8'))
+        for tabla, token in actuales.items():
+            huella.update(f"|{tabla}:{token}".encode('ascii'))
+        return huella.hexdigest()
+
+    def __ruta(self, tabla):
+        return os.path.join(self.directorio, f"{tabla}.version")
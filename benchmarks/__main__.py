@@ -0,0 +1,118 @@
+"""
+Suite de benchmarks de la API y de la importación de planillas.
+
+Usa la base 'puntoferretero_bench' del servidor MySQL de config_dev (la
+crea si hace falta y la vacía en cada tamaño). Para cada tamaño de catálogo
+mide todas las rutas GET y de escritura de /api/*, y luego el tiempo de
+/subir con la planilla de ejemplo y con planillas generadas. También mide
+el arranque de un proceso nuevo de la aplicación. Los resultados
+se escriben en JSON para comparar entre commits:
+
+    python -m benchmarks --tamanios 1000,10000,100000 --salida resultados.json
+    python -m benchmarks.comparar antes.json despues.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import base
+
+
+def commit_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def lista_enteros(texto):
+    return [int(valor) for valor in texto.split(',') if valor.strip()]
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.splitlines()[1])
+    parser.add_argument('--tamanios', type=lista_enteros, default=[1000, 10000, 100000],
+                        help="Productos del catálogo sintético (separados por coma)")
+    parser.add_argument('--solicitudes', type=int, default=200, help="Solicitudes por ruta")
+    parser.add_argument('--concurrencia', type=int, default=1, help="Hilos que hacen solicitudes")
+    parser.add_argument('--wsgi', action='store_true',
+                        help="Medir contra un servidor WSGI local en lugar de en proceso")
+    parser.add_argument('--sin-escrituras', action='store_true')
+    parser.add_argument('--planillas', type=lista_enteros, default=[10000, 100000],
+                        help="Filas de las planillas generadas para /subir (0 para omitir)")
+    parser.add_argument('--sin-importacion', action='store_true')
+    parser.add_argument('--sin-arranque', action='store_true')
+    parser.add_argument('--salida', help="Archivo JSON de resultados (por defecto, salida estándar)")
+    opciones = parser.parse_args(argumentos)
+
+    # La base de benchmark tiene que existir y estar migrada antes de armar
+    # la aplicación (aquí y en los procesos que miden el arranque)
+    base.preparar(0)
+
+    if not opciones.sin_arranque:
+        from benchmarks.arranque import medir_arranque
+        print("Arranque de la aplicación...", file=sys.stderr)
+        arranque = medir_arranque()
+
+    from app import crear_app
+    from benchmarks.api import medir_api
+    from benchmarks.carga import ClienteHttp, ClienteInterno, ServidorLocal
+    from benchmarks.importacion import PLANILLA_EJEMPLO, generar_planilla, importar
+
+    app = crear_app()
+    app.config['UPLOAD_FOLDER'] = tempfile.mkdtemp(prefix='puntoferretero_bench_subidas_')
+
+    resultados = {
+        'commit': commit_actual(),
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'modo': 'wsgi' if opciones.wsgi else 'interno',
+        'solicitudes': opciones.solicitudes,
+        'concurrencia': opciones.concurrencia,
+        'api': [],
+        'importacion': [],
+    }
+    if not opciones.sin_arranque:
+        resultados['arranque'] = arranque
+
+    for tamanio in opciones.tamanios:
+        print(f"Catálogo de {tamanio} productos...", file=sys.stderr)
+        muestra = base.preparar(tamanio)
+        if opciones.wsgi:
+            with ServidorLocal(app) as servidor:
+                medidas = medir_api(ClienteHttp(servidor.url), muestra, opciones.solicitudes,
+                                    opciones.concurrencia, not opciones.sin_escrituras)
+        else:
+            medidas = medir_api(ClienteInterno(app), muestra, opciones.solicitudes,
+                                opciones.concurrencia, not opciones.sin_escrituras)
+        resultados['api'] += [{'productos': tamanio, **medida} for medida in medidas]
+
+    if not opciones.sin_importacion:
+        planillas = [PLANILLA_EJEMPLO] + [
+            generar_planilla(os.path.join(app.config['UPLOAD_FOLDER'], f'generada_{filas}.xlsx'), filas)
+            for filas in opciones.planillas if filas
+        ]
+        cliente = app.test_client()
+        for planilla in planillas:
+            print(f"Importando {os.path.basename(planilla)}...", file=sys.stderr)
+            base.preparar(0)
+            resultados['importacion'].append(importar(cliente, planilla))
+
+    texto = json.dumps(resultados, ensure_ascii=False, indent=2)
+    if opciones.salida:
+        with open(opciones.salida, 'w', encoding='utf-8') as archivo:
+            archivo.write(texto + '\n')
+    else:
+        print(texto)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Escenarios de la API: cada ruta GET y de escritura de /api/* con
+parámetros tomados del catálogo sintético.
+"""
+import json
+
+from benchmarks.carga import medir
+
+
+def lectura(ruta, encabezados=None):
+    def solicitud(cliente, n):
+        return cliente.pedir('GET', ruta, encabezados=encabezados)[0]
+    return solicitud
+
+
+def condicional(cliente, ruta):
+    """GET con la ETag vigente: mide la respuesta 304"""
+    _, encabezados, _ = cliente.pedir('GET', ruta)
+    return lectura(ruta, {'If-None-Match': encabezados.get('ETag', '')})
+
+
+def escenarios_lectura(cliente, muestra):
+    """(nombre, solicitud) de las rutas GET"""
+    producto = muestra['producto_id']
+    escenarios = [
+        ('GET /api/productos (catálogo)', lectura('/api/productos')),
+        ('GET /api/productos (catálogo gzip)',
+         lectura('/api/productos', {'Accept-Encoding': 'gzip'})),
+        ('GET /api/productos 304', condicional(cliente, '/api/productos')),
+        ('GET /api/productos?limit=100', lectura('/api/productos?limit=100')),
+        ('GET /api/productos?after_id&limit=100',
+         lectura(f'/api/productos?after_id={producto}&limit=100')),
+        ('GET /api/productos?cat_id&limit=100', lectura('/api/productos?cat_id=1&limit=100')),
+        ('GET /api/productos?orden=tit&limit=100',
+         lectura('/api/productos?orden=tit&dir=desc&limit=100')),
+        ('GET /api/productos?fields=tit,categoria&limit=1000',
+         lectura('/api/productos?fields=tit,categoria&limit=1000')),
+        ('GET /api/productos?fields=tit,cod (completo)', lectura('/api/productos?fields=tit,cod')),
+        ('GET /api/productos/<id>', lectura(f'/api/productos/{producto}')),
+        ('GET /api/productos/buscar', lectura(f"/api/productos/buscar?q={muestra['busqueda']}")),
+        ('GET /api/productos/buscar (prefijo)',
+         lectura(f"/api/productos/buscar?q={muestra['busqueda'][:3]}")),
+        ('GET /api/productos/codigo/<art>', lectura(f"/api/productos/codigo/{muestra['art']}")),
+        ('GET /api/productos/codigo/<cod>', lectura(f"/api/productos/codigo/{muestra['cod']}")),
+    ]
+    escenarios += [
+        (f'GET /api/productos/exportar?formato={formato}',
+         lectura(f'/api/productos/exportar?formato={formato}'))
+        for formato in ('ndjson', 'csv', 'xlsx')
+    ]
+    for recurso in ('categorias', 'proveedores', 'imagenes'):
+        escenarios += [
+            (f'GET /api/{recurso}', lectura(f'/api/{recurso}')),
+            (f'GET /api/{recurso}?limit=100', lectura(f'/api/{recurso}?limit=100')),
+            (f'GET /api/{recurso}/<id>', lectura(f'/api/{recurso}/1')),
+        ]
+    escenarios += [
+        ('GET /api/_cache', lectura('/api/_cache')),
+        ('GET /api/_metrics', lectura('/api/_metrics')),
+    ]
+    return escenarios
+
+
+# Cuerpo de alta de cada recurso; 'n' hace únicos los valores
+ALTAS = {
+    'productos': lambda n, m: {
+        'art': f"Z{n:07d}", 'cod': f"Z{n:08d}", 'tit': "Producto benchmark",
+        'desc': "Producto creado por el benchmark", 'cat_id': 1, 'img_id': None,
+        'prov_id': 1, 'rating': "0"},
+    'categorias': lambda n, m: {'name': f"Categoría benchmark {n}", 'unit': "Unidad"},
+    'proveedores': lambda n, m: {'cod': f"Z{n:06d}", 'name': f"Proveedor benchmark {n}", 'obs': None},
+    'imagenes': lambda n, m: {'url_img': f"https://img.example/bench/{n}.jpg", 'txt_alt': "benchmark"},
+}
+
+# Campo que modifica el PUT de cada recurso
+MODIFICACIONES = {
+    'productos': 'tit',
+    'categorias': 'unit',
+    'proveedores': 'obs',
+    'imagenes': 'txt_alt',
+}
+
+
+def medir_escrituras(cliente, muestra, cantidad, concurrencia):
+    """
+    Para cada recurso: POST de 'cantidad' registros, PUT de cada uno y
+    DELETE de todos, así la base queda como estaba.
+    """
+    resultados = []
+    for recurso, alta in ALTAS.items():
+        creados = []
+
+        def crear(cliente, n):
+            estado, _, cuerpo = cliente.pedir('POST', f'/api/{recurso}', alta(n, muestra))
+            if estado < 400:
+                id = json.loads(cuerpo).get('id')
+                if isinstance(id, int):
+                    creados.append(id)
+            return estado
+
+        def modificar(cliente, n):
+            id = creados[n % len(creados)]
+            return cliente.pedir('PUT', f'/api/{recurso}/{id}',
+                                 {MODIFICACIONES[recurso]: f"modificado {n}"})[0]
+
+        def eliminar(cliente, n):
+            return cliente.pedir('DELETE', f'/api/{recurso}/{creados[n]}')[0]
+
+        resultados.append((f'POST /api/{recurso}',
+                           medir(cliente, crear, cantidad, concurrencia)))
+        if not creados:
+            continue
+        resultados.append((f'PUT /api/{recurso}/<id>',
+                           medir(cliente, modificar, cantidad, concurrencia)))
+        # Sin calentamiento: cada DELETE borra un registro distinto
+        resultados.append((f'DELETE /api/{recurso}/<id>',
+                           medir(cliente, eliminar, len(creados), concurrencia, calentamiento=0)))
+    return resultados
+
+
+def medir_api(cliente, muestra, cantidad, concurrencia=1, escrituras=True):
+    """Lista de resultados {'ruta', ...métricas} de todas las rutas"""
+    resultados = [
+        (nombre, medir(cliente, solicitud, cantidad, concurrencia))
+        for nombre, solicitud in escenarios_lectura(cliente, muestra)
+    ]
+    if escrituras:
+        resultados += medir_escrituras(cliente, muestra, cantidad, concurrencia)
+    return [{'ruta': nombre, **metricas} for nombre, metricas in resultados]
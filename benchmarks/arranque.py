@@ -0,0 +1,76 @@
+"""
+Arranque de un proceso de la aplicación: tiempo de 'import app' y de armar
+la aplicación con crear_app() y sus valores por defecto (lo mismo que paga
+cada worker al iniciar) en un intérprete nuevo, y los módulos que más tardan
+en importarse según 'python -X importtime'. La aplicación usa la base de
+benchmark, que tiene que estar creada y migrada (ver base.preparar()).
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Mide dentro del proceso hijo (sin contar el cambio a la base de benchmark);
+# imprime milisegundos y si quedó cargado openpyxl
+MEDICION = (
+    "import sys, time\n"
+    "inicio = time.perf_counter()\n"
+    "import app\n"
+    "importado = time.perf_counter()\n"
+    "from benchmarks import base\n"
+    "base.configurar()\n"
+    "armado = time.perf_counter()\n"
+    "app.crear_app()\n"
+    "fin = time.perf_counter()\n"
+    "print((importado - inicio + fin - armado) * 1000, 'openpyxl' in sys.modules)\n"
+)
+
+# Módulos informados por importtime (los de más tiempo acumulado)
+MODULOS_INFORMADOS = 10
+
+
+def medir_import():
+    """(ms de 'import app' y crear_app(), ms del proceso completo, openpyxl cargado)"""
+    inicio = time.perf_counter()
+    salida = subprocess.run([sys.executable, '-c', MEDICION], cwd=RAIZ, capture_output=True,
+                            text=True, check=True).stdout.split()
+    return float(salida[0]), (time.perf_counter() - inicio) * 1000, salida[1] == 'True'
+
+
+def modulos_lentos():
+    """[(módulo, ms acumulados)] de app y de lo que importa directamente"""
+    salida = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=RAIZ,
+                            capture_output=True, text=True, check=True).stderr
+    # importtime lista cada módulo después de los que importa, con dos
+    # espacios más de sangría por nivel: el árbol de app son las líneas
+    # anteriores a la suya, hasta la próxima del mismo nivel
+    lineas = []
+    for linea in salida.splitlines():
+        if linea.startswith('import time:') and 'cumulative' not in linea:
+            _, acumulado, nombre = linea[len('import time:'):].split('|')
+            lineas.append((len(nombre) - len(nombre.lstrip()), nombre.strip(), int(acumulado) / 1000))
+
+    fin = max(i for i, (nivel, nombre, _) in enumerate(lineas) if nombre == 'app')
+    modulos = [lineas[fin][1:]]
+    for nivel, nombre, ms in reversed(lineas[:fin]):
+        if nivel <= lineas[fin][0]:
+            break
+        if nivel == lineas[fin][0] + 2:
+            modulos.append((nombre, ms))
+    modulos.sort(key=lambda modulo: modulo[1], reverse=True)
+    return modulos[:MODULOS_INFORMADOS]
+
+
+def medir_arranque(repeticiones=5):
+    """Medianas de 'repeticiones' procesos nuevos y el detalle de importtime"""
+    medidas = [medir_import() for _ in range(repeticiones)]
+    return {
+        'repeticiones': repeticiones,
+        'import_app_ms': round(statistics.median(m[0] for m in medidas), 1),
+        'proceso_ms': round(statistics.median(m[1] for m in medidas), 1),
+        'openpyxl_al_arrancar': any(m[2] for m in medidas),
+        'modulos_ms': [{'modulo': nombre, 'ms': round(ms, 1)} for nombre, ms in modulos_lentos()],
+    }
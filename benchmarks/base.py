@@ -0,0 +1,141 @@
+"""
+Base de datos de prueba para los benchmarks: crea el esquema (el del
+respaldo más las migraciones) en una base aparte y la llena con un catálogo
+sintético de la cantidad de productos pedida.
+"""
+import os
+import random
+import re
+import tempfile
+
+import mysql.connector
+
+from base_db.conexion_db import config_dev, pool
+from base_db.migrador import Migrador
+from base_db.tabla_db import versiones
+
+BASE_BENCHMARK = 'puntoferretero_bench'
+
+ESQUEMA = os.path.join(os.path.dirname(__file__), '..', 'backup_db', 'puntoferretero.sql')
+
+TABLAS = ('product', 'image', 'prov', 'category')
+
+# Proporciones del catálogo sintético respecto de la cantidad de productos
+PRODUCTOS_POR_CATEGORIA = 50
+PRODUCTOS_POR_PROVEEDOR = 500
+PROPORCION_CON_IMAGEN = 0.6
+
+PALABRAS = (
+    "tornillo", "tuerca", "arandela", "mecha", "broca", "llave", "pinza", "martillo",
+    "destornillador", "cinta", "sierra", "lija", "pincel", "rodillo", "espatula",
+    "bisagra", "candado", "clavo", "taco", "abrazadera", "manguera", "caño", "codo",
+    "cable", "enchufe", "lampara", "interruptor", "madera", "acero", "bronce",
+    "galvanizado", "inoxidable", "reforzado", "profesional", "magnetico", "x10",
+)
+
+LOTE = 5000
+
+_directorio_versiones = None
+
+
+def preparar(productos, semilla=1):
+    """
+    Deja la base de benchmark con un catálogo de 'productos' productos (o
+    vacía si es 0) y apunta el pool de la aplicación a ella. Devuelve un
+    resumen con ids de muestra para armar las rutas a medir.
+    """
+    configurar()
+    conexion = mysql.connector.connect(
+        **{clave: valor for clave, valor in config_dev.items() if clave != 'database'})
+    cursor = conexion.cursor()
+    try:
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {BASE_BENCHMARK} "
+                       "DEFAULT CHARSET utf8mb4 COLLATE utf8mb4_general_ci")
+        cursor.execute(f"USE {BASE_BENCHMARK}")
+        for sentencia in tablas_esquema():
+            cursor.execute(sentencia)
+        Migrador().migrar()
+        vaciar(cursor)
+        muestra = llenar(cursor, productos, random.Random(semilla)) if productos else None
+        conexion.commit()
+    finally:
+        cursor.close()
+        conexion.close()
+
+    # Las estructuras en memoria se rearman con los datos nuevos
+    for tabla in TABLAS:
+        versiones.incrementar(tabla)
+    return muestra
+
+
+def configurar():
+    """
+    Apunta el pool a la base de benchmark y usa un directorio propio de
+    versiones de tablas, para no invalidar las de un servidor en marcha.
+    """
+    global _directorio_versiones
+    pool.config = {**config_dev, 'database': BASE_BENCHMARK}
+    if _directorio_versiones is None:
+        _directorio_versiones = tempfile.mkdtemp(prefix='puntoferretero_bench_')
+    versiones.directorio = _directorio_versiones
+
+
+def tablas_esquema():
+    """Sentencias CREATE TABLE del respaldo (sin la base ni los datos)"""
+    with open(ESQUEMA, encoding='utf-8') as archivo:
+        texto = archivo.read()
+    return re.findall(r"CREATE TABLE IF NOT EXISTS .*?;", texto, flags=re.DOTALL)
+
+
+def vaciar(cursor):
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    for tabla in TABLAS:
+        cursor.execute(f"TRUNCATE TABLE {tabla}")
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+
+
+def insertar(cursor, consulta, filas):
+    for inicio in range(0, len(filas), LOTE):
+        cursor.executemany(consulta, filas[inicio:inicio + LOTE])
+
+
+def llenar(cursor, productos, azar):
+    categorias = max(10, productos // PRODUCTOS_POR_CATEGORIA)
+    proveedores = max(5, productos // PRODUCTOS_POR_PROVEEDOR)
+    imagenes = max(1, int(productos * PROPORCION_CON_IMAGEN))
+
+    insertar(cursor, "INSERT INTO category (name, unit) VALUES (%s, %s)",
+             [(f"Categoría {i}", azar.choice(("Unidad", "Caja", "Metro", None)))
+              for i in range(1, categorias + 1)])
+    insertar(cursor, "INSERT INTO prov (cod, name, obs) VALUES (%s, %s, %s)",
+             [(f"{1000 + i}", f"Proveedor {i}", None) for i in range(1, proveedores + 1)])
+    insertar(cursor, "INSERT INTO image (url_img, txt_alt) VALUES (%s, %s)",
+             [(f"https://img.example/{i}.jpg", f"Imagen {i}") for i in range(1, imagenes + 1)])
+
+    filas = []
+    for i in range(1, productos + 1):
+        descripcion = ' '.join(azar.choices(PALABRAS, k=azar.randint(4, 10)))
+        filas.append((
+            f"A{i:07d}",
+            f"B{i:08d}",
+            ' '.join(descripcion.split()[:3]),
+            descripcion,
+            # Pocas categorías y proveedores concentran muchos productos
+            min(categorias, int(azar.paretovariate(1.2))),
+            azar.randint(1, imagenes) if azar.random() < PROPORCION_CON_IMAGEN else None,
+            min(proveedores, int(azar.paretovariate(1.5))),
+            str(azar.randint(0, 5)),
+        ))
+    insertar(cursor, "INSERT INTO product (art, cod, tit, `desc`, cat_id, img_id, prov_id, rating) "
+                     "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)", filas)
+
+    return {
+        'productos': productos,
+        'categorias': categorias,
+        'proveedores': proveedores,
+        'imagenes': imagenes,
+        'producto_id': productos // 2,
+        'art': f"A{productos // 2:07d}",
+        'cod': f"B{productos // 3 or 1:08d}",
+        'busqueda': azar.choice(PALABRAS),
+    }
@@ -0,0 +1,135 @@
+"""
+Medición de rutas de la API: dispara solicitudes con uno o varios hilos,
+contra la aplicación en proceso (cliente de pruebas de Flask) o contra un
+servidor WSGI local, y resume rendimiento y latencias.
+"""
+import http.client
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from werkzeug.serving import make_server
+
+
+class ClienteInterno:
+    """Solicitudes a la aplicación en el mismo proceso, sin red"""
+
+    modo = 'interno'
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def pedir(self, metodo, ruta, datos=None, encabezados=None):
+        cliente = getattr(self._local, 'cliente', None)
+        if cliente is None:
+            cliente = self._local.cliente = self.app.test_client()
+        respuesta = cliente.open(ruta, method=metodo, json=datos, headers=encabezados or {})
+        return respuesta.status_code, respuesta.headers, respuesta.get_data()
+
+
+class ClienteHttp:
+    """Solicitudes HTTP (una conexión persistente por hilo) a un servidor"""
+
+    modo = 'wsgi'
+
+    def __init__(self, url):
+        partes = urlsplit(url)
+        self.host = partes.hostname
+        self.puerto = partes.port or 80
+        self._local = threading.local()
+
+    def pedir(self, metodo, ruta, datos=None, encabezados=None):
+        encabezados = dict(encabezados or {})
+        cuerpo = None
+        if datos is not None:
+            cuerpo = json.dumps(datos).encode('utf-8')
+            encabezados['Content-Type'] = 'application/json'
+
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = self._local.conexion = http.client.HTTPConnection(self.host, self.puerto)
+        try:
+            conexion.request(metodo, ruta, body=cuerpo, headers=encabezados)
+            respuesta = conexion.getresponse()
+            contenido = respuesta.read()
+        except (http.client.HTTPException, OSError):
+            conexion.close()
+            self._local.conexion = None
+            raise
+        return respuesta.status, respuesta.headers, contenido
+
+
+class ServidorLocal:
+    """Servidor WSGI de Werkzeug con hilos, en segundo plano"""
+
+    def __init__(self, app, host='127.0.0.1', puerto=0):
+        self.servidor = make_server(host, puerto, app, threaded=True)
+        self.url = f"http://{host}:{self.servidor.server_port}"
+        self.hilo = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.hilo.start()
+        return self
+
+    def __exit__(self, *error):
+        self.servidor.shutdown()
+        self.hilo.join()
+
+
+def percentil(ordenados, p):
+    if not ordenados:
+        return None
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def resumir(tiempos, duracion, errores):
+    """Rendimiento (solicitudes/s) y latencias en ms"""
+    ordenados = sorted(tiempos)
+    return {
+        'solicitudes': len(tiempos),
+        'errores': errores,
+        'rps': round(len(tiempos) / duracion, 2) if duracion else None,
+        'p50_ms': round(percentil(ordenados, 50) * 1000, 3) if ordenados else None,
+        'p95_ms': round(percentil(ordenados, 95) * 1000, 3) if ordenados else None,
+        'p99_ms': round(percentil(ordenados, 99) * 1000, 3) if ordenados else None,
+        'max_ms': round(ordenados[-1] * 1000, 3) if ordenados else None,
+    }
+
+
+def medir(cliente, solicitud, cantidad, concurrencia=1, calentamiento=3):
+    """
+    Ejecuta 'cantidad' veces solicitud(cliente, n) -> estado HTTP, repartidas
+    en 'concurrencia' hilos. Cuenta como error todo estado 4xx/5xx o
+    excepción. Las primeras 'calentamiento' no se miden.
+    """
+    for n in range(calentamiento):
+        solicitud(cliente, n)
+
+    tiempos = []
+    errores = [0]
+    lock = threading.Lock()
+
+    def una(n):
+        inicio = time.perf_counter()
+        try:
+            estado = solicitud(cliente, n)
+            fallo = estado >= 400
+        except Exception:
+            fallo = True
+        transcurrido = time.perf_counter() - inicio
+        with lock:
+            tiempos.append(transcurrido)
+            if fallo:
+                errores[0] += 1
+
+    inicio = time.perf_counter()
+    if concurrencia <= 1:
+        for n in range(cantidad):
+            una(n)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrencia) as ejecutor:
+            list(ejecutor.map(una, range(cantidad)))
+    return resumir(tiempos, time.perf_counter() - inicio, errores[0])
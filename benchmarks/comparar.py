@@ -0,0 +1,61 @@
+"""
+Compara dos archivos de resultados de 'python -m benchmarks':
+
+    python -m benchmarks.comparar antes.json despues.json [--metrica p95_ms]
+
+Muestra por ruta y tamaño de catálogo la métrica de cada corrida y la
+variación, el tiempo de cada importación y el del arranque.
+"""
+import argparse
+import json
+import sys
+
+
+def cargar(ruta):
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+
+def variacion(antes, despues):
+    if not antes or despues is None:
+        return ''
+    return f"{(despues - antes) / antes * 100:+.1f}%"
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.comparar')
+    parser.add_argument('antes')
+    parser.add_argument('despues')
+    parser.add_argument('--metrica', default='p50_ms',
+                        choices=('rps', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'))
+    opciones = parser.parse_args(argumentos)
+
+    antes, despues = cargar(opciones.antes), cargar(opciones.despues)
+    print(f"{antes.get('commit')} -> {despues.get('commit')} ({opciones.metrica})\n")
+
+    previos = {(r['productos'], r['ruta']): r for r in antes['api']}
+    for resultado in despues['api']:
+        previo = previos.get((resultado['productos'], resultado['ruta']), {})
+        valor_antes = previo.get(opciones.metrica)
+        valor = resultado.get(opciones.metrica)
+        print(f"{resultado['productos']:>7} {resultado['ruta']:<45} "
+              f"{valor_antes if valor_antes is not None else '-':>10} {valor:>10} "
+              f"{variacion(valor_antes, valor):>8}")
+
+    previas = {r['archivo']: r for r in antes.get('importacion', [])}
+    for resultado in despues.get('importacion', []):
+        previa = previas.get(resultado['archivo'], {})
+        print(f"\nImportación {resultado['archivo']}: {previa.get('segundos', '-')} s -> "
+              f"{resultado['segundos']} s {variacion(previa.get('segundos'), resultado['segundos'])}")
+
+    arranque, arranque_previo = despues.get('arranque'), antes.get('arranque') or {}
+    if arranque:
+        print()
+        for medida in ('import_app_ms', 'proceso_ms'):
+            print(f"Arranque {medida}: {arranque_previo.get(medida, '-')} -> {arranque[medida]} "
+                  f"{variacion(arranque_previo.get(medida), arranque[medida])}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Tiempo de importación de planillas por /subir, de punta a punta: subida,
+cola en segundo plano y consulta de progreso hasta que termina.
+"""
+import os
+import random
+import time
+
+import openpyxl
+
+from benchmarks.base import PALABRAS
+
+PLANILLA_EJEMPLO = os.path.join(os.path.dirname(__file__), '..', 'uploads', 'LORD_BACK1108.xlsx')
+
+ENCABEZADO = ('Proveedor', 'Artículo', 'Código', 'Categoría', 'Imagen', 'Descripción', 'Precio')
+
+# Segundos máximos de espera por una importación
+ESPERA_MAXIMA = 3600
+
+
+def generar_planilla(ruta, filas, semilla=1):
+    """Planilla con el formato de la de ejemplo y 'filas' productos nuevos"""
+    azar = random.Random(semilla)
+    libro = openpyxl.Workbook(write_only=True)
+    hoja = libro.create_sheet()
+    hoja.append(ENCABEZADO)
+    for i in range(1, filas + 1):
+        descripcion = ' '.join(azar.choices(PALABRAS, k=azar.randint(4, 10))).upper()
+        hoja.append((
+            1000 + azar.randint(1, max(1, filas // 500)),
+            f"G{i:07d}",
+            f"H{i:08d}",
+            f"Categoría {azar.randint(1, max(10, filas // 50))}",
+            f"https://img.example/{i}.jpg" if azar.random() < 0.6 else None,
+            descripcion,
+            azar.randint(100, 100000),
+        ))
+    libro.save(ruta)
+    return ruta
+
+
+def importar(cliente_app, ruta):
+    """
+    Sube la planilla con el cliente de pruebas de Flask y espera el final.
+    Devuelve el resultado con los segundos totales y filas por segundo.
+    """
+    inicio = time.perf_counter()
+    with open(ruta, 'rb') as archivo:
+        respuesta = cliente_app.post(
+            '/subir', data={'file': (archivo, os.path.basename(ruta))},
+            content_type='multipart/form-data')
+    if respuesta.status_code != 302:
+        raise RuntimeError(f"/subir respondió {respuesta.status_code}")
+    id_importacion = respuesta.headers['Location'].rstrip('/').rsplit('/', 1)[-1]
+
+    while True:
+        estado = cliente_app.get(f'/api/importaciones/{id_importacion}').get_json()
+        if estado['estado'] in ('terminada', 'fallida'):
+            break
+        if time.perf_counter() - inicio > ESPERA_MAXIMA:
+            raise RuntimeError(f"La importación {id_importacion} no terminó")
+        time.sleep(0.05)
+    segundos = time.perf_counter() - inicio
+
+    return {
+        'archivo': os.path.basename(ruta),
+        'estado': estado['estado'],
+        'filas': estado['filas_procesadas'],
+        'importados': estado['importados'],
+        'duplicados': estado['duplicados'],
+        'errores': estado['errores'],
+        'segundos': round(segundos, 3),
+        'filas_por_segundo': round(estado['filas_procesadas'] / segundos, 1) if segundos else None,
+    }
@@ -0,0 +1,131 @@
+"""
+Compara las consultas de la importación de planillas sin y con los índices
+de las migraciones 0001 y 0002.
+
+Crea tablas de prueba (bench_*) en la base configurada, las llena con datos
+sintéticos, mide cada consulta antes y después de agregar los índices, y
+las borra al terminar. Muestra también el tipo de acceso de EXPLAIN: ALL es
+un recorrido completo de la tabla; ref, eq_ref o range usan un índice.
+
+    python -m benchmarks.indices_importacion [--productos 50000] [--repeticiones 200]
+"""
+import argparse
+import random
+import time
+
+import mysql.connector
+
+from base_db.conexion_db import config_dev
+
+TABLAS = """
+CREATE TABLE bench_prov (
+  `id` INT(11) NOT NULL AUTO_INCREMENT,
+  `cod` VARCHAR(10) DEFAULT NULL,
+  `name` VARCHAR(50) DEFAULT NULL,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+CREATE TABLE bench_product (
+  `id` INT(11) NOT NULL AUTO_INCREMENT,
+  `art` VARCHAR(10) DEFAULT NULL,
+  `cod` VARCHAR(10) DEFAULT NULL,
+  `desc` VARCHAR(200) DEFAULT NULL,
+  `prov_id` INT(11) DEFAULT NULL,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+"""
+
+# Los mismos índices que agregan las migraciones
+INDICES = (
+    "ALTER TABLE bench_prov ADD UNIQUE INDEX `uq_prov_cod` (`cod`)",
+    "ALTER TABLE bench_product ADD INDEX `idx_product_art` (`art`)",
+    "ALTER TABLE bench_product ADD INDEX `idx_product_cod` (`cod`)",
+)
+
+
+def crear_datos(cursor, productos, proveedores):
+    for sentencia in TABLAS.split(';'):
+        if sentencia.strip():
+            cursor.execute(sentencia)
+    cursor.executemany(
+        "INSERT INTO bench_prov (cod, name) VALUES (%s, %s)",
+        [(f"P{i}", f"Proveedor {i}") for i in range(proveedores)])
+    for inicio in range(0, productos, 5000):
+        cursor.executemany(
+            "INSERT INTO bench_product (art, cod, `desc`, prov_id) VALUES (%s, %s, %s, %s)",
+            [(f"A{i}", f"C{i}", f"Producto de prueba {i}", i % proveedores + 1)
+             for i in range(inicio, min(inicio + 5000, productos))])
+
+
+def consultas(productos, proveedores):
+    """(nombre, sql, función que arma los parámetros de cada repetición)"""
+    return [
+        ("proveedor por código (crear_faltantes, lote de 500)",
+         "SELECT * FROM bench_prov WHERE `cod` IN (" + ", ".join(["%s"] * 500) + ")",
+         lambda: tuple(f"P{random.randrange(proveedores * 2)}" for _ in range(500))),
+        ("producto por artículo (obtener('art', x))",
+         "SELECT * FROM bench_product WHERE `art` = %s",
+         lambda: (f"A{random.randrange(productos)}",)),
+        ("producto por código (obtener('cod', x))",
+         "SELECT * FROM bench_product WHERE `cod` = %s",
+         lambda: (f"C{random.randrange(productos)}",)),
+        ("duplicados por artículo (lote de 500)",
+         "SELECT id FROM bench_product WHERE `art` IN (" + ", ".join(["%s"] * 500) + ")",
+         lambda: tuple(f"A{random.randrange(productos * 2)}" for _ in range(500))),
+    ]
+
+
+def medir(cursor, lista, repeticiones):
+    resultados = []
+    for nombre, sql, parametros in lista:
+        cursor.execute("EXPLAIN " + sql, parametros())
+        columnas = [c[0] for c in cursor.description]
+        acceso = cursor.fetchall()[0][columnas.index('type')]
+
+        tiempos = []
+        for _ in range(repeticiones):
+            datos = parametros()
+            inicio = time.perf_counter()
+            cursor.execute(sql, datos)
+            cursor.fetchall()
+            tiempos.append(time.perf_counter() - inicio)
+        tiempos.sort()
+        resultados.append((nombre, acceso, tiempos[len(tiempos) // 2] * 1000,
+                           tiempos[int(len(tiempos) * 0.99) - 1] * 1000))
+    return resultados
+
+
+def main():
+    argumentos = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argumentos.add_argument('--productos', type=int, default=50000)
+    argumentos.add_argument('--proveedores', type=int, default=2000)
+    argumentos.add_argument('--repeticiones', type=int, default=200)
+    opciones = argumentos.parse_args()
+
+    conexion = mysql.connector.connect(**config_dev)
+    cursor = conexion.cursor()
+    try:
+        cursor.execute("DROP TABLE IF EXISTS bench_product, bench_prov")
+        crear_datos(cursor, opciones.productos, opciones.proveedores)
+        conexion.commit()
+
+        lista = consultas(opciones.productos, opciones.proveedores)
+        antes = medir(cursor, lista, opciones.repeticiones)
+        for sentencia in INDICES:
+            cursor.execute(sentencia)
+        despues = medir(cursor, lista, opciones.repeticiones)
+    finally:
+        cursor.execute("DROP TABLE IF EXISTS bench_product, bench_prov")
+        cursor.close()
+        conexion.close()
+
+    print(f"{opciones.productos} productos, {opciones.proveedores} proveedores, "
+          f"{opciones.repeticiones} repeticiones (tiempos en ms: mediana / p99)\n")
+    for (nombre, acceso_a, mediana_a, p99_a), (_, acceso_d, mediana_d, p99_d) in zip(antes, despues):
+        print(f"{nombre}\n"
+              f"  sin índice: {acceso_a:<6} {mediana_a:8.2f} / {p99_a:8.2f}\n"
+              f"  con índice: {acceso_d:<6} {mediana_d:8.2f} / {p99_d:8.2f}"
+              f"  ({mediana_a / mediana_d:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
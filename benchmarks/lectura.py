@@ -0,0 +1,74 @@
+"""
+Lectura de planillas: cuánto de leer_planilla() es interpretar el XML de la
+hoja con openpyxl y cuánto normalizar y validar las filas, lo único que se
+podría repartir entre procesos sin usar partes internas de openpyxl.
+
+    python -m benchmarks.lectura --filas 200000
+
+'aceleracion_maxima' es lo que ganaría leer_planilla() si la normalización
+y la validación corrieran en paralelo sin ningún costo: el tiempo total
+sobre el de interpretar el XML, que sigue siendo secuencial.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.importacion import generar_planilla
+from componentes.lectura_planilla import (
+    CAMPOS_FILA, indices_columna, leer_fila, leer_planilla, primer_valor)
+
+
+def medir_lectura(ruta):
+    """{etapa: segundos} de leer la planilla de 'ruta'"""
+    import openpyxl
+
+    inicio = time.perf_counter()
+    libro = openpyxl.load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        filas = list(libro.active.iter_rows(values_only=True))
+    finally:
+        libro.close()
+    interpretado = time.perf_counter()
+
+    header = filas[0] if filas else ()
+    indices = [indices_columna(header, campo) for campo in CAMPOS_FILA]
+    valores = [(row_num,) + tuple(primer_valor(row, i) for i in indices)
+               for row_num, row in enumerate(filas[1:], start=2)]
+    normalizado = time.perf_counter()
+
+    for fila in valores:
+        leer_fila(fila)
+    validado = time.perf_counter()
+
+    for _ in leer_planilla(ruta):
+        pass
+    total = time.perf_counter() - validado
+
+    return {
+        'filas': len(valores),
+        'interpretar_xml_s': round(interpretado - inicio, 3),
+        'normalizar_s': round(normalizado - interpretado, 3),
+        'validar_s': round(validado - normalizado, 3),
+        'leer_planilla_s': round(total, 3),
+        'aceleracion_maxima': round(total / (interpretado - inicio), 3),
+    }
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.lectura', description=__doc__.splitlines()[1])
+    parser.add_argument('--filas', type=int, default=200000)
+    opciones = parser.parse_args(argumentos)
+
+    with tempfile.TemporaryDirectory(prefix='puntoferretero_lectura_') as directorio:
+        ruta = generar_planilla(os.path.join(directorio, 'planilla.xlsx'), opciones.filas)
+        resultados = medir_lectura(ruta)
+
+    print(json.dumps(resultados, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Microbenchmark del costo por llamada de Tabla.obtener(campo, valor): por id
+y por código de producto (la lectura que repite la importación), con y sin
+resultado, y de una tabla con caché, usándola y sin usarla.
+
+    python -m benchmarks.obtener --productos 10000 --llamadas 20000
+
+Con --sentencias N el pool prepara en el servidor hasta N sentencias por
+conexión (por defecto no prepara ninguna): correrlo con y sin esa opción
+contra MySQL dice si conviene activarlas en config_pool.
+
+Con --sin-base las consultas las responde una conexión nula al instante,
+así queda solo el costo propio de Tabla y del pool (armar la consulta,
+prestar la conexión, métricas, armar el objeto).
+"""
+import argparse
+import json
+import logging
+import statistics
+import sys
+import time
+from unittest import mock
+
+import mysql.connector
+
+from benchmarks import base
+
+# Corridas de cada medición (se informa la mediana)
+CORRIDAS = 5
+
+# Fila que devuelve la conexión nula (sirve para cualquier modelo)
+FILA_NULA = (1, 'A0000001', 'C00000001', 'Producto', 'Producto de prueba', 1, None, 1, '0', 1)
+
+
+class CursorNulo:
+    rowcount = 1
+    lastrowid = None
+
+    def execute(self, consulta, datos=None):
+        self.vacio = bool(datos) and str(datos[0]).startswith('NO-')
+
+    def fetchall(self):
+        return [] if self.vacio else [FILA_NULA]
+
+    def close(self):
+        pass
+
+
+class ConexionNula:
+    in_transaction = False
+
+    def cursor(self, **opciones):
+        return CursorNulo()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def is_connected(self):
+        return True
+
+
+def medir(funcion, valores, llamadas):
+    """Microsegundos por llamada de funcion(valor), mediana de CORRIDAS corridas"""
+    valores = [valores[i % len(valores)] for i in range(llamadas)]
+    for valor in valores[:min(llamadas, 100)]:
+        funcion(valor)   # Calentamiento (conexión, sentencias preparadas)
+
+    tiempos = []
+    for _ in range(CORRIDAS):
+        inicio = time.perf_counter()
+        for valor in valores:
+            funcion(valor)
+        tiempos.append((time.perf_counter() - inicio) / llamadas * 1e6)
+    return round(statistics.median(tiempos), 2)
+
+
+def medir_obtener(llamadas, ids, codigos):
+    """{escenario: µs por llamada}"""
+    from componentes.modelos import Categoria, Producto
+
+    return {
+        "Producto.obtener('id', …)": medir(lambda v: Producto.obtener('id', v), ids, llamadas),
+        "Producto.obtener('cod', …)": medir(lambda v: Producto.obtener('cod', v), codigos, llamadas),
+        "Producto.obtener('cod', …) sin resultado":
+            medir(lambda v: Producto.obtener('cod', f"NO-{v}"), codigos, llamadas),
+        "Categoria.obtener('id', …) en caché": medir(lambda v: Categoria.obtener('id', v), [1], llamadas),
+        "Categoria.obtener('id', …) sin caché": medir_sin_cache(Categoria, [1], llamadas),
+    }
+
+
+def medir_sin_cache(modelo, valores, llamadas):
+    """Como medir() con modelo.obtener('id', …) pero sin usar su caché"""
+    with mock.patch.object(modelo, 'usar_cache', False):
+        return medir(lambda v: modelo.obtener('id', v), valores, llamadas)
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.obtener', description=__doc__.splitlines()[1])
+    parser.add_argument('--productos', type=int, default=10000)
+    parser.add_argument('--llamadas', type=int, default=20000)
+    parser.add_argument('--sin-base', action='store_true',
+                        help="Responder con una conexión nula (solo el costo propio de Tabla)")
+    parser.add_argument('--sentencias', type=int, default=None,
+                        help="Sentencias preparadas por conexión (por defecto, las de config_pool)")
+    opciones = parser.parse_args(argumentos)
+
+    if opciones.sentencias is not None:
+        from base_db.conexion_db import pool
+        pool.sentencias = opciones.sentencias
+
+    if opciones.sin_base:
+        base.configurar()
+        with mock.patch.object(mysql.connector, 'connect', lambda **config: ConexionNula()):
+            logging.disable(logging.DEBUG)   # Tabla registra cada consulta en DEBUG
+            resultados = medir_obtener(opciones.llamadas, list(range(1, 1001)),
+                                       [f"C{i:08d}" for i in range(1, 1001)])
+    else:
+        base.preparar(opciones.productos)
+        from componentes.modelos import Producto
+        logging.disable(logging.DEBUG)
+        resultados = medir_obtener(
+            opciones.llamadas, [fila[0] for fila in Producto.obtener_columnas('id')[:1000]],
+            [fila[0] for fila in Producto.obtener_columnas('cod')[:1000]])
+
+    print(json.dumps(resultados, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
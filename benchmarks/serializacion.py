@@ -0,0 +1,163 @@
+"""
+Costo de pasar a JSON un listado de productos con sus relaciones: el camino
+anterior (un registro y un diccionario por producto, con las relaciones
+anidadas, y jsonify) contra el serializador del modelo, que va de las tuplas
+de la base a los bytes.
+
+    python -m benchmarks.serializacion --productos 10000
+
+Con --sin-base las filas y los registros relacionados se arman en memoria;
+si no, se leen de la base de benchmark. En los dos caminos las relaciones
+salen de la caché, así se mide solo la serialización.
+"""
+import argparse
+import json
+import logging
+import random
+import statistics
+import sys
+import time
+from unittest import mock
+
+from flask import Flask, jsonify
+
+from benchmarks import base
+
+# Corridas de cada medición (se informa la mediana)
+CORRIDAS = 5
+
+# Claves de ?fields= del escenario con columnas elegidas
+CAMPOS_ELEGIDOS = ('tit', 'categoria')
+
+
+def con_diccionarios(filas):
+    """Lo que hacía la API: registros, diccionarios con las relaciones y jsonify"""
+    from componentes.modelos import Producto
+
+    productos = [Producto(fila, de_bbdd=True) for fila in filas]
+    datos = []
+    for producto, relacionados in zip(productos, Producto.cargar_relaciones(productos)):
+        producto_dict = producto.a_dict()
+        for nombre, (campo, _) in Producto.relaciones.items():
+            relacionado = relacionados[nombre]
+            producto_dict[nombre] = relacionado.a_dict() if relacionado else None
+            del producto_dict[campo]
+        datos.append(producto_dict)
+    return jsonify(datos).get_data()
+
+
+def medir(funcion, *argumentos):
+    """(milisegundos por llamada, mediana de CORRIDAS corridas; resultado)"""
+    resultado = funcion(*argumentos)   # Calentamiento (caché, plantillas)
+    tiempos = []
+    for _ in range(CORRIDAS):
+        inicio = time.perf_counter()
+        funcion(*argumentos)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return round(statistics.median(tiempos), 2), resultado
+
+
+def medir_serializacion(filas):
+    """{escenario: ms} para las filas de productos (todas las columnas)"""
+    from app import crear_app
+    from componentes.modelos import Producto
+
+    # El proveedor JSON de Flask por defecto, como estaba configurado antes
+    anterior = Flask('anterior')
+    anterior.json.ensure_ascii = False
+    with anterior.app_context():
+        ms_anterior, cuerpo_anterior = medir(con_diccionarios, filas)
+
+    app = crear_app()
+    serializador = app.json.serializador(Producto)
+    columnas = serializador.columnas()
+    elegidas = serializador.columnas(CAMPOS_ELEGIDOS)
+    indices = [columnas.index(columna) for columna in elegidas]
+    filas_elegidas = [tuple(fila[i] for i in indices) for fila in filas]
+    with app.app_context():
+        ms_serializador, cuerpo = medir(
+            lambda: jsonify(serializador.lista(filas, columnas)).get_data())
+        ms_elegidas, _ = medir(
+            lambda: jsonify(serializador.lista(filas_elegidas, elegidas)).get_data())
+
+    return {
+        'productos': len(filas),
+        'jsonify_ms': ms_anterior,
+        'serializador_ms': ms_serializador,
+        f"serializador_fields={','.join(CAMPOS_ELEGIDOS)}_ms": ms_elegidas,
+        'bytes': len(cuerpo),
+        'misma_salida': cuerpo == cuerpo_anterior,
+    }
+
+
+def filas_en_memoria(productos, semilla=1):
+    """
+    (filas de productos con todas las columnas, {modelo: {id: registro}})
+    con las proporciones del catálogo sintético de base.llenar()
+    """
+    from componentes.modelos import Categoria, Imagen, Proveedor
+
+    azar = random.Random(semilla)
+    categorias = max(10, productos // base.PRODUCTOS_POR_CATEGORIA)
+    proveedores = max(5, productos // base.PRODUCTOS_POR_PROVEEDOR)
+    imagenes = max(1, int(productos * base.PROPORCION_CON_IMAGEN))
+    relacionados = {
+        Categoria: {i: Categoria((i, f"Categoría {i}", "Unidad", 1), de_bbdd=True)
+                    for i in range(1, categorias + 1)},
+        Proveedor: {i: Proveedor((i, f"{1000 + i}", f"Proveedor {i}", None, 1), de_bbdd=True)
+                    for i in range(1, proveedores + 1)},
+        Imagen: {i: Imagen((i, f"https://img.example/{i}.jpg", f"Imagen {i}", 1), de_bbdd=True)
+                 for i in range(1, imagenes + 1)},
+    }
+
+    filas = []
+    for i in range(1, productos + 1):
+        descripcion = ' '.join(azar.choices(base.PALABRAS, k=azar.randint(4, 10)))
+        filas.append((
+            i, f"A{i:07d}", f"B{i:08d}", ' '.join(descripcion.split()[:3]), descripcion,
+            min(categorias, int(azar.paretovariate(1.2))),
+            azar.randint(1, imagenes) if azar.random() < base.PROPORCION_CON_IMAGEN else None,
+            min(proveedores, int(azar.paretovariate(1.5))),
+            str(azar.randint(0, 5)), 1,
+        ))
+    return filas, relacionados
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.serializacion',
+                                     description=__doc__.splitlines()[1])
+    parser.add_argument('--productos', type=int, default=10000)
+    parser.add_argument('--sin-base', action='store_true',
+                        help="Armar las filas en memoria en lugar de leerlas de la base")
+    opciones = parser.parse_args(argumentos)
+
+    if opciones.sin_base:
+        base.configurar()
+        filas, relacionados = filas_en_memoria(opciones.productos)
+        logging.disable(logging.DEBUG)
+        parches = [
+            mock.patch.object(modelo, 'obtener_en', classmethod(
+                lambda cls, campo, valores: [relacionados[cls][v] for v in set(valores)
+                                             if v in relacionados[cls]]))
+            for modelo in relacionados
+        ]
+        for parche in parches:
+            parche.start()
+        try:
+            resultados = medir_serializacion(filas)
+        finally:
+            for parche in parches:
+                parche.stop()
+    else:
+        base.preparar(opciones.productos)
+        from componentes.modelos import Producto
+        logging.disable(logging.DEBUG)
+        filas = sorted(Producto.obtener_columnas(*Producto._campos_dict))
+        resultados = medir_serializacion(filas)
+
+    print(json.dumps(resultados, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+import heapq
+import logging
+from bisect import bisect_left, insort
+from collections import Counter
+
+from auxiliares.texto import palabras
+from componentes.materializada import VistaMaterializada
+
+logger = logging.getLogger(__name__)
+
+# Campos del producto que se indexan
+CAMPOS_BUSQUEDA = ('tit', 'desc', 'art', 'cod')
+
+# Resultados por búsqueda si no se pide otra cantidad
+LIMITE_RESULTADOS = 50
+
+# Peso de una palabra igual al término frente a una que solo empieza con él
+PESO_EXACTA = 2
+PESO_PREFIJO = 1
+
+# Los términos más cortos no se buscan por prefijo ("a" no trae todo el catálogo)
+LARGO_MINIMO_PREFIJO = 2
+
+# Palabras distintas por registro, para estimar cómo conviene cruzar términos
+PALABRAS_POR_REGISTRO = 16
+
+
+def raiz(palabra):
+    """
+    Recorta el plural (y la 'e' final) para que singular y plural coincidan:
+    "tornillos" -> "tornillo", "llave" y "llaves" -> "llav", "papel" y
+    "papeles" -> "papel". Es un recorte simple del español que se aplica igual
+    al indexar y al buscar; no toca códigos ni palabras cortas.
+    """
+    if not palabra.isalpha():
+        return palabra
+    if len(palabra) > 3 and palabra.endswith('s'):
+        palabra = palabra[:-1]
+    if len(palabra) > 3 and palabra.endswith('e'):
+        palabra = palabra[:-1]
+    return palabra
+
+
+def terminos(texto):
+    """Palabras del texto normalizadas para el índice"""
+    return [raiz(palabra) for palabra in palabras(texto)]
+
+
+class IndiceBusqueda(VistaMaterializada):
+    """
+    Índice invertido en memoria sobre campos de texto de un modelo.
+    Cada palabra (normalizada sin mayúsculas, acentos ni plural) apunta a
+    los ids que la contienen con su frecuencia. Los términos buscados se comparan por
+    prefijo contra el vocabulario ordenado, todos deben aparecer en el
+    registro, y los resultados se ordenan por frecuencia de los términos.
+    """
+
+    estructuras = ('_indice', '_documentos', '_vocabulario')
+
+    def __init__(self, modelo, campos=CAMPOS_BUSQUEDA):
+        super().__init__(modelo)
+        self.campos = campos
+        self._indice = {}        # palabra -> {id: frecuencia}
+        self._documentos = {}    # id -> Counter de sus palabras
+        self._vocabulario = []   # Palabras del índice, ordenadas
+
+    def buscar(self, texto, limite=LIMITE_RESULTADOS):
+        """Ids de los registros que contienen todos los términos, mejor puntaje primero"""
+        buscados = list(dict.fromkeys(terminos(texto)))
+        if not buscados:
+            return []
+
+        with self._lock:
+            self.actualizar()
+            # Primero el término con menos apariciones: los demás solo
+            # tienen que puntuar a los registros que ya coinciden
+            expansiones = sorted(
+                (self.__expandir(termino) for termino in buscados),
+                key=lambda expansion: expansion[1])
+            puntajes = None
+            for palabras_termino, apariciones in expansiones:
+                if puntajes is None:
+                    puntajes = self.__coincidencias(palabras_termino)
+                elif len(puntajes) * PALABRAS_POR_REGISTRO < apariciones:
+                    puntajes = self.__filtrar(puntajes, palabras_termino)
+                else:
+                    coincidencias = self.__coincidencias(palabras_termino)
+                    puntajes = {id: puntaje + coincidencias[id]
+                                for id, puntaje in puntajes.items() if id in coincidencias}
+                if not puntajes:
+                    return []
+
+        # Solo se ordenan los que alcanzan el puntaje del último lugar
+        if len(puntajes) > limite:
+            umbral = heapq.nlargest(limite, puntajes.values())[-1]
+            puntajes = {id: puntaje for id, puntaje in puntajes.items() if puntaje >= umbral}
+        return sorted(puntajes, key=lambda id: (-puntajes[id], id))[:limite]
+
+    def reconstruir(self):
+        filas = self.modelo.obtener_columnas('id', *self.campos, estricto=True)
+        if filas is None:
+            return None
+        self._indice = {}
+        self._documentos = {}
+        for id, *valores in filas:
+            self.__agregar(id, valores, ordenar=False)
+        self._vocabulario = sorted(self._indice)
+        logger.info(f"Índice de búsqueda de {self.modelo.tabla}: "
+                    f"{len(filas)} registros, {len(self._vocabulario)} palabras")
+        return len(filas)
+
+    def refrescar(self, ids):
+        for id in ids:
+            self.__quitar(id)
+        for registro in self.modelo.obtener_en('id', ids):
+            self.__agregar(registro.id, [getattr(registro, c) for c in self.campos])
+
+    def __expandir(self, termino):
+        """
+        Palabras del vocabulario que coinciden con el término, con su peso, y
+        total de apariciones. Los términos muy cortos solo coinciden exactos.
+        """
+        if len(termino) < LARGO_MINIMO_PREFIJO:
+            ids = self._indice.get(termino)
+            return ({termino: PESO_EXACTA}, len(ids)) if ids else ({}, 0)
+
+        palabras_termino = {}
+        apariciones = 0
+        vocabulario = self._vocabulario
+        i = bisect_left(vocabulario, termino)
+        while i < len(vocabulario) and vocabulario[i].startswith(termino):
+            palabra = vocabulario[i]
+            palabras_termino[palabra] = PESO_EXACTA if palabra == termino else PESO_PREFIJO
+            apariciones += len(self._indice[palabra])
+            i += 1
+        return palabras_termino, apariciones
+
+    def __coincidencias(self, palabras_termino):
+        """{id: puntaje} de los registros que tienen alguna de las palabras"""
+        coincidencias = {}
+        for palabra, peso in palabras_termino.items():
+            for id, frecuencia in self._indice[palabra].items():
+                coincidencias[id] = coincidencias.get(id, 0) + peso * frecuencia
+        return coincidencias
+
+    def __filtrar(self, puntajes, palabras_termino):
+        """Deja en 'puntajes' los registros que tienen alguna de las palabras, sumando su puntaje"""
+        filtrados = {}
+        for id, puntaje in puntajes.items():
+            extra = 0
+            for palabra, frecuencia in self._documentos[id].items():
+                peso = palabras_termino.get(palabra)
+                if peso:
+                    extra += peso * frecuencia
+            if extra:
+                filtrados[id] = puntaje + extra
+        return filtrados
+
+    def __agregar(self, id, valores, ordenar=True):
+        documento = Counter()
+        for valor in valores:
+            documento.update(terminos(valor))
+        self._documentos[id] = documento
+
+        for palabra, frecuencia in documento.items():
+            ids = self._indice.get(palabra)
+            if ids is None:
+                ids = self._indice[palabra] = {}
+                if ordenar:
+                    insort(self._vocabulario, palabra)
+            ids[id] = frecuencia
+
+    def __quitar(self, id):
+        for palabra in self._documentos.pop(id, ()):
+            ids = self._indice[palabra]
+            del ids[id]
+            if not ids:
+                del self._indice[palabra]
+                del self._vocabulario[bisect_left(self._vocabulario, palabra)]
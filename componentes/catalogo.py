@@ -0,0 +1,98 @@
+import gzip
+import logging
+
+from componentes.materializada import VistaMaterializada
+
+logger = logging.getLogger(__name__)
+
+# Nivel de compresión del catálogo en gzip (se comprime una vez por versión)
+NIVEL_GZIP = 6
+
+
+class CatalogoSerializado(VistaMaterializada):
+    """
+    Catálogo completo de un modelo ya serializado a JSON, listo para servir
+    desde memoria. Guarda el fragmento JSON de cada registro y arma el cuerpo
+    (y su versión en gzip) una sola vez por versión de las tablas.
+
+    Si se modifica un registro del modelo, o uno de una tabla relacionada,
+    solo se vuelven a serializar los registros afectados.
+    """
+
+    estructuras = ('_fragmentos', '_referencias')
+
+    def __init__(self, modelo, serializador, nivel_gzip=NIVEL_GZIP):
+        """'serializador' es el SerializadorModelo de 'modelo'"""
+        super().__init__(modelo, (modelo.tabla,) + tuple(
+            clase.tabla for _, clase in modelo.relaciones.values()))
+        self.serializador = serializador
+        self.columnas = serializador.columnas()
+        self.nivel_gzip = nivel_gzip
+        # Posición en 'columnas' de cada campo de relación
+        self._indices = {campo: self.columnas.index(campo)
+                         for campo, _ in modelo.relaciones.values()}
+
+        self._fragmentos = {}     # id -> JSON del registro (bytes)
+        self._referencias = {}    # id -> {campo de relación: id relacionado}
+        self._cuerpo = None
+        self._cuerpo_gzip = None
+
+    def cuerpo(self, comprimido=False):
+        """Bytes del catálogo en JSON, comprimidos con gzip si se pide"""
+        with self._lock:
+            self.actualizar()
+            if self._cuerpo is None:
+                self._cuerpo = self.unir(sorted(self._fragmentos))
+            if not comprimido:
+                return self._cuerpo
+            if self._cuerpo_gzip is None:
+                self._cuerpo_gzip = gzip.compress(self._cuerpo, self.nivel_gzip)
+            return self._cuerpo_gzip
+
+    def unir(self, ids):
+        """Lista JSON (bytes) con los registros 'ids' que existen, en ese orden"""
+        with self._lock:
+            self.actualizar()
+            fragmentos = self._fragmentos
+            return b"[" + b",".join(
+                fragmentos[id] for id in ids if id in fragmentos) + b"]\n"
+
+    def fragmento(self, id):
+        """JSON (bytes) de un registro, o None si no existe"""
+        with self._lock:
+            self.actualizar()
+            return self._fragmentos.get(id)
+
+    def reconstruir(self):
+        filas = self.modelo.obtener_columnas(*self.columnas, estricto=True)
+        if filas is None:
+            return None
+        self._fragmentos = {}
+        self._referencias = {}
+        self.__agregar(filas)
+        logger.info(f"Catálogo de {self.modelo.tabla} reconstruido: {len(filas)} registros")
+        return len(filas)
+
+    def refrescar(self, ids):
+        registros = self.modelo.obtener_en('id', ids)
+        for id in ids:
+            self._fragmentos.pop(id, None)
+            self._referencias.pop(id, None)
+        self.__agregar(self.serializador.tuplas(registros, self.columnas))
+
+    def afectados(self, tabla, ids):
+        campos = [campo for campo, clase in self.modelo.relaciones.values()
+                  if clase.tabla == tabla]
+        return {id for id, refs in self._referencias.items()
+                if any(refs[campo] in ids for campo in campos)}
+
+    def invalidado(self):
+        self._cuerpo = self._cuerpo_gzip = None
+
+    def __agregar(self, filas):
+        fragmentos = self.serializador.fragmentos(
+            filas, self.columnas, self.serializador.relacionados(filas, self.columnas))
+        for fila, fragmento in zip(filas, fragmentos):
+            self._fragmentos[fila[0]] = fragmento.encode('utf-8')
+            self._referencias[fila[0]] = {campo: fila[indice]
+                                          for campo, indice in self._indices.items()}
@@ -0,0 +1,69 @@
+import logging
+
+from auxiliares.texto import clave
+from componentes.materializada import VistaMaterializada
+
+logger = logging.getLogger(__name__)
+
+# Campos por los que se resuelve un código, en orden de prioridad
+CAMPOS_CODIGO = ('art', 'cod')
+
+
+class IndiceCodigos(VistaMaterializada):
+    """
+    Diccionarios en memoria {código normalizado: ids} por cada campo de
+    CAMPOS_CODIGO, para resolver un artículo o código de barras sin ir a la
+    base. Los códigos se comparan como lo hace MySQL (sin mayúsculas, acentos
+    ni espacios finales).
+    """
+
+    estructuras = ('_mapas', '_codigos')
+
+    def __init__(self, modelo, campos=CAMPOS_CODIGO):
+        super().__init__(modelo)
+        self.campos = campos
+        self._mapas = {campo: {} for campo in campos}   # campo -> {código: {ids}}
+        self._codigos = {}                              # id -> (códigos por campo)
+
+    def buscar(self, valor):
+        """Id del registro con ese código (el primer campo que coincida gana), o None"""
+        codigo = clave(valor)
+        with self._lock:
+            self.actualizar()
+            for campo in self.campos:
+                ids = self._mapas[campo].get(codigo)
+                if ids:
+                    return min(ids)
+        return None
+
+    def reconstruir(self):
+        filas = self.modelo.obtener_columnas('id', *self.campos, estricto=True)
+        if filas is None:
+            return None
+        self._mapas = {campo: {} for campo in self.campos}
+        self._codigos = {}
+        for id, *valores in filas:
+            self.__agregar(id, valores)
+        logger.info(f"Índice de códigos de {self.modelo.tabla}: {len(filas)} registros")
+        return len(filas)
+
+    def refrescar(self, ids):
+        for id in ids:
+            self.__quitar(id)
+        for registro in self.modelo.obtener_en('id', ids):
+            self.__agregar(registro.id, [getattr(registro, c) for c in self.campos])
+
+    def __agregar(self, id, valores):
+        codigos = tuple(clave(valor) if valor else None for valor in valores)
+        self._codigos[id] = codigos
+        for campo, codigo in zip(self.campos, codigos):
+            if codigo:
+                self._mapas[campo].setdefault(codigo, set()).add(id)
+
+    def __quitar(self, id):
+        for campo, codigo in zip(self.campos, self._codigos.pop(id, ())):
+            ids = self._mapas[campo].get(codigo)
+            if ids:
+                ids.discard(id)
+                if not ids:
+                    del self._mapas[campo][codigo]
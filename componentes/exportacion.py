@@ -0,0 +1,186 @@
+"""
+Exportación del catálogo de productos completo en NDJSON, CSV o XLSX.
+Los productos se leen por lotes de un cursor sin buffer y cada lote sale
+como un fragmento de la respuesta, así la memoria no depende del tamaño del
+catálogo. Categorías, proveedores e imágenes se resuelven con mapas en
+memoria (son tablas chicas). Los encabezados de CSV y XLSX son los que
+reconoce el importador: un archivo exportado se puede volver a subir.
+"""
+import csv
+import io
+import json
+import re
+import string
+import zipfile
+from xml.sax.saxutils import escape
+
+from base_db.tabla_db import TAMANIO_LECTURA
+from componentes.modelos import Categoria, Imagen, Proveedor, Producto
+
+# (clave en NDJSON, encabezado en CSV y XLSX) de cada columna exportada
+COLUMNAS_EXPORTACION = (
+    ('id', 'Id'),
+    ('prov', 'Proveedor'),
+    ('art', 'Artículo'),
+    ('cod', 'Código'),
+    ('tit', 'Título'),
+    ('desc', 'Descripción'),
+    ('cat', 'Categoría'),
+    ('img', 'Imagen'),
+    ('rating', 'Rating'),
+)
+
+# Formatos disponibles y su mimetype
+FORMATOS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Caracteres que no pueden ir en un XML
+NO_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+# Partes fijas de un XLSX de una hoja con textos en línea (sin sharedStrings)
+PARTES_XLSX = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/'
+        'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/'
+        'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+        'relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Productos" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+        'relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'),
+}
+HOJA_XLSX = 'xl/worksheets/sheet1.xml'
+INICIO_HOJA = (b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+               b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+               b'<sheetData>')
+FIN_HOJA = b'</sheetData></worksheet>'
+
+
+def exportar(formato, tamanio=TAMANIO_LECTURA):
+    """Genera el catálogo en 'formato' (una clave de FORMATOS) como fragmentos de bytes"""
+    return ESCRITORES[formato](filas_catalogo(tamanio))
+
+
+def filas_catalogo(tamanio=TAMANIO_LECTURA):
+    """
+    Genera listas de hasta 'tamanio' tuplas con los valores de
+    COLUMNAS_EXPORTACION, en orden de id
+    """
+    proveedores = dict(Proveedor.obtener_columnas('id', 'cod'))
+    categorias = dict(Categoria.obtener_columnas('id', 'name'))
+    imagenes = dict(Imagen.obtener_columnas('id', 'url_img'))
+
+    for lote in Producto.recorrer_columnas(
+            'id', 'prov_id', 'art', 'cod', 'tit', 'desc', 'cat_id', 'img_id', 'rating',
+            tamanio=tamanio):
+        yield [
+            (id, proveedores.get(prov_id), art, cod, tit, desc,
+             categorias.get(cat_id), imagenes.get(img_id), rating)
+            for id, prov_id, art, cod, tit, desc, cat_id, img_id, rating in lote
+        ]
+
+
+def escribir_ndjson(lotes):
+    claves = [clave for clave, _ in COLUMNAS_EXPORTACION]
+    for lote in lotes:
+        yield ''.join(
+            json.dumps(dict(zip(claves, fila)), ensure_ascii=False, default=str) + '\n'
+            for fila in lote).encode('utf-8')
+
+
+def escribir_csv(lotes):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow([encabezado for _, encabezado in COLUMNAS_EXPORTACION])
+    for lote in lotes:
+        escritor.writerows(lote)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+class SalidaZip:
+    """
+    Destino de solo escritura para zipfile: guarda lo escrito hasta que se
+    retira. Como no admite seek(), zipfile escribe el libro de corrido y se
+    puede enviar mientras se arma.
+    """
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def retirar(self):
+        datos = b''.join(self.partes)
+        self.partes.clear()
+        return datos
+
+
+def escribir_xlsx(lotes):
+    salida = SalidaZip()
+    with zipfile.ZipFile(salida, 'w', zipfile.ZIP_DEFLATED) as libro:
+        for nombre, contenido in PARTES_XLSX.items():
+            libro.writestr(nombre, contenido)
+        with libro.open(HOJA_XLSX, 'w') as hoja:
+            hoja.write(INICIO_HOJA)
+            hoja.write(fila_xlsx(1, [encabezado for _, encabezado in COLUMNAS_EXPORTACION]))
+            numero = 1
+            for lote in lotes:
+                hoja.write(b''.join(
+                    fila_xlsx(numero + i, fila) for i, fila in enumerate(lote, start=1)))
+                numero += len(lote)
+                yield salida.retirar()
+            hoja.write(FIN_HOJA)
+    yield salida.retirar()
+
+
+def fila_xlsx(numero, valores):
+    """XML (bytes) de la fila 'numero' de la hoja; los None quedan como celdas vacías"""
+    celdas = []
+    for columna, valor in zip(string.ascii_uppercase, valores):
+        if valor is None:
+            continue
+        if isinstance(valor, int):
+            celdas.append(f'<c r="{columna}{numero}"><v>{valor}</v></c>')
+        else:
+            texto = escape(NO_XML.sub('', str(valor)))
+            celdas.append(f'<c r="{columna}{numero}" t="inlineStr">'
+                          f'<is><t xml:space="preserve">{texto}</t></is></c>')
+    return f'<row r="{numero}">{"".join(celdas)}</row>'.encode('utf-8')
+
+
+ESCRITORES = {
+    'ndjson': escribir_ndjson,
+    'csv': escribir_csv,
+    'xlsx': escribir_xlsx,
+}
@@ -0,0 +1,382 @@
+import fcntl
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from componentes.importador import AGREGAR, ImportadorProductos, ErrorImportacion
+from componentes.lectura_planilla import leer_planilla
+from componentes.modelos import Producto
+
+logger = logging.getLogger(__name__)
+
+# Estados de una importación
+PENDIENTE = 'pendiente'
+PROCESANDO = 'procesando'
+TERMINADA = 'terminada'
+FALLIDA = 'fallida'
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS importacion (
+    id TEXT PRIMARY KEY,
+    archivo TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    creada REAL NOT NULL,
+    actualizada REAL NOT NULL,
+    filas_procesadas INTEGER NOT NULL DEFAULT 0,
+    importados INTEGER NOT NULL DEFAULT 0,
+    duplicados INTEGER NOT NULL DEFAULT 0,
+    errores INTEGER NOT NULL DEFAULT 0,
+    mensaje TEXT,
+    resultado TEXT,
+    modo TEXT NOT NULL DEFAULT 'agregar',
+    actualizados INTEGER NOT NULL DEFAULT 0,
+    sin_cambios INTEGER NOT NULL DEFAULT 0,
+    huella TEXT,
+    proceso TEXT
+);
+CREATE TABLE IF NOT EXISTS huella_fila (
+    proveedor TEXT NOT NULL,
+    huella TEXT NOT NULL,
+    producto INTEGER NOT NULL,
+    cat_id INTEGER,
+    prov_id INTEGER,
+    img_id INTEGER,
+    PRIMARY KEY (proveedor, huella)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_huella_fila_producto ON huella_fila (producto);
+"""
+
+# Columnas agregadas después de la primera versión de la tabla, para
+# completar los archivos de estado ya creados
+COLUMNAS_NUEVAS = {
+    'modo': "TEXT NOT NULL DEFAULT 'agregar'",
+    'actualizados': "INTEGER NOT NULL DEFAULT 0",
+    'sin_cambios': "INTEGER NOT NULL DEFAULT 0",
+    'huella': "TEXT",
+    'proceso': "TEXT",
+}
+
+
+# Columnas de huella_fila con el registro relacionado que resolvió cada
+# fila, por modelo (las de Producto.relaciones)
+CAMPOS_RELACIONES = ('cat_id', 'prov_id', 'img_id')
+MODELOS_RELACIONES = {clase: campo for campo, clase in Producto.relaciones.values()}
+
+# Caracteres del nombre de la base que no van en el del archivo de estado
+CARACTERES_NO_ARCHIVO = re.compile(r'[^\w.-]')
+
+# Para que dos requests no creen a la vez la cola de la misma aplicación
+_lock_colas = threading.Lock()
+
+# Colas creadas, para que el hijo de un fork suelte el token del padre
+_colas = weakref.WeakSet()
+
+
+def cola_importaciones(app):
+    """
+    ColaImportaciones de la aplicación para la base de datos a la que apunta
+    el pool. Se crea con el primer uso, en la carpeta de subidas configurada
+    en ese momento, y su archivo de estado es uno por base: las huellas de
+    filas de una base (por ejemplo la de benchmarks) nunca se usan con otra.
+    """
+    base = Producto.conexion.config.get('database') or 'base'
+    ruta_db = os.path.join(app.config['UPLOAD_FOLDER'],
+                           f"importaciones-{CARACTERES_NO_ARCHIVO.sub('_', base)}.sqlite3")
+    with _lock_colas:
+        colas = app.extensions.setdefault('importaciones', {})
+        cola = colas.get(ruta_db)
+        if cola is None:
+            os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+            cola = colas[ruta_db] = ColaImportaciones(
+                ruta_db, hilos=app.config['IMPORTACIONES_HILOS'], base=base)
+        return cola
+
+
+class ColaImportaciones:
+    """
+    Cola de importaciones de planillas que se ejecutan en segundo plano.
+    Los trabajos corren en un pool de hilos del proceso y su estado se guarda
+    en un archivo SQLite, así cualquier worker del servidor puede consultar
+    el progreso sin un broker externo.
+
+    Las importaciones se ejecutan de a una aunque haya varios workers: cada
+    trabajo toma un lock de archivo junto al SQLite antes de empezar. Cada
+    proceso que encola anota su token en la fila y mantiene tomado el lock
+    de su archivo en '<ruta_db>.procesos/'; si ese lock está libre, el
+    proceso murió y sus trabajos sin terminar se marcan como fallidos al
+    crear la cola.
+    """
+
+    def __init__(self, ruta_db, hilos=1, base=None):
+        """'base' es la base de datos de los productos a los que apuntan las huellas"""
+        self.ruta_db = ruta_db
+        self.ruta_procesos = ruta_db + '.procesos'
+        self.ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='importacion')
+        self._proceso = None
+        _colas.add(self)
+        os.makedirs(self.ruta_procesos, exist_ok=True)
+        with self.__conectar() as db:
+            db.execute("PRAGMA journal_mode=WAL;")
+            db.executescript(ESQUEMA)
+            existentes = {fila['name'] for fila in db.execute("PRAGMA table_info(importacion);")}
+            for columna, tipo in COLUMNAS_NUEVAS.items():
+                if columna not in existentes:
+                    db.execute(f"ALTER TABLE importacion ADD COLUMN {columna} {tipo};")
+            db.execute("CREATE INDEX IF NOT EXISTS idx_importacion_huella "
+                       "ON importacion (huella, modo, estado);")
+            # Las huellas son solo un atajo: las de un archivo sin las
+            # columnas de relaciones se descartan en lugar de completarlas
+            columnas = {fila['name'] for fila in db.execute("PRAGMA table_info(huella_fila);")}
+            if not set(CAMPOS_RELACIONES) <= columnas:
+                db.execute("DROP TABLE huella_fila;")
+                db.executescript(ESQUEMA)
+        self.huellas = HuellasFilas(self.__conectar, base)
+        Producto.observar(self.huellas.descartar)
+        self.__recuperar()
+
+    def encolar(self, ruta_archivo, modo=AGREGAR, huella=None, forzar=False):
+        """
+        Registra la importación, la pone en cola y devuelve su id.
+        'huella' es la del contenido del archivo; con 'forzar' se procesan
+        también las filas ya importadas antes.
+        """
+        id_importacion = uuid.uuid4().hex
+        ahora = time.time()
+        with self.__conectar() as db:
+            db.execute(
+                "INSERT INTO importacion "
+                "(id, archivo, estado, creada, actualizada, modo, huella, proceso) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?);",
+                (id_importacion, ruta_archivo, PENDIENTE, ahora, ahora, modo, huella,
+                 self.__token_proceso()))
+
+        self.ejecutor.submit(self.__ejecutar, id_importacion, ruta_archivo, modo, forzar)
+        return id_importacion
+
+    def anterior(self, huella, modo):
+        """
+        Id de la última importación terminada de un archivo con la misma
+        huella y el mismo modo, o None si no hay
+        """
+        with self.__conectar() as db:
+            fila = db.execute(
+                "SELECT id FROM importacion WHERE huella = ? AND modo = ? AND estado = ? "
+                "ORDER BY creada DESC LIMIT 1;", (huella, modo, TERMINADA)).fetchone()
+        return fila['id'] if fila else None
+
+    def obtener(self, id_importacion):
+        """
+        Devuelve el estado de la importación como diccionario (o None si no existe).
+        Si terminó, 'resultado' trae productos_importados, productos_actualizados,
+        productos_sin_cambios, productos_duplicados y errores.
+        """
+        with self.__conectar() as db:
+            fila = db.execute(
+                "SELECT * FROM importacion WHERE id = ?;", (id_importacion,)).fetchone()
+        if fila is None:
+            return None
+
+        importacion = dict(fila)
+        importacion['resultado'] = json.loads(fila['resultado']) if fila['resultado'] else None
+        return importacion
+
+    # Ejecución en segundo plano
+    def __ejecutar(self, id_importacion, ruta_archivo, modo, forzar):
+        try:
+            with open(self.ruta_db + '.lock', 'w') as lock:
+                # Espera en 'pendiente' a que termine la importación de otro worker
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                self.__importar(id_importacion, ruta_archivo, modo, forzar)
+        finally:
+            try:
+                os.remove(ruta_archivo)
+            except OSError:
+                pass
+
+    def __importar(self, id_importacion, ruta_archivo, modo, forzar):
+        self.__actualizar(id_importacion, estado=PROCESANDO)
+
+        def progreso(importador):
+            self.__actualizar(id_importacion, **self.__contadores(importador))
+
+        importador = ImportadorProductos(progreso=progreso, modo=modo, huellas=self.huellas,
+                                         omitir_conocidas=not forzar)
+        try:
+            importador.importar(leer_planilla(ruta_archivo))
+        except ErrorImportacion as e:
+            self.__actualizar(id_importacion, estado=FALLIDA, mensaje=f'Error: {e}')
+            return
+        except Exception as e:
+            logger.exception(f"Error al procesar archivo Excel {ruta_archivo}")
+            self.__actualizar(id_importacion, estado=FALLIDA,
+                              mensaje=f'Error al procesar el archivo Excel: {e}')
+            return
+
+        resultado = {
+            'productos_importados': importador.productos_importados,
+            'productos_actualizados': importador.productos_actualizados,
+            'productos_sin_cambios': importador.productos_sin_cambios,
+            'productos_duplicados': importador.productos_duplicados,
+            'errores': importador.errores,
+        }
+        self.__actualizar(id_importacion, estado=TERMINADA,
+                          resultado=json.dumps(resultado, ensure_ascii=False),
+                          **self.__contadores(importador))
+
+    @staticmethod
+    def __contadores(importador):
+        return {
+            'filas_procesadas': importador.filas_procesadas,
+            'importados': importador.productos_importados,
+            'actualizados': importador.productos_actualizados,
+            'sin_cambios': importador.productos_sin_cambios,
+            'duplicados': len(importador.productos_duplicados),
+            'errores': len(importador.errores),
+        }
+
+    # Procesos dueños de los trabajos
+    def __token_proceso(self):
+        """
+        Token de este proceso; mientras viva tiene tomado el lock de su
+        archivo en ruta_procesos
+        """
+        if self._proceso is None:
+            token = uuid.uuid4().hex
+            archivo = open(os.path.join(self.ruta_procesos, token), 'w')
+            fcntl.flock(archivo, fcntl.LOCK_EX)
+            self._proceso = (token, archivo)
+        return self._proceso[0]
+
+    def olvidar_proceso(self):
+        """
+        En el hijo de un fork: suelta su copia del archivo del padre (el lock
+        sigue siendo del padre) para sacar un token propio al encolar
+        """
+        if self._proceso is not None:
+            self._proceso[1].close()
+            self._proceso = None
+
+    def __proceso_vivo(self, token):
+        if not token:
+            return False
+        try:
+            with open(os.path.join(self.ruta_procesos, token)) as archivo:
+                fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except FileNotFoundError:
+            return False
+        except BlockingIOError:
+            return True
+        return False
+
+    def __recuperar(self):
+        """
+        Marca como fallidas las importaciones pendientes o en proceso cuyo
+        proceso ya no existe (reinicio o caída del worker) y borra los
+        archivos de procesos muertos
+        """
+        with self.__conectar() as db:
+            filas = db.execute(
+                "SELECT id, archivo, proceso FROM importacion WHERE estado IN (?, ?);",
+                (PENDIENTE, PROCESANDO)).fetchall()
+        for fila in filas:
+            if not self.__proceso_vivo(fila['proceso']):
+                logger.warning(f"Importación {fila['id']} interrumpida; se marca como fallida")
+                self.__actualizar(fila['id'], estado=FALLIDA,
+                                  mensaje='La importación se interrumpió porque el servidor '
+                                          'se reinició. Vuelva a subir el archivo.')
+                try:
+                    os.remove(fila['archivo'])
+                except OSError:
+                    pass
+        for token in os.listdir(self.ruta_procesos):
+            if not self.__proceso_vivo(token):
+                try:
+                    os.remove(os.path.join(self.ruta_procesos, token))
+                except OSError:
+                    pass
+
+    def __actualizar(self, id_importacion, **campos):
+        campos['actualizada'] = time.time()
+        set_q = ", ".join(f"{c} = ?" for c in campos)
+        with self.__conectar() as db:
+            db.execute(f"UPDATE importacion SET {set_q} WHERE id = ?;",
+                       tuple(campos.values()) + (id_importacion,))
+
+    @contextmanager
+    def __conectar(self):
+        db = sqlite3.connect(self.ruta_db, timeout=10)
+        db.row_factory = sqlite3.Row
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+
+def _olvidar_procesos():
+    for cola in list(_colas):
+        cola.olvidar_proceso()
+
+
+os.register_at_fork(after_in_child=_olvidar_procesos)
+
+
+class HuellasFilas:
+    """
+    Huellas de las filas de planilla que quedaron tal cual en la base, por
+    proveedor, guardadas en el mismo archivo SQLite que las importaciones.
+    Una fila con huella conocida no cambió desde que se importó y no hace
+    falta volver a resolverla. Cada huella anota el producto de la fila y
+    la categoría, el proveedor y la imagen a los que se resolvió: si después
+    se modifica o se elimina alguno (al eliminar una categoría, por ejemplo,
+    la base deja en NULL la de sus productos sin pasar por Tabla), la huella
+    se descarta.
+    """
+
+    def __init__(self, conectar, base=None):
+        self.__conectar = conectar
+        self.base = base
+
+    def obtener(self, proveedor):
+        """Conjunto de huellas del proveedor"""
+        with self.__conectar() as db:
+            return {fila['huella'] for fila in db.execute(
+                "SELECT huella FROM huella_fila WHERE proveedor = ?;", (proveedor,))}
+
+    def guardar(self, filas):
+        """Anota filas (proveedor, huella, id del producto, cat_id, prov_id, img_id)"""
+        with self.__conectar() as db:
+            db.executemany(
+                "INSERT OR REPLACE INTO huella_fila (proveedor, huella, producto, "
+                f"{', '.join(CAMPOS_RELACIONES)}) VALUES (?, ?, ?, ?, ?, ?);", filas)
+
+    def descartar(self, cambio):
+        """
+        Observador de Tabla: quita las huellas de los productos escritos
+        fuera de la fila que las generó, o de las filas que usan una
+        categoría, proveedor o imagen escritos (todas las que usan esa
+        tabla, si no se sabe cuáles registros: un alta sin ids no se
+        distingue de una modificación).
+        """
+        if cambio.modelo is Producto:
+            campo = 'producto'
+        elif cambio.modelo in MODELOS_RELACIONES:
+            campo = MODELOS_RELACIONES[cambio.modelo]
+        else:
+            return
+        if self.base is not None and cambio.modelo.conexion.config.get('database') != self.base:
+            return
+        with self.__conectar() as db:
+            if cambio.ids is None:
+                db.execute(f"DELETE FROM huella_fila WHERE {campo} IS NOT NULL;")
+                return
+            ids = [(id,) for id in cambio.ids if id is not None]
+            db.executemany(f"DELETE FROM huella_fila WHERE {campo} = ?;", ids)
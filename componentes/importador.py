@@ -0,0 +1,337 @@
+import logging
+
+from auxiliares.texto import clave
+from componentes.modelos import Categoria
+from componentes.modelos import Imagen
+from componentes.modelos import Proveedor
+from componentes.modelos import Producto
+
+logger = logging.getLogger(__name__)
+
+CATEGORIA_DEFAULT = "Sin categoría"
+
+# Filas que se resuelven e insertan juntas
+TAMANIO_LOTE = 500
+
+# Modos de importación: solo agregar productos nuevos (los que ya existen se
+# informan como duplicados) o además actualizar los existentes que cambiaron
+AGREGAR = 'agregar'
+ACTUALIZAR = 'actualizar'
+MODOS = (AGREGAR, ACTUALIZAR)
+
+# Campos de Producto que la planilla actualiza en el modo ACTUALIZAR
+CAMPOS_ACTUALIZABLES = ('art', 'cod', 'tit', 'desc', 'cat_id', 'img_id', 'prov_id')
+
+
+class ErrorImportacion(Exception):
+    """Error que impide continuar con la importación"""
+
+
+class ImportadorProductos:
+    """
+    Importa filas de productos por lotes.
+    Al empezar carga en diccionarios los proveedores, categorías e imágenes
+    existentes y los art/cod de los productos, así cada fila se resuelve en
+    memoria. En cada lote crea de una vez las entidades que falten y luego
+    inserta todos los productos nuevos con Producto.crear_lote (INSERT de
+    varias filas, que informa el id de cada uno), todo en una transacción:
+    un lote queda escrito entero o no queda nada de él.
+    En el modo ACTUALIZAR también carga los campos actualizables de los
+    productos: una fila cuyo art (o, si no, cod) ya existe se compara en
+    memoria con el producto y solo se escribe si algo cambió.
+    Con 'huellas' (ver HuellasFilas) las filas que ya quedaron tal cual en la
+    base en una importación anterior del mismo proveedor se cuentan sin
+    cambios antes de resolver nada, y se anotan las que quedan en esta.
+    """
+
+    def __init__(self, tamanio_lote=TAMANIO_LOTE, progreso=None, modo=AGREGAR,
+                 huellas=None, omitir_conocidas=True):
+        """'progreso' se llama con el importador después de cada lote"""
+        if modo not in MODOS:
+            raise ValueError(f"Modo de importación desconocido: '{modo}'")
+        self.tamanio_lote = tamanio_lote
+        self.progreso = progreso
+        self.modo = modo
+        self.huellas = huellas
+        self.omitir_conocidas = omitir_conocidas
+        self._conocidas = {}    # proveedor -> huellas de filas ya importadas
+        self.filas_procesadas = 0
+        self.productos_importados = 0
+        self.productos_actualizados = 0
+        self.productos_sin_cambios = 0
+        self.productos_duplicados = []
+        self.errores = []
+
+    def importar(self, filas):
+        """Importa las FilaLeida de leer_planilla() y devuelve el importador"""
+        self.preparar()
+
+        lote = []
+        for fila in filas:
+            lote.append(fila)
+            if len(lote) >= self.tamanio_lote:
+                self.procesar_lote(lote)
+                lote = []
+        if lote:
+            self.procesar_lote(lote)
+
+        logger.info(
+            f"Importación terminada: {self.productos_importados} importados, "
+            f"{self.productos_actualizados} actualizados, {self.productos_sin_cambios} sin cambios, "
+            f"{len(self.productos_duplicados)} duplicados, {len(self.errores)} errores")
+        return self
+
+    def preparar(self):
+        """Carga los mapas de búsqueda y la categoría por defecto"""
+        self.proveedores = {clave(p.cod): p.id for p in Proveedor.obtener() if p.cod}
+        self.categorias = {clave(c.name): c.id for c in Categoria.obtener() if c.name}
+        self.imagenes = {clave(i.url_img): i.id for i in Imagen.obtener() if i.url_img}
+
+        self.arts = set()
+        self.cods = set()
+        for art, cod in Producto.obtener_columnas('art', 'cod'):
+            if art:
+                self.arts.add(clave(art))
+            if cod:
+                self.cods.add(clave(cod))
+
+        # Modo ACTUALIZAR: {id: valores de CAMPOS_ACTUALIZABLES} y el id de
+        # cada art y cod (el menor si se repiten)
+        self.existentes = {}
+        self.ids_por_art = {}
+        self.ids_por_cod = {}
+        self.actualizados = set()
+        if self.modo == ACTUALIZAR:
+            for id, *valores in sorted(Producto.obtener_columnas('id', *CAMPOS_ACTUALIZABLES)):
+                self.existentes[id] = tuple(valores)
+                art, cod = valores[0], valores[1]
+                if art:
+                    self.ids_por_art.setdefault(clave(art), id)
+                if cod:
+                    self.ids_por_cod.setdefault(clave(cod), id)
+
+        self.cat_default_id = self.categorias.get(clave(CATEGORIA_DEFAULT))
+        if self.cat_default_id is None:
+            # Constructor Categoria SIN id: (name, unit)
+            cat_default_id = Categoria(CATEGORIA_DEFAULT, None).guardar_db()
+            if not cat_default_id or not isinstance(cat_default_id, int):
+                raise ErrorImportacion('No se pudo crear la categoría por defecto')
+            self.cat_default_id = cat_default_id
+            self.categorias[clave(CATEGORIA_DEFAULT)] = cat_default_id
+
+    def procesar_lote(self, lote):
+        # Huella de cada fila del lote: {nro_fila: (proveedor, huella)}
+        self._huellas_lote = {}
+        # Filas escritas o ya iguales en la base: {nro_fila: id del producto o None}
+        self._confirmadas = {}
+        # Registros relacionados de cada fila: {nro_fila: (cat_id, prov_id, img_id)}
+        self._relaciones_lote = {}
+
+        leidas = []
+        for leida in lote:
+            if self.huellas and leida.huella:
+                if self.omitir_conocidas and leida.huella in self.conocidas(leida.proveedor):
+                    self.productos_sin_cambios += 1
+                    continue
+                self._huellas_lote[leida.numero] = (leida.proveedor, leida.huella)
+            if leida.error:
+                self.errores.append(leida.error)
+            else:
+                leidas.append(leida.fila)
+
+        # Todo lo que escribe el lote se confirma con un solo commit
+        with Producto.transaccion():
+            # Crear de una vez los proveedores, categorías e imágenes que no existen
+            self.crear_faltantes(
+                Proveedor, 'cod', self.proveedores, (f['prov'] for f in leidas),
+                lambda cod: Proveedor(cod, f"Proveedor {cod}", None))
+            self.crear_faltantes(
+                Categoria, 'name', self.categorias, (f['cat'] for f in leidas),
+                lambda nombre: Categoria(nombre, None))
+            self.crear_faltantes(
+                Imagen, 'url_img', self.imagenes, (f['img'] for f in leidas),
+                lambda url: Imagen(url, None))
+
+            nuevos = []
+            cambios = []
+            for fila in leidas:
+                try:
+                    producto = self.armar_producto(fila)
+                except Exception as e:
+                    self.errores.append(f"Fila {fila['fila']}: Error inesperado - {str(e)}")
+                    continue
+                if isinstance(producto, Producto):
+                    nuevos.append((fila['fila'], producto))
+                elif producto:
+                    cambios.append((fila['fila'], producto))
+
+            self.guardar_productos(nuevos)
+            self.guardar_cambios(cambios)
+
+        # Las huellas se anotan recién con el lote confirmado en la base
+        self.guardar_huellas()
+
+        self.filas_procesadas += len(lote)
+        if self.progreso:
+            self.progreso(self)
+
+    def crear_faltantes(self, modelo, campo, mapa, valores, fabrica):
+        """
+        Inserta en un solo lote los valores que no están en el mapa y
+        agrega al mapa los ids asignados por la base. Con crear_lote() la
+        escritura informa los ids nuevos: un alta sin ids descartaría todas
+        las huellas de filas que usan la tabla (ver HuellasFilas).
+        """
+        faltantes = {}
+        for valor in valores:
+            if valor and clave(valor) not in mapa:
+                faltantes.setdefault(clave(valor), valor)
+        if not faltantes:
+            return
+
+        modelo.crear_lote([fabrica(valor) for valor in faltantes.values()])
+        for registro in modelo.obtener_en(campo, faltantes.values()):
+            mapa.setdefault(clave(getattr(registro, campo)), registro.id)
+
+        creados = [valor for k, valor in faltantes.items() if k in mapa]
+        logger.info(f"{modelo.__name__}: {len(creados)} creados ({', '.join(creados)})")
+
+    def armar_producto(self, fila):
+        """
+        Resuelve las relaciones de la fila y devuelve el Producto a insertar o,
+        en el modo ACTUALIZAR, los campos a cambiar de un producto existente
+        """
+        row_num = fila['fila']
+
+        prov_id = self.proveedores.get(clave(fila['prov']))
+        if prov_id is None:
+            self.errores.append(f"Fila {row_num}: No se pudo crear el proveedor con código '{fila['prov']}'")
+            return None
+
+        cat_id = self.cat_default_id  # Por defecto usar "Sin categoría"
+        if fila['cat']:
+            cat_id = self.categorias.get(clave(fila['cat']))
+            if cat_id is None:
+                self.errores.append(f"Fila {row_num}: No se pudo crear la categoría '{fila['cat']}', usando categoría por defecto")
+                cat_id = self.cat_default_id
+
+        img_id = None
+        if fila['img']:
+            img_id = self.imagenes.get(clave(fila['img']))
+            if img_id is None:
+                self.errores.append(f"Fila {row_num}: No se pudo crear la imagen '{fila['img']}'")
+
+        self._relaciones_lote[row_num] = (cat_id, prov_id, img_id)
+
+        art, cod, desc = fila['art'], fila['cod'], fila['desc']
+        if self.modo == ACTUALIZAR:
+            id = self.ids_por_art.get(clave(art)) if art else None
+            if id is None and cod:
+                id = self.ids_por_cod.get(clave(cod))
+            if id is not None and id not in self.actualizados:
+                # Una celda vacía de categoría o imagen no borra la del producto
+                cambios = self.armar_cambios(id, {
+                    'art': art, 'cod': cod, 'tit': fila['tit'], 'desc': desc,
+                    'cat_id': cat_id if fila['cat'] else None,
+                    'img_id': img_id, 'prov_id': prov_id,
+                })
+                if cambios is None:
+                    self._confirmadas[row_num] = id
+                return cambios
+
+        # Verificar si el producto ya existe (o ya vino antes en el archivo) por art o cod
+        if (art and clave(art) in self.arts) or (cod and clave(cod) in self.cods):
+            self.productos_duplicados.append({
+                'fila': row_num,
+                'art': art or 'N/A',
+                'cod': cod or 'N/A',
+                'desc': desc[:50] + '...' if len(desc) > 50 else desc,
+                'proveedor': fila['prov']
+            })
+            logger.info(f"Fila {row_num}: Producto duplicado detectado (art={art}, cod={cod})")
+            return None
+
+        if art:
+            self.arts.add(clave(art))
+        if cod:
+            self.cods.add(clave(cod))
+
+        # Constructor: Producto(art, cod, tit, desc, cat_id, img_id, prov_id, rating)
+        return Producto(art, cod, fila['tit'], desc, cat_id, img_id, prov_id, 0)
+
+    def armar_cambios(self, id, valores):
+        """
+        Compara los valores de la fila con los del producto 'id' y devuelve
+        un diccionario con 'id' y los campos que cambiaron (None si ninguno).
+        Los valores None no se comparan: se conserva lo que tiene el producto.
+        """
+        self.actualizados.add(id)
+        actuales = dict(zip(CAMPOS_ACTUALIZABLES, self.existentes[id]))
+        cambios = {campo: valor for campo, valor in valores.items()
+                   if valor is not None and valor != actuales[campo]}
+        if not cambios:
+            self.productos_sin_cambios += 1
+            return None
+
+        for campo, mapa in (('art', self.ids_por_art), ('cod', self.ids_por_cod)):
+            if cambios.get(campo):
+                mapa.setdefault(clave(cambios[campo]), id)
+                (self.arts if campo == 'art' else self.cods).add(clave(cambios[campo]))
+        cambios['id'] = id
+        return cambios
+
+    def guardar_cambios(self, cambios):
+        """
+        Modifica los productos existentes del lote con Producto.modificar_lote,
+        que agrupa los que cambian los mismos campos en un executemany
+        """
+        if not cambios:
+            return
+
+        resultados = Producto.modificar_lote([campos for _, campos in cambios])
+        for (row_num, campos), resultado in zip(cambios, resultados):
+            if resultado.error:
+                self.errores.append(
+                    f"Fila {row_num}: No se pudo actualizar el producto {campos['id']} - {resultado.error}")
+                continue
+            self.productos_actualizados += 1
+            self._confirmadas[row_num] = campos['id']
+
+    def guardar_productos(self, nuevos):
+        """
+        Inserta los productos del lote; si el INSERT falla, crear_lote
+        reintenta fila por fila e informa cuáles no se pudieron guardar
+        """
+        if not nuevos:
+            return
+
+        resultados = Producto.crear_lote([producto for _, producto in nuevos])
+        for (row_num, producto), resultado in zip(nuevos, resultados):
+            if resultado.error:
+                self.errores.append(f"Fila {row_num}: No se obtuvo ID al guardar producto '{producto.tit}'")
+                continue
+            self.productos_importados += 1
+            self._confirmadas[row_num] = resultado.id
+
+    def conocidas(self, proveedor):
+        """Huellas de las filas del proveedor ya importadas (se leen una vez)"""
+        if proveedor not in self._conocidas:
+            self._conocidas[proveedor] = self.huellas.obtener(proveedor)
+        return self._conocidas[proveedor]
+
+    def guardar_huellas(self):
+        """
+        Anota las huellas de las filas del lote que quedaron en la base, con
+        el id de su producto y los de sus registros relacionados (sin id no
+        se podría descartar la huella al modificarlo, y la fila no se anota)
+        """
+        if not self.huellas:
+            return
+        filas = [self._huellas_lote[n] + (id,) + self._relaciones_lote[n]
+                 for n, id in self._confirmadas.items()
+                 if id is not None and n in self._huellas_lote]
+        if not filas:
+            return
+        self.huellas.guardar(filas)
+        for proveedor, huella, *_ in filas:
+            self.conocidas(proveedor).add(huella)
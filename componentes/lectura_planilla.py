@@ -0,0 +1,111 @@
+"""
+Lectura y validación de las filas de una planilla de productos, antes de
+tocar la base; los resultados van en el orden de la hoja a la etapa de
+escritura (ImportadorProductos).
+
+openpyxl se importa recién al leer una planilla: cargarlo lleva más que el
+resto de la aplicación y el servidor lo necesita solo cuando alguien sube
+un archivo.
+
+Las filas se leen y validan en este proceso: casi todo el tiempo se va en
+interpretar el XML de la hoja, que openpyxl hace en un solo recorrido, y
+repartir entre procesos solo la validación no compensa copiarles las filas
+(ver benchmarks.lectura).
+"""
+from collections import namedtuple
+
+from auxiliares.cifrado import huella_fila
+from auxiliares.texto import clave
+
+# Mapeo de columnas del Excel a campos del modelo Producto
+COLUMNAS = {
+    'proveedor': ['Proveedor', 'proveedor', 'prov', 'Prov'],
+    'art': ['Artículo', 'Articulo', 'artículo', 'articulo', 'art', 'Art'],
+    'cod': ['Código', 'Codigo', 'código', 'codigo', 'cod', 'Cod'],
+    'desc': ['Descripción', 'Descripcion', 'descripción', 'descripcion', 'desc', 'Desc'],
+    'cat': ['Categoría', 'Categoria', 'categoría', 'categoria', 'cat', 'Cat'],
+    'img': ['Imagen', 'imagen', 'img', 'Img']
+}
+
+# Orden de los valores en las tuplas que devuelve filas_planilla()
+CAMPOS_FILA = ('proveedor', 'art', 'cod', 'desc', 'cat', 'img')
+
+# Fila leída y validada: huella de los valores (None sin proveedor), 'fila'
+# con los valores para importar o el mensaje de 'error'
+FilaLeida = namedtuple('FilaLeida', ['numero', 'proveedor', 'huella', 'fila', 'error'])
+
+
+def filas_planilla(ruta):
+    """
+    Lee la planilla en modo streaming (read_only, sin armar el libro en
+    memoria) y devuelve tuplas (nro_fila, proveedor, art, cod, desc, cat, img)
+    con los valores ya limpios. Las columnas se resuelven una sola vez desde
+    el encabezado, así que la memoria no depende del tamaño del archivo.
+    """
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        filas = workbook.active.iter_rows(values_only=True)
+        header = next(filas, ())
+        indices = [indices_columna(header, campo) for campo in CAMPOS_FILA]
+
+        for row_num, row in enumerate(filas, start=2):
+            yield (row_num,) + tuple(primer_valor(row, i) for i in indices)
+    finally:
+        workbook.close()
+
+
+def indices_columna(header, campo):
+    """Posiciones de las columnas del campo, en el orden de sus nombres posibles"""
+    return [header.index(nombre) for nombre in COLUMNAS[campo] if nombre in header]
+
+
+def primer_valor(row, indices):
+    """Primer valor no vacío de la fila entre las columnas indicadas"""
+    for i in indices:
+        if i < len(row) and row[i] is not None:
+            valor = str(row[i]).strip()
+            if valor:
+                return valor
+    return None
+
+
+def leer_fila(valores):
+    """
+    Valida los valores (nro_fila, proveedor, art, cod, desc, cat, img) de una
+    fila y devuelve su FilaLeida
+    """
+    row_num, prov_codigo, art, cod, desc, cat, img = valores
+    proveedor = huella = None
+    try:
+        if prov_codigo:
+            proveedor, huella = clave(prov_codigo), huella_fila(valores[1:])
+
+        if not prov_codigo:
+            return FilaLeida(row_num, None, None, None,
+                             f"Fila {row_num}: Falta el código del proveedor")
+
+        if not desc:
+            return FilaLeida(row_num, proveedor, huella, None,
+                             f"Fila {row_num}: Falta la descripción del producto (campo obligatorio)")
+
+        return FilaLeida(row_num, proveedor, huella, {
+            'fila': row_num,
+            'prov': prov_codigo,
+            'art': art,
+            'cod': cod,
+            'desc': desc,
+            # Título generado automáticamente: primeras 3 palabras de la descripción
+            'tit': ' '.join(desc.split()[:3]),
+            'cat': cat,
+            'img': img,
+        }, None)
+    except Exception as e:
+        return FilaLeida(row_num, proveedor, huella, None,
+                         f"Fila {row_num}: Error inesperado - {str(e)}")
+
+
+def leer_planilla(ruta):
+    """FilaLeida de cada fila de la planilla, en orden"""
+    return (leer_fila(valores) for valores in filas_planilla(ruta))
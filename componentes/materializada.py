@@ -0,0 +1,174 @@
+import copy
+import logging
+import os
+import threading
+import weakref
+
+from base_db.tabla_db import LecturaFallida
+
+logger = logging.getLogger(__name__)
+
+# Vistas creadas, para olvidar sus reconstrucciones en el hijo de un fork
+_vistas = weakref.WeakSet()
+
+
+class VistaMaterializada:
+    """
+    Estructura en memoria derivada de una tabla (y sus relacionadas) que se
+    mantiene al día con las escrituras de Tabla.
+
+    Escucha los Cambio de Tabla y anota los registros afectados, que se
+    vuelven a leer en la próxima consulta con refrescar(). Si la escritura no
+    trae ids, o las versiones de las tablas cambiaron desde otro proceso, se
+    reconstruye todo con reconstruir(): la primera vez en la misma consulta,
+    después en un hilo aparte mientras se sigue sirviendo la estructura
+    anterior. Las subclases implementan esos dos métodos, nombran en
+    'estructuras' los atributos que arma reconstruir() y llaman a
+    actualizar() con el lock tomado antes de leer.
+    Cada hilo puede saber con versiones_servidas() de qué versiones de las
+    tablas era lo último que leyó, para no dar una ETag nueva a una
+    estructura anterior.
+    """
+
+    # Atributos que reconstruir() vuelve a crear (se cambian todos juntos)
+    estructuras = ()
+
+    def __init__(self, modelo, tablas=None):
+        self.modelo = modelo
+        self.tablas = tablas or (modelo.tabla,)
+        self._base = None         # Versiones de las tablas con que se armó
+        self._pendientes = set()  # Ids del modelo a volver a leer
+        self._armada = False      # Si hay una estructura para servir
+        self._armando = False     # Si hay una reconstrucción en segundo plano
+        self._lock = threading.RLock()
+        self._servida = threading.local()   # Versiones de lo último servido en cada hilo
+
+        modelo.observar(self.notificar)
+        _vistas.add(self)
+
+    def reconstruir(self):
+        """
+        Arma la estructura desde cero y devuelve la cantidad de registros, o
+        None si no se pudo leer la base. Corre sobre una copia de la vista y
+        sin el lock: tiene que crear estructuras nuevas, no vaciar las actuales.
+        """
+        raise NotImplementedError
+
+    def refrescar(self, ids):
+        """Vuelve a leer los registros 'ids' (los que ya no existen se quitan)"""
+        raise NotImplementedError
+
+    def afectados(self, tabla, ids):
+        """Ids del modelo afectados por una escritura en otra de las tablas"""
+        return set()
+
+    def invalidado(self):
+        """Se llama cada vez que cambia el contenido (para descartar derivados)"""
+
+    def actualizar(self):
+        """
+        Pone la estructura al día; llamar con self._lock tomado. Si todavía
+        no hay estructura y no se pudo leer la base lanza LecturaFallida (no
+        se sirve vacía) y la próxima consulta lo vuelve a intentar.
+        """
+        actuales = self.__versiones()
+        if actuales != self._base:
+            if not self._armada:
+                # Todavía no hay nada que servir: se arma en esta consulta
+                self.__instalar(actuales, self.__armar())
+                if not self._armada:
+                    raise LecturaFallida(f"No se pudo leer la tabla {self.modelo.tabla}")
+            elif not self._armando:
+                self._armando = True
+                threading.Thread(target=self.__reconstruir_en_segundo_plano,
+                                 name=f'vista-{self.modelo.tabla}', daemon=True).start()
+        elif self._pendientes:
+            ids = self._pendientes
+            self._pendientes = set()
+            self.refrescar(ids)
+            self.invalidado()
+        # Lo que se lea ahora es de 'actuales' solo si la vista quedó al día
+        self._servida.versiones = actuales if actuales == self._base else False
+
+    def versiones_servidas(self):
+        """
+        Versiones de las tablas ({tabla: token}) de lo último que sirvió la
+        vista en este hilo desde olvidar_servidas(): None si no se usó, o
+        False si sirvió la estructura anterior mientras se reconstruye
+        """
+        return getattr(self._servida, 'versiones', None)
+
+    def olvidar_servidas(self):
+        self._servida.versiones = None
+
+    def notificar(self, cambio):
+        """Observador de Tabla: anota los registros afectados por la escritura"""
+        tabla = cambio.modelo.tabla
+        if tabla not in self.tablas:
+            return
+
+        with self._lock:
+            if self._base is None:
+                return
+            try:
+                ids = {int(id) for id in cambio.ids} if cambio.ids is not None else None
+            except (TypeError, ValueError):
+                ids = None
+
+            # Si hubo otra escritura que no vimos (otro proceso), o no se
+            # sabe qué registros cambiaron, se reconstruye todo
+            if ids is None or self._base.get(tabla) != cambio.version_anterior:
+                self._base = None
+                return
+            self._base[tabla] = cambio.version
+
+            if tabla == self.modelo.tabla:
+                self._pendientes |= ids
+            else:
+                self._pendientes |= self.afectados(tabla, ids)
+
+    def __versiones(self):
+        return {tabla: self.modelo.versiones.version(tabla) for tabla in self.tablas}
+
+    def __armar(self):
+        """Copia de la vista con la estructura reconstruida, o None si falló la lectura"""
+        copia = copy.copy(self)
+        return copia if copia.reconstruir() is not None else None
+
+    def __instalar(self, actuales, copia):
+        """Pasa la estructura de 'copia' a la vista; llamar con self._lock tomado"""
+        if copia is None:
+            # Sin base la próxima consulta lo vuelve a intentar
+            return
+        for atributo in self.estructuras:
+            setattr(self, atributo, getattr(copia, atributo))
+        self._base = actuales
+        self._pendientes = set()
+        self._armada = True
+        self.invalidado()
+
+    def __reconstruir_en_segundo_plano(self):
+        try:
+            # Las versiones se leen antes que los registros: si hay una
+            # escritura durante la lectura, la próxima consulta reconstruye otra vez
+            actuales = self.__versiones()
+            copia = self.__armar()
+            with self._lock:
+                self.__instalar(actuales, copia)
+        except Exception:
+            logger.exception(f"Error reconstruyendo la vista de {self.modelo.tabla}")
+        finally:
+            with self._lock:
+                self._armando = False
+
+    def olvidar_reconstruccion(self):
+        """El hilo de una reconstrucción no pasa al hijo de un fork"""
+        self._armando = False
+
+
+def _olvidar_reconstrucciones():
+    for vista in list(_vistas):
+        vista.olvidar_reconstruccion()
+
+
+os.register_at_fork(after_in_child=_olvidar_reconstrucciones)
@@ -1,4 +1,4 @@
-from base_db.conexion_db import conexion
+from base_db.conexion_db import pool
 from base_db.tabla_db import Tabla
 from auxiliares.cifrado import encriptar
 
@@ -6,8 +6,11 @@ from auxiliares.cifrado import encriptar
 class Categoria(Tabla):
 
     tabla = 'category'
-    conexion = conexion
+    conexion = pool
+    usar_cache = True
     campos = ('id', 'name', 'unit')
+    campo_version = 'version'
+    campos_unicos = ('name',)
 
     def __init__(self, *args, de_bbdd=False):
         super().crear(args, de_bbdd)
@@ -16,8 +19,11 @@ class Categoria(Tabla):
 class Imagen(Tabla):
 
     tabla = 'image'
-    conexion = conexion
+    conexion = pool
+    usar_cache = True
     campos = ('id', 'url_img', 'txt_alt')
+    campo_version = 'version'
+    campos_unicos = ('url_img',)
 
     def __init__(self, *args, de_bbdd=False):
         super().crear(args, de_bbdd)
@@ -26,8 +32,11 @@ class Imagen(Tabla):
 class Proveedor(Tabla):
 
     tabla = 'prov'
-    conexion = conexion
+    conexion = pool
+    usar_cache = True
     campos = ('id', 'cod', 'name', 'obs')
+    campo_version = 'version'
+    campos_unicos = ('cod',)
 
     def __init__(self, *args, de_bbdd=False):
         super().crear(args, de_bbdd)
@@ -36,9 +45,16 @@ class Proveedor(Tabla):
 class Producto(Tabla):
 
     tabla = 'product'
-    conexion = conexion
+    conexion = pool
     campos = ('id', 'art', 'cod', 'tit', 'desc',
               'cat_id', 'img_id', 'prov_id', 'rating')
+    campo_version = 'version'
+    relaciones = {
+        'categoria': ('cat_id', Categoria),
+        'proveedor': ('prov_id', Proveedor),
+        'imagen': ('img_id', Imagen),
+    }
+    campos_numericos = ('rating',)
 
     def __init__(self, *args, de_bbdd=False):
         super().crear(args, de_bbdd)
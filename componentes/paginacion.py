@@ -0,0 +1,69 @@
+from base_db.tabla_db import LIMITE_PAGINA
+
+# Tope de registros por página que puede pedir un cliente
+LIMITE_MAXIMO = 1000
+
+PARAMETROS_PAGINA = ('after_id', 'limit', 'orden', 'dir')
+
+
+def leer_listado(args, modelo, por_defecto=False):
+    """
+    Traduce los parámetros del query string a argumentos de Tabla.listar():
+    ?after_id=&limit=&orden=&dir=asc|desc, más filtros por campo del modelo
+    (?cat_id=3) y rangos (?rating_min=1&rating_max=4).
+    Devuelve None si no se pidió paginar ni filtrar (y por_defecto=False).
+    Lanza ValueError si algún valor no es válido.
+    """
+    filtros = {}
+    for clave, valor in args.items():
+        campo = clave[:-4] if clave.endswith(('_min', '_max')) else clave
+        if campo in modelo.campos:
+            filtros[clave] = valor
+
+    if not filtros and not por_defecto and \
+            not any(p in args for p in PARAMETROS_PAGINA):
+        return None
+
+    try:
+        after_id = int(args['after_id']) if args.get('after_id') else None
+    except ValueError:
+        raise ValueError("'after_id' y 'limit' deben ser números enteros")
+    limit = leer_limite(args)
+
+    orden = args.get('orden', 'id')
+    if orden not in modelo.campos:
+        raise ValueError(f"No se puede ordenar por '{orden}'")
+
+    direccion = args.get('dir', 'asc').lower()
+    if direccion not in ('asc', 'desc'):
+        raise ValueError("'dir' debe ser 'asc' o 'desc'")
+
+    return {
+        'filtros': filtros,
+        'after_id': after_id,
+        'limit': limit,
+        'orden': orden,
+        'descendente': direccion == 'desc',
+    }
+
+
+def leer_limite(args, por_defecto=LIMITE_PAGINA):
+    """Valor de ?limit= (o 'por_defecto'); lanza ValueError si no es válido"""
+    try:
+        limit = int(args.get('limit') or por_defecto)
+    except ValueError:
+        raise ValueError("'after_id' y 'limit' deben ser números enteros")
+    if not 0 < limit <= LIMITE_MAXIMO:
+        raise ValueError(f"'limit' debe estar entre 1 y {LIMITE_MAXIMO}")
+    return limit
+
+
+def siguiente_id(registros, listado):
+    """
+    Cursor de la página siguiente, o None si esta fue la última.
+    'registros' pueden ser objetos o tuplas de columnas con el id primero.
+    """
+    if listado and len(registros) == listado['limit']:
+        ultimo = registros[-1]
+        return ultimo[0] if isinstance(ultimo, tuple) else ultimo.id
+    return None
@@ -0,0 +1,175 @@
+"""
+Serialización a JSON de los registros para la API, sin diccionarios
+intermedios. El serializador de cada modelo sale de sus 'campos' y
+'relaciones': por cada juego de columnas arma una vez una plantilla con las
+claves ya escritas, y cada fila se codifica directo desde la tupla leída de
+la base. Las claves van en orden alfabético y sin espacios, como las escribe
+el proveedor JSON de Flask, así las respuestas no cambian.
+"""
+from itertools import repeat
+from json.encoder import encode_basestring
+from operator import attrgetter
+
+from flask.json.provider import DefaultJSONProvider
+
+# Parámetro del query string con las claves a devolver (?fields=tit,categoria)
+PARAMETRO_CAMPOS = 'fields'
+
+
+class JSONSerializado(bytes):
+    """JSON ya armado: jsonify() lo envía tal cual, sin volver a codificarlo"""
+
+
+class ProveedorJSON(DefaultJSONProvider):
+    """
+    Proveedor JSON de la aplicación: no escapa los caracteres no ASCII,
+    responde un JSONSerializado sin pasarlo por json.dumps y guarda el
+    SerializadorModelo de cada modelo.
+    """
+
+    ensure_ascii = False
+
+    def __init__(self, app):
+        super().__init__(app)
+        self._serializadores = {}
+
+    def serializador(self, modelo):
+        """SerializadorModelo de 'modelo' (se arma una sola vez)"""
+        serializador = self._serializadores.get(modelo)
+        if serializador is None:
+            serializador = self._serializadores.setdefault(modelo, SerializadorModelo(modelo, self))
+        return serializador
+
+    def dumps(self, obj, **kwargs):
+        if isinstance(obj, JSONSerializado):
+            return obj.decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if len(args) == 1 and not kwargs and isinstance(args[0], JSONSerializado):
+            return self._app.response_class(args[0] + b"\n", mimetype=self.mimetype)
+        return super().response(*args, **kwargs)
+
+
+class SerializadorModelo:
+    """
+    Codifica registros de un modelo a JSON desde tuplas de columnas.
+    Un campo de relación (cat_id) sale con el nombre de la relación
+    (categoria) y el registro relacionado completo, o null.
+    """
+
+    def __init__(self, modelo, proveedor):
+        self.modelo = modelo
+        self.proveedor = proveedor
+        self._relaciones = {campo: (nombre, clase)
+                            for nombre, (campo, clase) in modelo.relaciones.items()}
+        # Clave del JSON de cada columna
+        self.claves = {campo: self._relaciones[campo][0] if campo in self._relaciones else campo
+                       for campo in modelo._campos_dict}
+        self._plantillas = {}     # columnas -> (plantilla, pasos)
+
+    def columnas(self, pedidas=None):
+        """
+        Columnas a leer de la base para devolver las claves 'pedidas' (todas
+        si es None), en el orden de la tabla; 'id' va siempre y primero.
+        Lanza ValueError si alguna clave no existe.
+        """
+        if pedidas is None:
+            return self.modelo._campos_dict
+        for clave in pedidas:
+            if clave not in self.claves.values():
+                raise ValueError(f"No se puede pedir el campo '{clave}'")
+        return tuple(campo for campo, clave in self.claves.items()
+                     if campo == 'id' or clave in pedidas)
+
+    def leer_campos(self, args):
+        """Columnas para ?fields= del query string (todas si no vino)"""
+        texto = args.get(PARAMETRO_CAMPOS)
+        if texto is None:
+            return self.columnas()
+        pedidas = [clave.strip() for clave in texto.split(',') if clave.strip()]
+        if not pedidas:
+            raise ValueError(f"'{PARAMETRO_CAMPOS}' debe listar al menos un campo")
+        return self.columnas(pedidas)
+
+    def lista(self, filas, columnas):
+        """Lista JSON de las 'filas' (tuplas con 'columnas')"""
+        fragmentos = self.fragmentos(filas, columnas, self.relacionados(filas, columnas))
+        return JSONSerializado(('[' + ','.join(fragmentos) + ']').encode('utf-8'))
+
+    def uno(self, registro, columnas=None):
+        """JSON de un registro (objeto del modelo) con 'columnas' (todas si es None)"""
+        columnas = columnas or self.columnas()
+        filas = self.tuplas([registro], columnas)
+        fragmento, = self.fragmentos(filas, columnas, self.relacionados(filas, columnas))
+        return JSONSerializado(fragmento.encode('utf-8'))
+
+    def tuplas(self, registros, columnas):
+        """Tuplas con 'columnas' de los registros (objetos del modelo)"""
+        leer = attrgetter(*columnas)
+        if len(columnas) == 1:
+            return [(leer(registro),) for registro in registros]
+        return [leer(registro) for registro in registros]
+
+    def relacionados(self, filas, columnas):
+        """
+        {relación: {id: JSON del registro}} de las relaciones que están en
+        'columnas', con los registros que usan las 'filas'. Una consulta por
+        tabla relacionada, o ninguna si ya están en caché.
+        """
+        resultado = {}
+        for indice, campo in enumerate(columnas):
+            if campo not in self._relaciones:
+                continue
+            nombre, clase = self._relaciones[campo]
+            serializador = self.proveedor.serializador(clase)
+            registros = clase.obtener_en('id', {fila[indice] for fila in filas})
+            columnas_clase = serializador.columnas()
+            filas_clase = serializador.tuplas(registros, columnas_clase)
+            resultado[nombre] = dict(zip(
+                (registro.id for registro in registros),
+                serializador.fragmentos(filas_clase, columnas_clase,
+                                        serializador.relacionados(filas_clase, columnas_clase))))
+        return resultado
+
+    def fragmentos(self, filas, columnas, relacionados):
+        """JSON (str) de cada fila; 'relacionados' como lo arma relacionados()"""
+        if not filas:
+            return []
+        plantilla, pasos = self.__plantilla(columnas)
+        # Se codifica por columna (un map por columna, no una llamada por
+        # valor desde Python) y después se completa la plantilla de cada fila
+        valores = list(zip(*filas))
+        codificadas = [
+            map(self.codificar, valores[indice]) if relacion is None else
+            map(relacionados[relacion].get, valores[indice], repeat('null'))
+            for indice, relacion in pasos
+        ]
+        return [plantilla % fila for fila in zip(*codificadas)]
+
+    def codificar(self, valor):
+        """JSON de un valor de columna"""
+        tipo = type(valor)
+        if tipo is str:
+            return encode_basestring(valor)
+        if tipo is int:
+            return int.__repr__(valor)
+        if valor is None:
+            return 'null'
+        return self.proveedor.dumps(valor)
+
+    def __plantilla(self, columnas):
+        """
+        ('{"clave":%s,...}', ((índice de la columna, relación o None), ...))
+        para 'columnas', con las claves en orden alfabético
+        """
+        columnas = tuple(columnas)
+        plantilla = self._plantillas.get(columnas)
+        if plantilla is None:
+            orden = sorted(range(len(columnas)), key=lambda i: self.claves[columnas[i]])
+            texto = '{' + ','.join(
+                f'{encode_basestring(self.claves[columnas[i]])}:%s' for i in orden) + '}'
+            pasos = tuple((i, self._relaciones[columnas[i]][0] if columnas[i] in self._relaciones
+                           else None) for i in orden)
+            plantilla = self._plantillas.setdefault(columnas, (texto, pasos))
+        return plantilla
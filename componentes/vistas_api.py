@@ -1,66 +1,286 @@
-from flask import jsonify, request
+import functools
+
+from flask import jsonify, request, url_for, make_response
+from base_db.tabla_db import LecturaFallida, cache, metricas, versiones
+from componentes.buscador import IndiceBusqueda, LIMITE_RESULTADOS
+from componentes.catalogo import CatalogoSerializado
+from componentes.codigos import IndiceCodigos
+from componentes.exportacion import FORMATOS, exportar
+from componentes.importaciones import cola_importaciones
 from componentes.modelos import Categoria, Imagen, Proveedor, Producto
+from componentes.paginacion import leer_listado, leer_limite, siguiente_id
+from componentes.serializacion import PARAMETRO_CAMPOS
+
+# Registros como máximo por request a /api/<recurso>/lote
+LIMITE_LOTE = 10000
 
 
 def registrar_rutas(app):
+
+    def condicional(*modelos, vistas=()):
+        """
+        GET condicional: la ETag se arma con la URL pedida y las versiones
+        de las tablas de 'modelos'. Si el cliente ya tiene esa versión
+        (If-None-Match) se responde 304 sin consultar la base.
+        La ETag es débil: el catálogo va en gzip o sin comprimir según el
+        cliente, y una ETag fuerte no puede ser la misma para las dos
+        codificaciones.
+        Si la respuesta salió de alguna de las 'vistas' (VistaMaterializada)
+        armada con otras versiones, por ejemplo mientras se reconstruye en
+        segundo plano, va sin ETag: quedaría guardada como vigente.
+        """
+        def decorador(vista):
+            @functools.wraps(vista)
+            def envoltura(*args, **kwargs):
+                # La versión se lee antes de consultar: si hay una escritura
+                # durante la consulta, la próxima petición no dará 304
+                actuales = {modelo.tabla: versiones.version(modelo.tabla) for modelo in modelos}
+                etag = versiones.etag(request.full_path, actuales)
+                if request.if_none_match.contains_weak(etag):
+                    respuesta = make_response('', 304)
+                else:
+                    for materializada in vistas:
+                        materializada.olvidar_servidas()
+                    respuesta = make_response(vista(*args, **kwargs))
+                    # Un error (también una lectura fallida, que responde
+                    # 500) no lleva ETag ni se puede guardar en caché
+                    if respuesta.status_code != 200:
+                        return respuesta
+                    if not all(servida_con(materializada, actuales) for materializada in vistas):
+                        return respuesta
+                respuesta.set_etag(etag, weak=True)
+                respuesta.headers['Cache-Control'] = 'no-cache'
+                return respuesta
+            return envoltura
+        return decorador
+
+    def servida_con(materializada, actuales):
+        """Si lo que sirvió 'materializada' en este request es de las versiones 'actuales'"""
+        servidas = materializada.versiones_servidas()
+        if servidas is None:
+            return True     # No se usó para esta respuesta
+        return servidas is not False and all(
+            actuales.get(tabla) == token for tabla, token in servidas.items())
+
+    def error_alta(registro):
+        """
+        Respuesta cuando guardar_db() no pudo insertar 'registro': 409 si ya
+        existe otro con el mismo valor en un campo único, si no 500
+        """
+        for campo in registro.campos_unicos:
+            valor = getattr(registro, campo)
+            if valor is not None and registro.obtener(campo, valor):
+                return jsonify({"error": f"Ya existe un registro con {campo} '{valor}'"}), 409
+        return jsonify({"error": "No se pudo crear el registro"}), 500
+
+    def listar_registros(modelo, listado, columnas):
+        """
+        Tuplas con 'columnas' de los registros pedidos según los parámetros
+        de paginación y filtros del request (ver leer_listado()). Sin
+        parámetros devuelve la tabla completa, en orden de id.
+        Si no se pudo leer la base lanza LecturaFallida: una lista vacía
+        llevaría ETag y quedaría válida aunque la base vuelva.
+        """
+        if listado:
+            filas = modelo.listar(**listado, columnas=columnas, estricto=True)
+        else:
+            filas = modelo.obtener_columnas(*columnas, estricto=True)
+        if filas is None:
+            raise LecturaFallida(f"No se pudo leer la tabla {modelo.tabla}")
+        return filas if listado else sorted(filas)
+
+    def respuesta_recursos(modelo):
+        """
+        Listado JSON de un modelo armado desde las tuplas de la base, solo
+        con las columnas de ?fields= (todas si no vino)
+        """
+        serializador = app.json.serializador(modelo)
+        listado = leer_listado(request.args, modelo)
+        columnas = serializador.leer_campos(request.args)
+        filas = listar_registros(modelo, listado, columnas)
+        return respuesta_listado(serializador.lista(filas, columnas), filas, listado)
+
+    def respuesta_recurso(modelo, id, no_encontrado):
+        """
+        Un registro por id, solo con las columnas de ?fields= (todas si no
+        vino). La ETag es fuerte y empieza con la versión del registro: es
+        la que se devuelve en If-Match para modificarlo o eliminarlo.
+        """
+        serializador = app.json.serializador(modelo)
+        columnas = serializador.leer_campos(request.args)
+        registro = modelo.obtener('id', id)
+        if not registro:
+            return jsonify({"error": no_encontrado}), 404
+
+        etag = etag_registro(modelo, registro)
+        if etag is not None and request.if_none_match.contains(etag):
+            respuesta = make_response('', 304)
+        else:
+            respuesta = jsonify(serializador.uno(registro, columnas))
+        if etag is not None:
+            respuesta.set_etag(etag)
+            respuesta.headers['Cache-Control'] = 'no-cache'
+        return respuesta
+
+    def etag_registro(modelo, registro):
+        """
+        ETag de un registro: su versión ("3"). Si el modelo tiene relaciones,
+        que van completas en el JSON, se agrega la huella de las versiones
+        de esas tablas ("3-9f2c..."): cambian la respuesta sin cambiar el registro.
+        """
+        if modelo.campo_version is None:
+            return None
+        version = str(getattr(registro, modelo.campo_version))
+        relacionadas = {clase.tabla: versiones.version(clase.tabla)
+                        for _, clase in modelo.relaciones.values()}
+        if not relacionadas:
+            return version
+        return f"{version}-{versiones.etag(request.full_path, relacionadas)[:16]}"
+
+    def respuesta_listado(datos, registros, listado):
+        """
+        Respuesta JSON de un listado. Si hay más páginas, el cursor siguiente
+        va en los encabezados 'X-Siguiente-Id' y 'Link' (rel="next").
+        """
+        respuesta = jsonify(datos)
+        siguiente = siguiente_id(registros, listado)
+        if siguiente is not None:
+            args = request.args.to_dict()
+            args['after_id'] = siguiente
+            respuesta.headers['X-Siguiente-Id'] = str(siguiente)
+            respuesta.headers['Link'] = f'<{url_for(request.endpoint, **args)}>; rel="next"'
+        return respuesta, 200
+
+    def version_if_match():
+        """
+        Versión del registro enviada en If-Match (None si no se envió o es
+        '*'): la ETag de GET /api/<recurso>/<id> ("3" o "3-9f2c...") o solo
+        el número. ValueError si no es una única ETag de registro.
+        """
+        if not request.if_match or request.if_match.star_tag:
+            return None
+        etiquetas = request.if_match.as_set(include_weak=True)
+        version = next(iter(etiquetas)).partition('-')[0] if len(etiquetas) == 1 else ''
+        if not version.isdigit():
+            raise ValueError('If-Match debe ser la ETag del registro o su versión, por ejemplo "3"')
+        return int(version)
+
+    def respuesta_escritura(modelo, id, version, filas, no_encontrado):
+        """
+        Respuesta de un PUT o DELETE hecho en una sola consulta, según las
+        filas que afectó. Si no afectó ninguna el registro no existe (404)
+        o, con If-Match, ya no está en esa versión (412): solo entonces se
+        consulta cuál de los dos casos es.
+        """
+        if filas is False:
+            mensaje = ('No se pudo eliminar el registro.' if request.method == 'DELETE' else
+                       'No se pudo modificar el registro. Verifique que las relaciones (IDs) existan.')
+            return jsonify({"error": mensaje}), 400
+        if not filas:
+            if version is not None and modelo.ids_existentes([id]):
+                return jsonify({"error": "El registro fue modificado por otro usuario; "
+                                         "vuelva a leerlo antes de guardar"}), 412
+            return jsonify({"error": no_encontrado}), 404
+        
+        if request.method == 'DELETE':
+            return jsonify({"mensaje": "Eliminación exitosa."}), 200
+        datos = {"mensaje": "Modificación exitosa."}
+        if version is not None:
+            datos["version"] = version + 1
+        return jsonify(datos), 200
+
+    # Catálogo completo de productos ya serializado, para GET /api/productos
+    catalogo = CatalogoSerializado(Producto, app.json.serializador(Producto))
+    app.extensions['catalogo'] = catalogo
+
+    # Índice invertido para GET /api/productos/buscar
+    buscador = IndiceBusqueda(Producto)
+    app.extensions['buscador'] = buscador
+
+    # Artículos y códigos de barras para GET /api/productos/codigo/<valor>
+    codigos = IndiceCodigos(Producto)
+    app.extensions['codigos'] = codigos
+
+    def respuesta_catalogo():
+        """Sirve el catálogo desde memoria, en gzip si el cliente lo acepta"""
+        comprimido = request.accept_encodings['gzip'] > 0
+        respuesta = app.response_class(
+            catalogo.cuerpo(comprimido), mimetype=app.json.mimetype)
+        if comprimido:
+            respuesta.headers['Content-Encoding'] = 'gzip'
+        respuesta.vary.add('Accept-Encoding')
+        return respuesta
     
     # ========== PRODUCTOS ==========
     
     @app.route("/api/productos", methods=['GET'])
+    @condicional(Producto, Categoria, Proveedor, Imagen, vistas=(catalogo,))
     def api_productos():
         """Obtener todos los productos con sus relaciones"""
         try:
-            productos = Producto.obtener()
-            datos = []
+            if leer_listado(request.args, Producto) is None and PARAMETRO_CAMPOS not in request.args:
+                return respuesta_catalogo()
             
-            for producto in productos:
-                producto_dict = producto.__dict__.copy()
-                
-                # Obtener relaciones
-                categoria = Categoria.obtener('id', producto_dict.get('cat_id'))
-                proveedor = Proveedor.obtener('id', producto_dict.get('prov_id'))
-                imagen = Imagen.obtener('id', producto_dict.get('img_id'))
-                
-                # Agregar relaciones al diccionario
-                producto_dict['categoria'] = categoria.__dict__ if categoria else None
-                producto_dict['proveedor'] = proveedor.__dict__ if proveedor else None
-                producto_dict['imagen'] = imagen.__dict__ if imagen else None
-                
-                # Eliminar IDs de relaciones
-                del producto_dict['cat_id']
-                del producto_dict['prov_id']
-                del producto_dict['img_id']
-                
-                datos.append(producto_dict)
+            return respuesta_recursos(Producto)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+    
+    @app.route("/api/productos/buscar", methods=['GET'])
+    @condicional(Producto, Categoria, Proveedor, Imagen, vistas=(buscador, catalogo))
+    def api_productos_buscar():
+        """Buscar productos por título, descripción, artículo o código"""
+        try:
+            texto = request.args.get('q', '').strip()
+            if not texto:
+                return jsonify({"error": "Falta el texto a buscar ('q')"}), 400
+            limite = leer_limite(request.args, LIMITE_RESULTADOS)
+            
+            ids = buscador.buscar(texto, limite)
+            return app.response_class(catalogo.unir(ids), mimetype=app.json.mimetype)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+    
+    @app.route("/api/productos/codigo/<path:valor>", methods=['GET'])
+    @condicional(Producto, Categoria, Proveedor, Imagen, vistas=(codigos, catalogo))
+    def api_producto_codigo(valor):
+        """Obtener un producto por artículo o, si no hay, por código"""
+        try:
+            id = codigos.buscar(valor)
+            producto = catalogo.fragmento(id) if id is not None else None
+            if producto is None:
+                return jsonify({"error": "Producto no encontrado"}), 404
             
-            return jsonify(datos), 200
+            return app.response_class(producto + b"\n", mimetype=app.json.mimetype)
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
+    @app.route("/api/productos/exportar", methods=['GET'])
+    @condicional(Producto, Categoria, Proveedor, Imagen)
+    def api_productos_exportar():
+        """
+        Catálogo completo en NDJSON, CSV o XLSX (?formato=), enviado a
+        medida que se lee de la base. La lectura empieza al enviar el cuerpo,
+        ya fuera del request, con su propia conexión del pool.
+        """
+        formato = request.args.get('formato', 'ndjson')
+        if formato not in FORMATOS:
+            return jsonify({"error": f"Formato no válido; use uno de: {', '.join(FORMATOS)}"}), 400
+        
+        respuesta = app.response_class(exportar(formato), mimetype=FORMATOS[formato])
+        respuesta.headers['Content-Disposition'] = f'attachment; filename=productos.{formato}'
+        return respuesta
+    
     @app.route("/api/productos/<int:id>", methods=['GET'])
     def api_producto_detalle(id):
         """Obtener un producto específico"""
         try:
-            producto = Producto.obtener('id', id)
-            if not producto:
-                return jsonify({"error": "Producto no encontrado"}), 404
-            
-            producto_dict = producto.__dict__.copy()
-            
-            # Obtener relaciones
-            categoria = Categoria.obtener('id', producto_dict.get('cat_id'))
-            proveedor = Proveedor.obtener('id', producto_dict.get('prov_id'))
-            imagen = Imagen.obtener('id', producto_dict.get('img_id'))
-            
-            producto_dict['categoria'] = categoria.__dict__ if categoria else None
-            producto_dict['proveedor'] = proveedor.__dict__ if proveedor else None
-            producto_dict['imagen'] = imagen.__dict__ if imagen else None
-            
-            del producto_dict['cat_id']
-            del producto_dict['prov_id']
-            del producto_dict['img_id']
-            
-            return jsonify(producto_dict), 200
+            return respuesta_recurso(Producto, id, "Producto no encontrado")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
@@ -75,7 +295,6 @@ def registrar_rutas(app):
                 return jsonify({"error": "No se enviaron datos"}), 400
             
             nuevo_producto = Producto(
-                None,  # id
                 datos.get('art'),
                 datos.get('cod'),
                 datos.get('tit'),
@@ -87,6 +306,8 @@ def registrar_rutas(app):
             )
             
             resultado = nuevo_producto.guardar_db()
+            if resultado is False:
+                return error_alta(nuevo_producto)
             
             # Validar resultado
             if isinstance(resultado, str) and not resultado.isdigit():
@@ -106,19 +327,17 @@ def registrar_rutas(app):
     def api_producto_modificar(id):
         """Modificar un producto existente"""
         try:
-            producto = Producto.obtener('id', id)
-            if not producto:
-                return jsonify({"error": "Producto no encontrado"}), 404
-            
             datos = request.get_json()
             if not datos:
                 return jsonify({"error": "No se enviaron datos"}), 400
             
+            version = version_if_match()
             datos['id'] = id
-            resultado = Producto.modificar(datos)
-            
-            return jsonify({"mensaje": resultado}), 200
+            filas = Producto.modificar(datos, version)
             
+            return respuesta_escritura(Producto, id, version, filas, "Producto no encontrado")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
@@ -126,14 +345,12 @@ def registrar_rutas(app):
     def api_producto_eliminar(id):
         """Eliminar un producto"""
         try:
-            producto = Producto.obtener('id', id)
-            if not producto:
-                return jsonify({"error": "Producto no encontrado"}), 404
-            
-            resultado = Producto.eliminar(id)
-            
-            return jsonify({"mensaje": resultado}), 200
+            version = version_if_match()
+            filas = Producto.eliminar(id, version)
             
+            return respuesta_escritura(Producto, id, version, filas, "Producto no encontrado")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
@@ -141,12 +358,13 @@ def registrar_rutas(app):
     # ========== CATEGORÍAS ==========
     
     @app.route("/api/categorias", methods=['GET'])
+    @condicional(Categoria)
     def api_categorias():
         """Obtener todas las categorías"""
         try:
-            categorias = Categoria.obtener()
-            datos = [categoria.__dict__ for categoria in categorias]
-            return jsonify(datos), 200
+            return respuesta_recursos(Categoria)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
@@ -154,11 +372,9 @@ def registrar_rutas(app):
     def api_categoria_detalle(id):
         """Obtener una categoría específica"""
         try:
-            categoria = Categoria.obtener('id', id)
-            if not categoria:
-                return jsonify({"error": "Categoría no encontrada"}), 404
-            
-            return jsonify(categoria.__dict__), 200
+            return respuesta_recurso(Categoria, id, "Categoría no encontrada")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
@@ -172,12 +388,13 @@ def registrar_rutas(app):
                 return jsonify({"error": "No se enviaron datos"}), 400
             
             nueva_categoria = Categoria(
-                None,  # id
                 datos.get('name'),
                 datos.get('unit')
             )
             
             resultado = nueva_categoria.guardar_db()
+            if resultado is False:
+                return error_alta(nueva_categoria)
             
             if isinstance(resultado, str) and not resultado.isdigit():
                 return jsonify({"error": resultado}), 400
@@ -196,19 +413,17 @@ def registrar_rutas(app):
     def api_categoria_modificar(id):
         """Modificar una categoría existente"""
         try:
-            categoria = Categoria.obtener('id', id)
-            if not categoria:
-                return jsonify({"error": "Categoría no encontrada"}), 404
-            
             datos = request.get_json()
             if not datos:
                 return jsonify({"error": "No se enviaron datos"}), 400
             
+            version = version_if_match()
             datos['id'] = id
-            resultado = Categoria.modificar(datos)
-            
-            return jsonify({"mensaje": resultado}), 200
+            filas = Categoria.modificar(datos, version)
             
+            return respuesta_escritura(Categoria, id, version, filas, "Categoría no encontrada")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
@@ -216,14 +431,12 @@ def registrar_rutas(app):
     def api_categoria_eliminar(id):
         """Eliminar una categoría"""
         try:
-            categoria = Categoria.obtener('id', id)
-            if not categoria:
-                return jsonify({"error": "Categoría no encontrada"}), 404
-            
-            resultado = Categoria.eliminar(id)
-            
-            return jsonify({"mensaje": resultado}), 200
+            version = version_if_match()
+            filas = Categoria.eliminar(id, version)
             
+            return respuesta_escritura(Categoria, id, version, filas, "Categoría no encontrada")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
@@ -231,12 +444,13 @@ def registrar_rutas(app):
     # ========== PROVEEDORES ==========
     
     @app.route("/api/proveedores", methods=['GET'])
+    @condicional(Proveedor)
     def api_proveedores():
         """Obtener todos los proveedores"""
         try:
-            proveedores = Proveedor.obtener()
-            datos = [proveedor.__dict__ for proveedor in proveedores]
-            return jsonify(datos), 200
+            return respuesta_recursos(Proveedor)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
@@ -244,11 +458,9 @@ def registrar_rutas(app):
     def api_proveedor_detalle(id):
         """Obtener un proveedor específico"""
         try:
-            proveedor = Proveedor.obtener('id', id)
-            if not proveedor:
-                return jsonify({"error": "Proveedor no encontrado"}), 404
-            
-            return jsonify(proveedor.__dict__), 200
+            return respuesta_recurso(Proveedor, id, "Proveedor no encontrado")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
@@ -262,13 +474,14 @@ def registrar_rutas(app):
                 return jsonify({"error": "No se enviaron datos"}), 400
             
             nuevo_proveedor = Proveedor(
-                None,  # id
                 datos.get('cod'),
                 datos.get('name'),
                 datos.get('obs')
             )
             
             resultado = nuevo_proveedor.guardar_db()
+            if resultado is False:
+                return error_alta(nuevo_proveedor)
             
             if isinstance(resultado, str) and not resultado.isdigit():
                 return jsonify({"error": resultado}), 400
@@ -287,19 +500,17 @@ def registrar_rutas(app):
     def api_proveedor_modificar(id):
         """Modificar un proveedor existente"""
         try:
-            proveedor = Proveedor.obtener('id', id)
-            if not proveedor:
-                return jsonify({"error": "Proveedor no encontrado"}), 404
-            
             datos = request.get_json()
             if not datos:
                 return jsonify({"error": "No se enviaron datos"}), 400
             
+            version = version_if_match()
             datos['id'] = id
-            resultado = Proveedor.modificar(datos)
-            
-            return jsonify({"mensaje": resultado}), 200
+            filas = Proveedor.modificar(datos, version)
             
+            return respuesta_escritura(Proveedor, id, version, filas, "Proveedor no encontrado")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
@@ -307,14 +518,12 @@ def registrar_rutas(app):
     def api_proveedor_eliminar(id):
         """Eliminar un proveedor"""
         try:
-            proveedor = Proveedor.obtener('id', id)
-            if not proveedor:
-                return jsonify({"error": "Proveedor no encontrado"}), 404
-            
-            resultado = Proveedor.eliminar(id)
-            
-            return jsonify({"mensaje": resultado}), 200
+            version = version_if_match()
+            filas = Proveedor.eliminar(id, version)
             
+            return respuesta_escritura(Proveedor, id, version, filas, "Proveedor no encontrado")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
@@ -322,12 +531,13 @@ def registrar_rutas(app):
     # ========== IMÁGENES ==========
     
     @app.route("/api/imagenes", methods=['GET'])
+    @condicional(Imagen)
     def api_imagenes():
         """Obtener todas las imágenes"""
         try:
-            imagenes = Imagen.obtener()
-            datos = [imagen.__dict__ for imagen in imagenes]
-            return jsonify(datos), 200
+            return respuesta_recursos(Imagen)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
@@ -335,11 +545,9 @@ def registrar_rutas(app):
     def api_imagen_detalle(id):
         """Obtener una imagen específica"""
         try:
-            imagen = Imagen.obtener('id', id)
-            if not imagen:
-                return jsonify({"error": "Imagen no encontrada"}), 404
-            
-            return jsonify(imagen.__dict__), 200
+            return respuesta_recurso(Imagen, id, "Imagen no encontrada")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
@@ -353,12 +561,13 @@ def registrar_rutas(app):
                 return jsonify({"error": "No se enviaron datos"}), 400
             
             nueva_imagen = Imagen(
-                None,  # id
                 datos.get('url_img'),
                 datos.get('txt_alt')
             )
             
             resultado = nueva_imagen.guardar_db()
+            if resultado is False:
+                return error_alta(nueva_imagen)
             
             if isinstance(resultado, str) and not resultado.isdigit():
                 return jsonify({"error": resultado}), 400
@@ -377,19 +586,17 @@ def registrar_rutas(app):
     def api_imagen_modificar(id):
         """Modificar una imagen existente"""
         try:
-            imagen = Imagen.obtener('id', id)
-            if not imagen:
-                return jsonify({"error": "Imagen no encontrada"}), 404
-            
             datos = request.get_json()
             if not datos:
                 return jsonify({"error": "No se enviaron datos"}), 400
             
+            version = version_if_match()
             datos['id'] = id
-            resultado = Imagen.modificar(datos)
-            
-            return jsonify({"mensaje": resultado}), 200
+            filas = Imagen.modificar(datos, version)
             
+            return respuesta_escritura(Imagen, id, version, filas, "Imagen no encontrada")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
@@ -397,13 +604,161 @@ def registrar_rutas(app):
     def api_imagen_eliminar(id):
         """Eliminar una imagen"""
         try:
-            imagen = Imagen.obtener('id', id)
-            if not imagen:
-                return jsonify({"error": "Imagen no encontrada"}), 404
-            
-            resultado = Imagen.eliminar(id)
+            version = version_if_match()
+            filas = Imagen.eliminar(id, version)
             
-            return jsonify({"mensaje": resultado}), 200
+            return respuesta_escritura(Imagen, id, version, filas, "Imagen no encontrada")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+    
+    
+    # ========== LOTES ==========
+    
+    def leer_lote(modelo, metodo):
+        """
+        Lee y valida el cuerpo completo de un request de lote antes de
+        escribir nada: una lista de objetos (POST, PUT con 'id') o de ids
+        (DELETE). Devuelve (elementos, errores) con errores [{indice, error}].
+        """
+        elementos = request.get_json(silent=True)
+        if not isinstance(elementos, list) or not elementos:
+            return None, [{"indice": None, "error": "Se espera una lista JSON no vacía"}]
+        if len(elementos) > LIMITE_LOTE:
+            return None, [{"indice": None,
+                           "error": f"Se admiten hasta {LIMITE_LOTE} registros por lote"}]
+        
+        errores = []
+        ids = set()
+        for indice, elemento in enumerate(elementos):
+            id = elemento.get('id') if isinstance(elemento, dict) else elemento
+            if metodo == 'DELETE':
+                error = None if isinstance(id, int) and not isinstance(id, bool) else "'id' inválido"
+            elif not isinstance(elemento, dict):
+                error = "Se espera un objeto"
+            else:
+                desconocidos = [c for c in elemento if c not in modelo.campos]
+                compuestos = [c for c, v in elemento.items() if isinstance(v, (dict, list))]
+                if desconocidos:
+                    error = f"Campos desconocidos: {', '.join(desconocidos)}"
+                elif compuestos:
+                    error = f"Valores inválidos en: {', '.join(compuestos)}"
+                elif metodo == 'POST':
+                    error = "'id' no se envía al crear" if 'id' in elemento else None
+                elif not isinstance(id, int) or isinstance(id, bool):
+                    error = "Falta 'id' o no es un entero"
+                elif len(elemento) < 2:
+                    error = "No hay campos para modificar"
+                else:
+                    error = None
+            if error is None and metodo != 'POST':
+                error = "'id' repetido en el lote" if id in ids else None
+                ids.add(id)
+            if error:
+                errores.append({"indice": indice, "error": error})
+        return elementos, errores
+    
+    def respuesta_lote(resultados, estado_exitoso=200):
+        """
+        Resultado de cada elemento, en el orden recibido. Si alguno falló
+        se responde 207 (Multi-Status).
+        """
+        datos = [
+            {"indice": indice, "id": resultado.id, "ok": resultado.error is None,
+             **({"error": resultado.error} if resultado.error else {})}
+            for indice, resultado in enumerate(resultados)
+        ]
+        fallidos = sum(1 for resultado in resultados if resultado.error)
+        return jsonify({
+            "resultados": datos,
+            "exitosos": len(resultados) - fallidos,
+            "fallidos": fallidos,
+        }), 207 if fallidos else estado_exitoso
+    
+    def registrar_lote(recurso, modelo):
+        """POST, PUT y DELETE de /api/<recurso>/lote para un modelo"""
+        
+        def crear_lote():
+            """Crear varios registros"""
+            try:
+                elementos, errores = leer_lote(modelo, 'POST')
+                if errores:
+                    return jsonify({"error": "Lote inválido", "errores": errores}), 400
+                
+                registros = [modelo(*(elemento.get(c) for c in modelo.campos[1:]))
+                             for elemento in elementos]
+                return respuesta_lote(modelo.crear_lote(registros), 201)
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+        
+        def modificar_lote():
+            """Modificar varios registros existentes"""
+            try:
+                elementos, errores = leer_lote(modelo, 'PUT')
+                if errores:
+                    return jsonify({"error": "Lote inválido", "errores": errores}), 400
+                
+                return respuesta_lote(modelo.modificar_lote(elementos))
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+        
+        def eliminar_lote():
+            """Eliminar varios registros"""
+            try:
+                elementos, errores = leer_lote(modelo, 'DELETE')
+                if errores:
+                    return jsonify({"error": "Lote inválido", "errores": errores}), 400
+                
+                ids = [e['id'] if isinstance(e, dict) else e for e in elementos]
+                return respuesta_lote(modelo.eliminar_lote(ids))
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+        
+        ruta = f"/api/{recurso}/lote"
+        app.add_url_rule(ruta, f"api_{recurso}_lote_crear", crear_lote, methods=['POST'])
+        app.add_url_rule(ruta, f"api_{recurso}_lote_modificar", modificar_lote, methods=['PUT'])
+        app.add_url_rule(ruta, f"api_{recurso}_lote_eliminar", eliminar_lote, methods=['DELETE'])
+    
+    registrar_lote('productos', Producto)
+    registrar_lote('categorias', Categoria)
+    registrar_lote('proveedores', Proveedor)
+    registrar_lote('imagenes', Imagen)
+    
+    
+    # ========== IMPORTACIONES ==========
+    
+    @app.route("/api/importaciones/<id>", methods=['GET'])
+    def api_importacion(id):
+        """Obtener el estado y progreso de una importación de planilla"""
+        try:
+            importacion = cola_importaciones(app).obtener(id)
+            if not importacion:
+                return jsonify({"error": "Importación no encontrada"}), 404
             
+            del importacion['archivo'], importacion['proceso']
+            return jsonify(importacion), 200
         except Exception as e:
-            return jsonify({"error": str(e)}), 500
\ No newline at end of file
+            return jsonify({"error": str(e)}), 500
+    
+    
+    # ========== DIAGNÓSTICO ==========
+    
+    @app.route("/api/_cache", methods=['GET'])
+    def api_cache():
+        """Aciertos y fallos de la caché de tablas de referencia"""
+        return jsonify(cache.estadisticas()), 200
+    
+    @app.route("/api/_metrics", methods=['GET'])
+    def api_metricas():
+        """Métricas de consultas y requests en formato de texto de Prometheus"""
+        return app.response_class(
+            metricas.prometheus(), mimetype='text/plain', content_type='text/plain; version=0.0.4')
+    
+    @app.route("/api/_consultas_lentas", methods=['GET'])
+    def api_consultas_lentas():
+        """Últimas consultas que superaron el umbral de consulta lenta"""
+        return jsonify({
+            'umbral_segundos': metricas.umbral_lenta,
+            'consultas': list(metricas.lentas),
+        }), 200
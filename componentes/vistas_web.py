@@ -1,20 +1,26 @@
 from flask import render_template
 from flask import redirect
 from flask import url_for
-from flask import request, flash
-import openpyxl
+from flask import request, flash, abort
 from werkzeug.utils import secure_filename
 import os
+import uuid
 
+from auxiliares.cifrado import huella_archivo
 from componentes.modelos import Categoria
 from componentes.modelos import Imagen
 from componentes.modelos import Proveedor
 from componentes.modelos import Producto
+from componentes.importaciones import cola_importaciones, PENDIENTE, PROCESANDO, FALLIDA
+from componentes.importador import AGREGAR, MODOS
+from componentes.paginacion import leer_listado, siguiente_id
 
 
 def registrar_rutas_web(app):
     app.config['UPLOAD_FOLDER'] = './uploads'
     app.config['ALLOWED_EXTENSIONS'] = {'xlsx', 'xls'}
+    # Un solo hilo: dos importaciones a la vez podían cargar el mismo art/cod dos veces
+    app.config['IMPORTACIONES_HILOS'] = 1
 
     def allowed_file(filename):
         return '.' in filename and \
@@ -33,6 +39,38 @@ def registrar_rutas_web(app):
         }
         return plurales.get(tipo, tipo + "s")
 
+    def leer_pagina(modelo):
+        """
+        Parámetros de la página pedida; las vistas HTML siempre paginan.
+        Devuelve (listado, mensaje de error o None).
+        """
+        try:
+            return leer_listado(request.args, modelo, por_defecto=True), None
+        except ValueError as e:
+            return leer_listado({}, modelo, por_defecto=True), str(e)
+
+    def listar_pagina(modelo, listar):
+        """
+        (registros, listado, mensaje de error o None) de la página pedida,
+        leída con listar(**listado). Si el registro del cursor ya no existe
+        se muestra la primera página con el error.
+        """
+        listado, error = leer_pagina(modelo)
+        try:
+            return listar(**listado), listado, error
+        except ValueError as e:
+            listado = leer_listado({}, modelo, por_defecto=True)
+            return listar(**listado), listado, str(e)
+
+    def url_siguiente(registros, listado):
+        """URL de la página siguiente, o None si esta fue la última"""
+        siguiente = siguiente_id(registros, listado)
+        if siguiente is None:
+            return None
+        args = request.args.to_dict()
+        args['after_id'] = siguiente
+        return url_for(request.endpoint, **args)
+
     @app.route('/subir', methods=['GET', 'POST'])
     def subir_productos():
         if request.method == 'POST':
@@ -44,278 +82,97 @@ def registrar_rutas_web(app):
                 flash('No se ha seleccionado ningún archivo')
                 return redirect(request.url)
             if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
+                modo = request.form.get('modo', AGREGAR)
+                if modo not in MODOS:
+                    flash('Modo de importación no válido', 'error')
+                    return redirect(request.url)
+
+                # Un archivo idéntico a uno ya importado no se vuelve a procesar
+                huella = huella_archivo(file.stream)
+                forzar = bool(request.form.get('forzar'))
+                importaciones = cola_importaciones(app)
+                anterior = None if forzar else importaciones.anterior(huella, modo)
+                if anterior:
+                    flash('Este archivo ya se importó antes; se muestra aquel resultado. '
+                          'Para procesarlo de nuevo marque "Procesar todo de nuevo".', 'warning')
+                    return redirect(url_for('ver_importacion', id=anterior))
+
+                # Cada subida va a su propio archivo; con el nombre original
+                # una segunda subida pisaba la planilla de una importación en cola
+                filename = f"{uuid.uuid4().hex}_{secure_filename(file.filename)}"
                 
                 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
                 
                 filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
                 file.save(filepath)
-                try:
-                    workbook = openpyxl.load_workbook(filepath)
-                    sheet = workbook.active
-
-                    header = [cell.value for cell in sheet[1]]
-
-                    # Mapeo de columnas a campos del modelo Producto
-                    col_mapping = {
-                        'proveedor': ['Proveedor', 'proveedor', 'prov', 'Prov'],
-                        'art': ['Artículo', 'Articulo', 'artículo', 'articulo', 'art', 'Art'],
-                        'cod': ['Código', 'Codigo', 'código', 'codigo', 'cod', 'Cod'],
-                        'desc': ['Descripción', 'Descripcion', 'descripción', 'descripcion', 'desc', 'Desc'],
-                        'cat': ['Categoría', 'Categoria', 'categoría', 'categoria', 'cat', 'Cat'],
-                        'img': ['Imagen', 'imagen', 'img', 'Img']
-                    }
-
-                    # Encontrar los índices de las columnas en el archivo Excel
-                    col_indices = {}
-                    for field, possible_names in col_mapping.items():
-                        for name in possible_names:
-                            if name in header:
-                                col_indices[field] = header.index(name)
-                                break
-
-                    productos_importados = 0
-                    productos_confirmados = []
-                    productos_duplicados = []  # Lista para almacenar productos duplicados
-                    errores = []
-                    
-                    # Buscar o crear categoría por defecto "Sin categoría"
-                    categoria_default = Categoria.obtener("name", "Sin categoría")
-                    if not categoria_default:
-                        # Constructor Categoria SIN id: (name, unit)
-                        nueva_categoria = Categoria(
-                            "Sin categoría",  # name
-                            None              # unit
-                        )
-                        cat_default_id = nueva_categoria.guardar_db()
-                        if not cat_default_id or not isinstance(cat_default_id, int):
-                            flash('Error: No se pudo crear la categoría por defecto', 'error')
-                            return redirect(request.url)
-                    else:
-                        cat_default_id = categoria_default.id
-                    
-                    for row_num, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
-                        try:
-                            data = dict(zip(header, row))
-
-                            # ========== PROVEEDOR (buscar por código) ==========
-                            prov_codigo = None
-                            for col_name in col_mapping["proveedor"]:
-                                if col_name in data and data[col_name] is not None and str(data[col_name]).strip():
-                                    prov_codigo = str(data[col_name]).strip()
-                                    break
-
-                            # Validar que haya proveedor
-                            if not prov_codigo:
-                                errores.append(f"Fila {row_num}: Falta el código del proveedor")
-                                continue
-
-                            # Buscar proveedor por código (campo 'cod')
-                            proveedor_obj = Proveedor.obtener("cod", prov_codigo)
-                            if not proveedor_obj:
-                                # Si no existe, crear nuevo proveedor con ese código
-                                nuevo_proveedor = Proveedor(
-                                    prov_codigo,  # cod
-                                    f"Proveedor {prov_codigo}",  # name (generado automáticamente)
-                                    None          # obs
-                                )
-                                prov_id = nuevo_proveedor.guardar_db()
-                                
-                                if not prov_id or not isinstance(prov_id, int):
-                                    errores.append(f"Fila {row_num}: No se pudo crear el proveedor con código '{prov_codigo}'")
-                                    continue
-                                
-                                app.logger.info(f"Proveedor creado: código={prov_codigo}, id={prov_id}")
-                            else:
-                                prov_id = proveedor_obj.id
-
-                            # ========== ARTÍCULO (opcional) ==========
-                            art = None
-                            for col_name in col_mapping['art']:
-                                if col_name in data and data[col_name] is not None and str(data[col_name]).strip():
-                                    art = str(data[col_name]).strip()
-                                    break
-
-                            # ========== CÓDIGO (opcional) ==========
-                            cod = None
-                            for col_name in col_mapping['cod']:
-                                if col_name in data and data[col_name] is not None and str(data[col_name]).strip():
-                                    cod = str(data[col_name]).strip()
-                                    break
 
-                            # ========== DESCRIPCIÓN (OBLIGATORIO) ==========
-                            desc = None
-                            for col_name in col_mapping['desc']:
-                                if col_name in data and data[col_name] is not None:
-                                    desc = str(data[col_name]).strip()
-                                    if desc:  # Solo si no está vacío después del strip
-                                        break
-                                    desc = None  # Resetear si estaba vacío
-
-                            # Validar que haya descripción (campo obligatorio)
-                            if not desc:
-                                errores.append(f"Fila {row_num}: Falta la descripción del producto (campo obligatorio)")
-                                continue
-
-                            # Generar título automáticamente: primeras 3 palabras de la descripción
-                            tit = ' '.join(desc.split()[:3])
-
-                            # ========== CATEGORÍA (buscar por nombre) ==========
-                            cat_id = cat_default_id  # Por defecto usar "Sin categoría"
-                            cat_nombre = None
-                            for col_name in col_mapping['cat']:
-                                if col_name in data and data[col_name] is not None and str(data[col_name]).strip():
-                                    cat_nombre = str(data[col_name]).strip()
-                                    break
-                            
-                            if cat_nombre:
-                                # Buscar categoría por nombre
-                                categoria_obj = Categoria.obtener("name", cat_nombre)
-                                if categoria_obj:
-                                    cat_id = categoria_obj.id
-                                else:
-                                    # Si no existe, crear nueva categoría
-                                    nueva_cat = Categoria(
-                                        cat_nombre,  # name
-                                        None         # unit
-                                    )
-                                    cat_id = nueva_cat.guardar_db()
-                                    if cat_id and isinstance(cat_id, int):
-                                        app.logger.info(f"Categoría creada: nombre={cat_nombre}, id={cat_id}")
-                                    else:
-                                        errores.append(f"Fila {row_num}: No se pudo crear la categoría '{cat_nombre}', usando categoría por defecto")
-                                        cat_id = cat_default_id
-
-                            # ========== IMAGEN (buscar por URL) ==========
-                            img_id = None
-                            img_url = None
-                            for col_name in col_mapping['img']:
-                                if col_name in data and data[col_name] is not None and str(data[col_name]).strip():
-                                    img_url = str(data[col_name]).strip()
-                                    break
-                            
-                            if img_url:
-                                # Buscar imagen por URL
-                                imagen_obj = Imagen.obtener("url_img", img_url)
-                                if imagen_obj:
-                                    img_id = imagen_obj.id
-                                else:
-                                    # Si no existe, crear nueva imagen
-                                    nueva_img = Imagen(
-                                        img_url,  # url_img
-                                        None      # txt_alt
-                                    )
-                                    img_id = nueva_img.guardar_db()
-                                    if img_id and isinstance(img_id, int):
-                                        app.logger.info(f"Imagen creada: url={img_url}, id={img_id}")
-                                    else:
-                                        errores.append(f"Fila {row_num}: No se pudo crear la imagen '{img_url}'")
-                                        img_id = None
-
-                            # ========== VERIFICACIÓN DE DUPLICADOS ==========
-                            # Verificar si el producto ya existe comparando art y cod
-                            producto_existente = None
-                            
-                            # Buscar por artículo si existe
-                            if art:
-                                producto_existente = Producto.obtener('art', art)
-                            
-                            # Si no se encontró por artículo, buscar por código si existe
-                            if not producto_existente and cod:
-                                producto_existente = Producto.obtener('cod', cod)
-                            
-                            # Si el producto ya existe, agregarlo a la lista de duplicados y continuar
-                            if producto_existente:
-                                productos_duplicados.append({
-                                    'fila': row_num,
-                                    'art': art or 'N/A',
-                                    'cod': cod or 'N/A',
-                                    'desc': desc[:50] + '...' if len(desc) > 50 else desc,
-                                    'proveedor': prov_codigo
-                                })
-                                app.logger.info(f"Fila {row_num}: Producto duplicado detectado (art={art}, cod={cod})")
-                                continue
-                            
-                            # DEBUG: Verificar valores antes de crear el producto
-                            app.logger.debug(f"Fila {row_num} - Creando producto: art={art}, cod={cod}, tit={tit}, cat_id={cat_id}, img_id={img_id}, prov_id={prov_id}")
-                            
-                            # CORRECCIÓN: Crear producto SIN el id (el método crear() lo omite automáticamente)
-                            # Constructor: Producto(art, cod, tit, desc, cat_id, img_id, prov_id, rating)
-                            # NO incluir 'id' como primer parámetro cuando de_bbdd=False
-                            nuevo_producto = Producto(
-                                art,      # art
-                                cod,      # cod
-                                tit,      # tit (título)
-                                desc,     # desc (descripción)
-                                cat_id,   # cat_id (categoría)
-                                img_id,   # img_id (imagen)
-                                prov_id,  # prov_id (proveedor)
-                                0         # rating (valor inicial)
-                            )
-                            
-                            # DEBUG: Verificar atributos del objeto creado
-                            app.logger.debug(f"Fila {row_num} - Objeto producto creado correctamente")
-                            
-                            producto_id = nuevo_producto.guardar_db()
-                            
-                            if not producto_id or not isinstance(producto_id, int):
-                                errores.append(f"Fila {row_num}: No se obtuvo ID al guardar producto '{tit}'")
-                                continue
-
-                            # Verificar que el producto existe en la BD
-                            verificado = Producto.obtener('id', producto_id)
-                            if not verificado:
-                                errores.append(f"Fila {row_num}: Producto con ID {producto_id} no encontrado tras guardar")
-                                continue
-
-                            productos_importados += 1
-                            productos_confirmados.append(producto_id)
-                            
-                        except Exception as e:
-                            errores.append(f"Fila {row_num}: Error inesperado - {str(e)}")
-                            continue
-
-                    # Mostrar resultados
-                    app.logger.info(
-                        f"Productos procesados: {len(productos_confirmados)} confirmados. IDs: {productos_confirmados}")
-                    
-                    if errores:
-                        # Mostrar solo los primeros 5 errores
-                        for error in errores[:5]:
-                            flash(error, 'warning')
-                        if len(errores) > 5:
-                            flash(f'... y {len(errores) - 5} errores más', 'warning')
-                    
-                    # Mostrar información sobre productos duplicados
-                    if productos_duplicados:
-                        flash(f'Se detectaron {len(productos_duplicados)} productos duplicados que no fueron importados.', 'warning')
-                    
-                    if productos_importados > 0:
-                        flash(f'Se importaron {productos_importados} productos correctamente.', 'success')
-                        # Pasar la lista de duplicados al template
-                        return render_template('subir_productos.html', 
-                                             productos_importados=productos_importados,
-                                             productos_duplicados=productos_duplicados,
-                                             errores=errores)
-                    else:
-                        if productos_duplicados:
-                            # Si solo hay duplicados, mostrarlos
-                            return render_template('subir_productos.html',
-                                                 productos_duplicados=productos_duplicados,
-                                                 errores=errores)
-                        else:
-                            flash('No se pudo importar ningún producto. Revisa los errores.', 'error')
-                            return redirect(request.url)
-                        
-                except Exception as e:
-                    app.logger.error(f'Error al procesar archivo Excel: {str(e)}')
-                    flash(f'Error al procesar el archivo Excel: {e}', 'error')
-                    return redirect(request.url)
+                # La importación corre en segundo plano; se muestra su progreso
+                id_importacion = importaciones.encolar(filepath, modo, huella, forzar)
+                return redirect(url_for('ver_importacion', id=id_importacion))
             else:
                 flash('Tipo de archivo no permitido. Use .xlsx o .xls', 'error')
                 return redirect(request.url)
         return render_template('subir_productos.html')
 
+    @app.route('/subir/<id>')
+    def ver_importacion(id):
+        importacion = cola_importaciones(app).obtener(id)
+        if importacion is None:
+            abort(404)
+
+        if importacion['estado'] in (PENDIENTE, PROCESANDO):
+            return render_template('subir_productos.html', importacion=importacion)
+
+        if importacion['estado'] == FALLIDA:
+            flash(importacion['mensaje'], 'error')
+            return redirect(url_for('subir_productos'))
+
+        resultado = importacion['resultado']
+        productos_importados = resultado['productos_importados']
+        productos_actualizados = resultado.get('productos_actualizados', 0)
+        productos_sin_cambios = resultado.get('productos_sin_cambios', 0)
+        productos_duplicados = resultado['productos_duplicados']
+        errores = resultado['errores']
+
+        # Mostrar resultados
+        app.logger.info(
+            f"Productos procesados: {productos_importados} confirmados.")
+        
+        if errores:
+            # Mostrar solo los primeros 5 errores
+            for error in errores[:5]:
+                flash(error, 'warning')
+            if len(errores) > 5:
+                flash(f'... y {len(errores) - 5} errores más', 'warning')
+        
+        # Mostrar información sobre productos duplicados
+        if productos_duplicados:
+            flash(f'Se detectaron {len(productos_duplicados)} productos duplicados que no fueron importados.', 'warning')
+        
+        if productos_actualizados:
+            flash(f'Se actualizaron {productos_actualizados} productos existentes.', 'success')
+        if productos_sin_cambios:
+            flash(f'{productos_sin_cambios} filas ya estaban al día y no se modificaron.', 'info')
+        
+        if productos_importados > 0 or productos_actualizados or productos_sin_cambios:
+            if productos_importados > 0:
+                flash(f'Se importaron {productos_importados} productos correctamente.', 'success')
+            # Pasar la lista de duplicados al template
+            return render_template('subir_productos.html', 
+                                 productos_importados=productos_importados,
+                                 productos_actualizados=productos_actualizados,
+                                 productos_duplicados=productos_duplicados,
+                                 errores=errores)
+        else:
+            if productos_duplicados:
+                # Si solo hay duplicados, mostrarlos
+                return render_template('subir_productos.html',
+                                     productos_duplicados=productos_duplicados,
+                                     errores=errores)
+            else:
+                flash('No se pudo importar ningún producto. Revisa los errores.', 'error')
+                return redirect(url_for('subir_productos'))
+
     # ****** Inicio ******
     @app.route('/')
     def inicio():
@@ -325,32 +182,38 @@ def registrar_rutas_web(app):
     @app.route('/categorias')
     @app.route('/categorias/<mensaje>')
     def categorias(mensaje=None):
-        categorias = Categoria.obtener()
-        return render_template('./modelos/categorias.html', categorias=categorias, mensaje=mensaje)
+        categorias, listado, error = listar_pagina(Categoria, Categoria.listar)
+        return render_template('./modelos/categorias.html', categorias=categorias, mensaje=error or mensaje,
+                               siguiente=url_siguiente(categorias, listado))
     
     @app.route('/imagenes')
     @app.route('/imagenes/<mensaje>')
     def imagenes(mensaje=None):
-        imagenes = Imagen.obtener()
-        return render_template('./modelos/imagenes.html', imagenes=imagenes, mensaje=mensaje)
+        imagenes, listado, error = listar_pagina(Imagen, Imagen.listar)
+        return render_template('./modelos/imagenes.html', imagenes=imagenes, mensaje=error or mensaje,
+                               siguiente=url_siguiente(imagenes, listado))
 
     @app.route('/productos')
     @app.route('/productos/<mensaje>')
     def productos(mensaje=None):
-        productos = Producto.obtener()
-        for producto in productos:
-            categoria = Categoria.obtener('id', producto.cat_id)
+        pagina, listado, error = listar_pagina(Producto, Producto.obtener_con_relaciones)
+        productos = []
+        for producto, relacionados in pagina:
+            categoria = relacionados['categoria']
             producto.cat_id = categoria.name if categoria else None
             # Obtener el código del proveedor en lugar del ID
-            proveedor = Proveedor.obtener('id', producto.prov_id)
+            proveedor = relacionados['proveedor']
             producto.prov_id = proveedor.cod if proveedor else None
-        return render_template('./modelos/productos.html', productos=productos, mensaje=mensaje)
+            productos.append(producto)
+        return render_template('./modelos/productos.html', productos=productos, mensaje=error or mensaje,
+                               siguiente=url_siguiente(productos, listado))
     
     @app.route('/proveedores')
     @app.route('/proveedores/<mensaje>')
     def proveedores(mensaje=None):
-        proveedores = Proveedor.obtener()
-        return render_template('./modelos/proveedores.html', proveedores=proveedores, mensaje=mensaje)
+        proveedores, listado, error = listar_pagina(Proveedor, Proveedor.listar)
+        return render_template('./modelos/proveedores.html', proveedores=proveedores, mensaje=error or mensaje,
+                               siguiente=url_siguiente(proveedores, listado))
 
     # ****** Detalle de registros y CRUD ******
     tablas = {
@@ -375,7 +238,13 @@ def registrar_rutas_web(app):
 
     @app.route('/<id>/<tipo>/eliminar')
     def eliminar(id, tipo):
-        respuesta = tablas[tipo].eliminar(id)
+        filas = tablas[tipo].eliminar(id)
+        if filas is False:
+            respuesta = 'No se pudo eliminar el registro.'
+        elif filas:
+            respuesta = 'Eliminación exitosa.'
+        else:
+            respuesta = 'El registro no existe.'
         return redirect(url_for(pluralizar(tipo), mensaje=respuesta))
 
     @app.route('/<id>/<tipo>/modificar', methods=['POST'])
@@ -383,6 +252,10 @@ def registrar_rutas_web(app):
         if request.method == 'POST':
             datos = dict(request.form)
             datos['id'] = id
+            # Versión con la que se abrió el formulario: si otro usuario
+            # guardó antes, no se pisan sus cambios
+            version = datos.pop('version', None)
+            version = int(version) if version and version.isdigit() else None
             
             if tipo == 'producto':
                 # Validar categoría
@@ -406,12 +279,16 @@ def registrar_rutas_web(app):
                         mensaje = f'Error: La imagen con ID {datos["img_id"]} no existe.'
                         return redirect(url_for(pluralizar(tipo), mensaje=mensaje))
             
-            resultado = tablas[tipo].modificar(datos)
+            filas = tablas[tipo].modificar(datos, version)
             
-            if resultado and resultado != 'No se pudo modificar el registro.':
+            if filas is False:
+                mensaje = 'No se pudo modificar el registro.'
+            elif filas:
                 mensaje = 'Modificación exitosa.'
+            elif version is not None:
+                mensaje = 'Otro usuario modificó el registro mientras lo editaba. Vuelva a abrirlo para ver sus cambios.'
             else:
-                mensaje = 'No se pudo modificar el registro.'
+                mensaje = 'El registro no existe.'
                 
         return redirect(url_for(pluralizar(tipo), mensaje=mensaje))
 
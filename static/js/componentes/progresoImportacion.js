@@ -0,0 +1,27 @@
+/* Consulta el estado de la importación en curso y recarga la página
+cuando termina (el servidor muestra entonces el resultado) */
+
+let importacion = document.querySelector('#importacion');
+
+function actualizarProgreso() {
+    fetch(importacion.dataset.url)
+        .then(respuesta => respuesta.json())
+        .then(datos => {
+            if (datos.estado === 'terminada' || datos.estado === 'fallida') {
+                window.location.reload();
+                return;
+            }
+            document.querySelector('#filasProcesadas').textContent = datos.filas_procesadas;
+            document.querySelector('#importados').textContent = datos.importados;
+            document.querySelector('#duplicados').textContent = datos.duplicados;
+            document.querySelector('#sinCambios').textContent = datos.sin_cambios;
+            if (document.querySelector('#actualizados')) {
+                document.querySelector('#actualizados').textContent = datos.actualizados;
+            }
+            document.querySelector('#errores').textContent = datos.errores;
+            setTimeout(actualizarProgreso, 1000);
+        })
+        .catch(() => setTimeout(actualizarProgreso, 3000));
+}
+
+setTimeout(actualizarProgreso, 1000);